@@ -1,58 +1,85 @@
 import os
 import time
-import json
-import random
+import asyncio
+import shutil
+import tempfile
 import multiprocessing as mp
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional
 
-from fastapi import FastAPI
+from fastapi import APIRouter, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
-# Windows usa 'spawn'; defina cedo
+from broadcaster import BINARY_HEARTBEAT, Broadcaster, Frame, Subscriber, msgpack
+from checkpoint import Checkpoint, Checkpointer, Journal, load as load_checkpoint
+from counters import METRICS, PARENT_SHARD, ShardedCounters, miner_shard
+from deposits import SharedDeposits
+from event_ring import EventRings, producer_name
+from history import SharedHistory, parse_levels
+from lifecycle import LifecycleManager, Operation, OpError
+from locking import LockPolicy
+from profiler import Sampler, load as load_profile, render as render_profile
+from log_ring import LogRing
+from metrics import SharedMetrics, exposition
+from runtime import HostPool
+from shm_world import SharedWorld
+from simulation import (REGEN_TICK, RESOURCES, SharedHandles, Worlds, history_series, push_event,
+                        push_log, set_running)
+from state_delta import StatePublisher, StateTracker
+from supervisor import Supervisor
+from wakeup import Doorbell, Signal
+
+# forkserver (Linux/macOS) com o módulo da simulação pré-carregado: hosts
+# nascem de um processo que já importou simulation.py, sem FastAPI nem app.py.
+# Windows só tem 'spawn'. Defina cedo.
+START_METHOD = os.environ.get("START_METHOD") or (
+    "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+)
 if __name__ != "__main__":
     try:
-        mp.set_start_method("spawn", force=True)
-    except RuntimeError:
+        mp.set_start_method(START_METHOD, force=True)
+        if START_METHOD == "forkserver":
+            mp.set_forkserver_preload(["simulation"])
+    except (RuntimeError, ValueError):
         pass
 
-# ----------------------------
-# Handles compartilháveis (pickláveis)
-# ----------------------------
-@dataclass
-class SharedHandles:
-    minerals: Any
-    energy: Any
-    crystals: Any
-    running: Any
-    stats: Any
-    logs: Any
-    shared_mem: Any
-    miners: Any
-    sem: Any
-    lock: Any
-    events_queue: Any
-
 # ----------------------------
 # Estado (apenas no processo-pai)
 # ----------------------------
+# Cada mundo tem recursos, locks, tabela de mineradores, contadores, logs,
+# regenerador e stream próprios; pool de hosts, gerente de ciclo de vida e
+# supervisor são compartilhados. Os MAX_WORLDS slots nascem juntos (semáforos
+# e filas só passam para os hosts na criação deles): criar um mundo ativa um
+# slot livre. Os blocos que crescem com MAX_MINERS (histórico e anéis de
+# eventos, ~150 MB por mundo com 1000 mineradores) só existem com o mundo
+# aberto: criados ao abrir e removidos ao apagar. O mundo 0 sempre existe e é
+# o das rotas /api/... sem prefixo.
 @dataclass
-class State:
-    manager: Any
+class World:
+    id: int
     minerals: Any
     energy: Any
     crystals: Any
     running: Any
-    stats: Any
-    logs: Any
-    shared_mem: Any
-    miners: Any
-    sem: Any
+    world: SharedWorld
+    counters: ShardedCounters
+    metrics: SharedMetrics
+    logs: LogRing
+    locks: LockPolicy
     lock: Any
-    events_queue: Any
-    processes: Dict[int, mp.Process]
-    regen_proc: Optional[mp.Process] = None
+    events: EventRings
+    run_signal: Signal
+    energy_signal: Signal
+    history: SharedHistory
+    deposits: SharedDeposits
+    active: bool = False
+    tracker: Optional[StateTracker] = None
+    broadcaster: Optional[Broadcaster] = None
+    publisher: Optional[StatePublisher] = None
+    checkpointer: Optional[Checkpointer] = None
+    journal: Optional[Journal] = None
 
     def handles(self) -> SharedHandles:
         return SharedHandles(
@@ -60,66 +87,179 @@ class State:
             energy=self.energy,
             crystals=self.crystals,
             running=self.running,
-            stats=self.stats,
+            world=self.world,
+            counters=self.counters,
+            metrics=self.metrics,
             logs=self.logs,
-            shared_mem=self.shared_mem,
-            miners=self.miners,
-            sem=self.sem,
+            locks=self.locks,
             lock=self.lock,
-            events_queue=self.events_queue,
+            events=self.events,
+            run_signal=self.run_signal,
+            energy_signal=self.energy_signal,
+            history=self.history,
+            deposits=self.deposits,
         )
 
+@dataclass
+class State:
+    worlds: List[World]
+    table: Worlds
+    pool: Optional[HostPool] = None
+    lifecycle: Optional[LifecycleManager] = None
+    supervisor: Optional[Supervisor] = None
+    # Uma amostragem de /api/debug/profile por vez
+    profiling: bool = False
+
 STATE: Optional[State] = None
 
+def world_path(base: str, world_id: int) -> str:
+    # checkpoint.bin, checkpoint-1.bin, checkpoint-2.bin...
+    if world_id == 0:
+        return base
+    root, ext = os.path.splitext(base)
+    return f"{root}-{world_id}{ext}"
+
+def new_world(world_id: int, bell: Doorbell) -> World:
+    # Histórico e anéis de eventos sem bloco até o mundo abrir (do_open_world)
+    events = EventRings(miner_shard(MAX_MINERS), EVENT_RING_SLOTS, allocate=False)
+    # Mesmo mapa a cada início (semente = id do mundo); começa cheio
+    deposits = SharedDeposits(DEPOSITS, seed=world_id, cell=DEPOSIT_CELL)
+    w = World(
+        id=world_id,
+        minerals=mp.Value('i', deposits.total("minerals")),
+        energy=mp.Value('i', 100),
+        crystals=mp.Value('i', deposits.total("crystals")),
+        running=mp.Value('b', False),
+        world=SharedWorld(MAX_MINERS),
+        counters=ShardedCounters(miner_shard(MAX_MINERS)),
+        metrics=SharedMetrics(MAX_MINERS, miner_shard(MAX_MINERS)),
+        logs=LogRing(LOG_CAPACITY),
+        locks=LockPolicy(LOCK_POLICY, LOCK_PERMITS, DEPOSITS),
+        lock=mp.Lock(),
+        events=events,
+        run_signal=bell.signal(2 * world_id),
+        energy_signal=bell.signal(2 * world_id + 1),
+        history=SharedHistory(history_series(MAX_MINERS), HISTORY_LEVELS, REGEN_TICK, allocate=False),
+        deposits=deposits,
+    )
+    w.tracker = StateTracker(lambda: make_state_from_handles(w.handles()))
+    w.broadcaster = Broadcaster(events, buffer_size=SSE_BUFFER_SIZE, replay_size=SSE_REPLAY_SIZE)
+    w.publisher = StatePublisher(
+        w.tracker,
+        generation=lambda: w.world.version,
+        publish=w.broadcaster.publish,
+        hz=STATE_HZ,
+    )
+    w.checkpointer = Checkpointer(
+        world_path(CHECKPOINT_PATH, world_id),
+        capture=lambda: capture_checkpoint(w),
+        generation=lambda: w.world.version,
+        interval=CHECKPOINT_INTERVAL,
+    )
+    if JOURNAL_PATH:
+        w.journal = Journal(world_path(JOURNAL_PATH, world_id))
+        w.broadcaster.journal = w.journal
+    return w
+
 def init_state() -> State:
     global STATE
     if STATE is not None:
         return STATE
-    manager = mp.Manager()
-    STATE = State(
-        manager=manager,
-        minerals=mp.Value('i', 100),
-        energy=mp.Value('i', 100),
-        crystals=mp.Value('i', 50),
-        running=mp.Value('b', False),
-        stats=manager.dict({
-            "totalMined": 0, 
-            "conflicts": 0, 
-            "synchronized": 0,
-            "energyDepleted": 0
-        }),
-        logs=manager.list(),
-        shared_mem=manager.list(),
-        miners=manager.dict(),
-        sem=mp.Semaphore(1),
-        lock=mp.Lock(),
-        events_queue=mp.Queue(maxsize=1000),
-        processes={}
+    # Dois sinais por mundo: execução e energia
+    # Um slot de assinante por host; o dobro do pool cobre ids de hosts
+    # repostos antes do morto ser recolhido
+    bell = Doorbell(2 * MAX_WORLDS, subscribers=2 * max(1, MINER_HOSTS))
+    worlds = [new_world(i, bell) for i in range(MAX_WORLDS)]
+    STATE = State(worlds=worlds, table=Worlds([w.handles() for w in worlds], bell))
+    s = STATE
+    s.pool = HostPool(s.table, MINER_HOSTS)
+    # Único dono do pool: handlers só enfileiram operações
+    s.lifecycle = LifecycleManager(lambda op: push_event(s.worlds[op.world].handles(), {
+        "type": "op", "ts": time.time(), "data": op.describe(),
+    }))
+    s.supervisor = Supervisor(
+        s.pool, s.table, s.lifecycle,
+        report=lambda action, key, message, level, data: report_supervisor(s, action, key, message, level, data),
+        interval=SUPERVISOR_INTERVAL,
+        stall_timeout=STALL_TIMEOUT,
+        policy=RESTART_POLICY,
+        max_restarts=RESTART_MAX,
+        backoff=RESTART_BACKOFF,
+        backoff_max=RESTART_BACKOFF_MAX,
     )
     return STATE
 
 # ----------------------------
 # Helpers
 # ----------------------------
-COLORS = ['#3b82f6', '#ef4444', '#10b981', '#f59e0b', '#8b5cf6', '#ec4899']
+# Limite de mineradores lógicos por mundo (todos multiplexados nos processos host)
+MAX_MINERS = int(os.environ.get("MAX_MINERS", "6"))
+# Mundos independentes (slots pré-alocados, o 0 sempre ativo)
+MAX_WORLDS = max(1, int(os.environ.get("MAX_WORLDS", "4")))
+# Processos host que executam mineradores e regeneradores de todos os mundos
+MINER_HOSTS = int(os.environ.get("MINER_HOSTS", str(os.cpu_count() or 1)))
+# Política da seção crítica: single | striped | kpermit (ver locking.py)
+LOCK_POLICY = os.environ.get("LOCK_POLICY", "single")
+# Mineradores simultâneos por depósito na política kpermit
+LOCK_PERMITS = int(os.environ.get("LOCK_PERMITS", "2"))
+# Depósitos no mapa de cada mundo (metade minerais, metade cristais) e o
+# tamanho da célula do índice em grade, em px
+DEPOSITS = max(2, int(os.environ.get("DEPOSITS", "10")))
+DEPOSIT_CELL = float(os.environ.get("DEPOSIT_CELL", "50"))
 
-def push_log(h: SharedHandles, message: str, level: str = "info") -> None:
-    ts = time.strftime("%H:%M:%S")
-    entry = {"time": ts, "level": level, "message": message}
-    try:
-        h.logs.append(entry)
-        while len(h.logs) > 200:
-            try:
-                h.logs.pop(0)
-            except:
-                break
-    except:
-        pass
-    
-    try:
-        h.events_queue.put_nowait({"type": "log", "data": entry})
-    except:
-        pass
+# Registros mantidos no anel de logs
+LOG_CAPACITY = 256
+# Eventos pendentes por cliente SSE antes de descartar os mais antigos
+SSE_BUFFER_SIZE = 256
+# Eventos pendentes por produtor (minerador/regenerador) antes de descartar
+EVENT_RING_SLOTS = int(os.environ.get("EVENT_RING_SLOTS", "64"))
+# Últimos eventos guardados para quem reconecta com Last-Event-ID
+SSE_REPLAY_SIZE = int(os.environ.get("SSE_REPLAY_SIZE", "1024"))
+# Intervalo do heartbeat quando nenhum evento chega
+SSE_HEARTBEAT = 15.0
+# Máximo de frames de estado por segundo (rajadas são agrupadas)
+STATE_HZ = float(os.environ.get("STATE_HZ", "10"))
+# Espera máxima de uma requisição com ?wait=true pela operação
+OP_WAIT_TIMEOUT = 30.0
+
+# Supervisor: heartbeat mais velho que STALL_TIMEOUT = minerador parado
+SUPERVISOR_INTERVAL = 1.0
+STALL_TIMEOUT = float(os.environ.get("STALL_TIMEOUT", "5"))
+# on-failure | never; backoff exponencial de RESTART_BACKOFF até RESTART_BACKOFF_MAX
+RESTART_POLICY = os.environ.get("RESTART_POLICY", "on-failure")
+RESTART_MAX = int(os.environ.get("RESTART_MAX", "5"))
+RESTART_BACKOFF = float(os.environ.get("RESTART_BACKOFF", "0.5"))
+RESTART_BACKOFF_MAX = 30.0
+
+# Checkpoint binário de cada mundo; periódico só com CHECKPOINT_INTERVAL > 0
+# (desligado por padrão: execuções de dev e benchmark não gravam nada no
+# diretório atual). RESTORE=1 restaura ao iniciar
+CHECKPOINT_PATH = os.environ.get("CHECKPOINT_PATH", "checkpoint.bin")
+CHECKPOINT_INTERVAL = float(os.environ.get("CHECKPOINT_INTERVAL", "0"))
+RESTORE = os.environ.get("RESTORE", "").lower() in ("1", "true", "yes")
+# Diário de eventos de cada mundo (JSON Lines, só acrescenta); vazio desliga
+JOURNAL_PATH = os.environ.get("JOURNAL_PATH", "")
+# Histórico: níveis "passo:janela" em segundos (o passo cru é o tick do regenerador)
+HISTORY_LEVELS = parse_levels(os.environ.get("HISTORY_LEVELS", "0.25:300,5:21600"), REGEN_TICK)
+# Limites de POST /api/debug/profile
+PROFILE_MAX_SECONDS = 60.0
+PROFILE_MAX_HZ = 1000.0
+
+def report_supervisor(s: State, action: str, key: Optional[int], message: str,
+                      level: str, data: Dict[str, Any]) -> None:
+    # `key`: chave global do ator (None para ações do pool)
+    wid, mid = s.table.split(key) if key is not None else (0, None)
+    if key is not None and not s.table.is_miner(key):
+        mid = None
+    w = s.worlds[wid]
+    print(f"[SUPERVISOR] [mundo {wid}] {message}")
+    push_log(w.handles(), message, level)
+    push_event(w.handles(), {
+        "type": "supervisor",
+        "ts": time.time(),
+        "data": {"action": action, "world": wid, "miner": mid, **data},
+    })
+    emit_state(w)
 
 def make_state_from_handles(h: SharedHandles) -> Dict[str, Any]:
     try:
@@ -129,280 +269,96 @@ def make_state_from_handles(h: SharedHandles) -> Dict[str, Any]:
                 "energy": int(h.energy.value),
                 "crystals": int(h.crystals.value),
             },
-            "stats": {
-                "totalMined": int(h.stats.get("totalMined", 0)),
-                "conflicts": int(h.stats.get("conflicts", 0)),
-                "synchronized": int(h.stats.get("synchronized", 0)),
-                "energyDepleted": int(h.stats.get("energyDepleted", 0)),
-            },
-            "miners": {int(k): dict(h.miners[k]) for k in list(h.miners.keys())},
+            "stats": h.counters.totals(),
+            "miners": h.world.miners(),
+            "deposits": h.deposits.layout(),
             "isRunning": bool(h.running.value),
         }
     except:
         return {
             "resources": {"minerals": 0, "energy": 0, "crystals": 0},
-            "stats": {"totalMined": 0, "conflicts": 0, "synchronized": 0, "energyDepleted": 0},
+            "stats": {k: 0 for k in METRICS},
             "miners": {},
+            "deposits": {},
             "isRunning": False,
         }
 
-def snapshot(s: State) -> Dict[str, Any]:
-    base = make_state_from_handles(s.handles())
+def snapshot(w: World) -> Dict[str, Any]:
+    # Estado e versão do próprio tracker (um par atômico): os deltas de versão
+    # maior são diferenças contra exatamente este estado. Logs, capacidade e
+    # política não passam por deltas e são lidos na hora.
+    version, base = w.tracker.snapshot()
+    base["version"] = version
+    base["world"] = w.id
+    base["maxMiners"] = MAX_MINERS
+    base["lockPolicy"] = w.locks.describe()
+    # Tetos dos totais (soma das capacidades dos depósitos)
+    base["capacity"] = {
+        "minerals": w.deposits.capacity("minerals"),
+        "energy": 100,
+        "crystals": w.deposits.capacity("crystals"),
+    }
     try:
-        base["logs"] = list(s.logs)[-50:]
+        base["logs"] = w.logs.tail(50)
     except:
         base["logs"] = []
     return base
 
-def emit_state(s: State) -> None:
-    try:
-        s.events_queue.put_nowait({"type": "state", "data": make_state_from_handles(s.handles())})
-    except:
-        pass
-
-# ----------------------------
-# Workers
-# ----------------------------
-def miner_worker(miner_id: int, h: SharedHandles):
-    random.seed(os.getpid() ^ int(time.time()))
-    name = f"Minerador-{miner_id}"
-    
-    print(f"[WORKER {miner_id}] Iniciando processo PID={os.getpid()}")
-
-    # Registro inicial
-    try:
-        h.miners[miner_id] = {
-            "id": miner_id,
-            "name": name,
-            "x": random.random() * 650 + 25,
-            "y": random.random() * 350 + 25,
-            "color": COLORS[miner_id % len(COLORS)],
-            "status": "idle",
-            "mined": 0,
-            "locked": False,
-            "target": None
-        }
-        push_log(h, f"✅ {name} iniciado (PID: {os.getpid()})", "success")
-    except Exception as e:
-        print(f"[WORKER {miner_id}] Erro no registro: {e}")
-        return
-
-    try:
-        iteration = 0
-        while True:
-            iteration += 1
-            
-            # Verifica se deve continuar
-            try:
-                is_running = h.running.value
-            except:
-                break
-
-            if not is_running:
-                time.sleep(0.5)
-                # Movimento sutil quando pausado
-                if random.random() < 0.2:
-                    try:
-                        m = dict(h.miners.get(miner_id, {}))
-                        m["x"] = max(25, min(675, m["x"] + random.uniform(-10, 10)))
-                        m["y"] = max(25, min(375, m["y"] + random.uniform(-10, 10)))
-                        m["status"] = "idle"
-                        h.miners[miner_id] = m
-                    except:
-                        pass
-                continue
-
-            # Decide se vai tentar minerar
-            attempt = random.random() < 0.7
-            target = "minerals" if random.random() < 0.6 else "crystals"
-
-            # Atualiza status: aguardando
-            try:
-                m = dict(h.miners.get(miner_id, {}))
-                m["target"] = target
-                m["status"] = "waiting"
-                m["locked"] = False
-                h.miners[miner_id] = m
-            except:
-                pass
-
-            if attempt:
-                # VERIFICA ENERGIA ANTES DE TENTAR MINERAR
-                energy_needed = 5 if target == "minerals" else 8
-                
-                if h.energy.value < energy_needed:
-                    # Sem energia suficiente!
-                    try:
-                        m = dict(h.miners.get(miner_id, {}))
-                        m["status"] = "no_energy"
-                        m["target"] = None
-                        h.miners[miner_id] = m
-                        
-                        if random.random() < 0.15:  # Log ocasional
-                            push_log(h, f"⚠️ {name} sem energia suficiente", "warning")
-                            h.stats["energyDepleted"] = int(h.stats.get("energyDepleted", 0)) + 1
-                    except:
-                        pass
-                    
-                    time.sleep(0.8)
-                    continue
-                
-                # Tenta adquirir semáforo
-                acquired = h.sem.acquire(timeout=1.0)
-                
-                if not acquired:
-                    # Conflito!
-                    try:
-                        h.stats["conflicts"] = int(h.stats.get("conflicts", 0)) + 1
-                        m = dict(h.miners.get(miner_id, {}))
-                        m["status"] = "blocked"
-                        h.miners[miner_id] = m
-                        print(f"[WORKER {miner_id}] Conflito detectado!")
-                    except:
-                        pass
-                    time.sleep(0.4 + random.random() * 0.5)
-                    continue
-
-                # Entrou na seção crítica
-                try:
-                    # Marca como minerando
-                    try:
-                        m = dict(h.miners.get(miner_id, {}))
-                        m["locked"] = True
-                        m["status"] = "mining"
-                        h.miners[miner_id] = m
-                    except:
-                        pass
-
-                    # Simula tempo de mineração
-                    time.sleep(0.4 + random.random() * 0.5)
-
-                    # VERIFICA ENERGIA NOVAMENTE (pode ter sido consumida por outro)
-                    if h.energy.value < energy_needed:
-                        push_log(h, f"⚠️ {name} ficou sem energia durante mineração", "warning")
-                        h.stats["energyDepleted"] = int(h.stats.get("energyDepleted", 0)) + 1
-                    else:
-                        # Minera recurso
-                        try:
-                            if target == "minerals" and h.minerals.value > 0:
-                                delta = min(5, h.minerals.value)
-                                h.minerals.value -= delta
-                                h.energy.value = max(0, h.energy.value - 5)  # CONSUMO AUMENTADO
-                                h.stats["totalMined"] = int(h.stats.get("totalMined", 0)) + delta
-                                h.stats["synchronized"] = int(h.stats.get("synchronized", 0)) + 1
-
-                                m = dict(h.miners[miner_id])
-                                m["mined"] = int(m.get("mined", 0)) + delta
-                                h.miners[miner_id] = m
-
-                                push_log(h, f"⛏️ {name} minerou {delta} minerais (-5 energia)", "success")
-                                print(f"[WORKER {miner_id}] Minerou {delta} minerais (Energia: {h.energy.value})")
-
-                            elif target == "crystals" and h.crystals.value > 0:
-                                delta = min(3, h.crystals.value)
-                                h.crystals.value -= delta
-                                h.energy.value = max(0, h.energy.value - 8)  # CONSUMO AUMENTADO
-                                h.stats["totalMined"] = int(h.stats.get("totalMined", 0)) + delta
-                                h.stats["synchronized"] = int(h.stats.get("synchronized", 0)) + 1
-
-                                m = dict(h.miners[miner_id])
-                                m["mined"] = int(m.get("mined", 0)) + delta
-                                h.miners[miner_id] = m
-
-                                push_log(h, f"💎 {name} coletou {delta} cristais (-8 energia)", "success")
-                                print(f"[WORKER {miner_id}] Coletou {delta} cristais (Energia: {h.energy.value})")
-
-                            # Move após minerar
-                            m = dict(h.miners[miner_id])
-                            m["x"] = max(25, min(675, m["x"] + random.uniform(-80, 80)))
-                            m["y"] = max(25, min(375, m["y"] + random.uniform(-60, 60)))
-                            h.miners[miner_id] = m
-
-                        except Exception as e:
-                            print(f"[WORKER {miner_id}] Erro ao minerar: {e}")
-
-                finally:
-                    # Libera lock e semáforo
-                    try:
-                        m = dict(h.miners.get(miner_id, {}))
-                        m["locked"] = False
-                        m["status"] = "idle"
-                        m["target"] = None
-                        h.miners[miner_id] = m
-                    except:
-                        pass
-                    
-                    h.sem.release()
-                    
-                    # EMITE ESTADO APÓS MINERAÇÃO
-                    try:
-                        h.events_queue.put_nowait({"type": "state", "data": make_state_from_handles(h)})
-                    except:
-                        pass
-
-            else:
-                # Movimento sem minerar
-                try:
-                    m = dict(h.miners.get(miner_id, {}))
-                    m["x"] = max(25, min(675, m["x"] + random.uniform(-20, 20)))
-                    m["y"] = max(25, min(375, m["y"] + random.uniform(-15, 15)))
-                    m["status"] = "idle"
-                    m["target"] = None
-                    h.miners[miner_id] = m
-                except:
-                    pass
-
-            # Pausa entre ações
-            time.sleep(0.5 + random.random() * 0.7)
-
-    except KeyboardInterrupt:
-        print(f"[WORKER {miner_id}] Interrompido por usuário")
-    except Exception as ex:
-        print(f"[WORKER {miner_id}] Erro fatal: {ex}")
-        push_log(h, f"❌ {name} falhou: {ex}", "error")
-    finally:
-        try:
-            if miner_id in h.miners:
-                d = dict(h.miners[miner_id])
-                d["status"] = "terminated"
-                h.miners[miner_id] = d
-        except:
-            pass
-        push_log(h, f"🛑 {name} finalizado", "warning")
-        print(f"[WORKER {miner_id}] Processo finalizado")
+def capture_checkpoint(w: World) -> Checkpoint:
+    # Só leituras da memória compartilhada: ninguém espera pelo checkpoint.
+    # Sem o try/except de make_state_from_handles: melhor falhar que salvar zeros.
+    return Checkpoint(
+        saved_at=time.time(),
+        version=w.world.version,
+        resources={
+            "minerals": int(w.minerals.value),
+            "energy": int(w.energy.value),
+            "crystals": int(w.crystals.value),
+        },
+        running=bool(w.running.value),
+        stats=w.counters.totals(),
+        miners={mid: {"x": m["x"], "y": m["y"], "mined": m["mined"]} for mid, m in w.world.miners().items()},
+        deposits=w.deposits.amounts(),
+    )
 
-def regenerator_worker(h: SharedHandles):
-    print("[REGEN] Processo de regeneração iniciado")
+def restore_checkpoint(w: World) -> Optional[Checkpoint]:
+    # Recursos, flag e estatísticas voltam na hora; mineradores via gerente
+    path = w.checkpointer.path
     try:
-        tick = 0
-        while True:
-            tick += 1
-            try:
-                # REGENERAÇÃO MAIS LENTA E BALANCEADA
-                h.minerals.value = min(100, h.minerals.value + 1)  # Reduzido de 2 para 1
-                h.energy.value = min(100, h.energy.value + 2)      # Reduzido de 3 para 2
-                
-                # Cristais a cada 5 ticks (~1.25 segundos)
-                if tick % 5 == 0:
-                    h.crystals.value = min(50, h.crystals.value + 1)
-                
-                # Log de energia baixa
-                if h.energy.value < 20 and tick % 8 == 0:
-                    push_log(h, f"⚡ Energia baixa: {h.energy.value}%", "warning")
-                    
-            except Exception as e:
-                print(f"[REGEN] Erro ao regenerar: {e}")
+        cp = load_checkpoint(path)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Checkpoint {path} ignorado: {e}")
+        push_log(w.handles(), f"⚠️ Checkpoint ignorado: {e}", "warning")
+        return None
+    if cp is None:
+        if w.id == 0:
+            print(f"ℹ️ Nenhum checkpoint em {path}")
+        return None
+    w.minerals.value = cp.resources["minerals"]
+    w.energy.value = cp.resources["energy"]
+    w.crystals.value = cp.resources["crystals"]
+    # Totais de minerais/cristais passam a ser a soma dos depósitos restaurados
+    w.deposits.restore(cp.deposits, {"minerals": w.minerals, "crystals": w.crystals})
+    w.energy_signal.ring()
+    set_running(w.handles(), cp.running)
+    current = w.counters.totals()
+    for name, value in cp.stats.items():
+        if name in current:
+            w.counters.add(PARENT_SHARD, name, value - current[name])
+    saved = time.strftime("%H:%M:%S", time.localtime(cp.saved_at))
+    print(f"💾 Checkpoint de {saved} restaurado no mundo {w.id} ({len(cp.miners)} mineradores)")
+    push_log(w.handles(), f"💾 Checkpoint de {saved} restaurado", "info")
+    emit_state(w)
+    return cp
 
-            try:
-                h.events_queue.put_nowait({"type": "state", "data": make_state_from_handles(h)})
-            except:
-                pass
+def emit_state(w: World) -> None:
+    # Só marca o mundo como alterado; o publicador gera o delta no próximo tick
+    w.world.touch()
 
-            time.sleep(0.25)  # 4 vezes por segundo
-    except KeyboardInterrupt:
-        print("[REGEN] Interrompido")
-    except Exception as e:
-        print(f"[REGEN] Erro: {e}")
+def miner_ids(s: State, w: World) -> List[int]:
+    # Ids locais dos mineradores do mundo que estão em algum host
+    keys = s.table.keys_of(w.id, list(s.pool.placement))
+    return sorted(s.table.split(k)[1] for k in keys if s.table.is_miner(k))
 
 # ----------------------------
 # FastAPI
@@ -422,181 +378,745 @@ def _startup():
     print("=" * 60)
     print("🚀 Iniciando servidor FastAPI")
     print("=" * 60)
+    init_state()
+
+@app.on_event("startup")
+async def _start_broadcaster():
+    # Um dreno dos anéis de eventos por mundo, compartilhado pelos clientes SSE dele
     s = init_state()
-    if s.regen_proc is None or not s.regen_proc.is_alive():
-        p = mp.Process(target=regenerator_worker, args=(s.handles(),), daemon=True)
-        p.start()
-        s.regen_proc = p
-        print(f"✅ Regenerador iniciado (PID: {p.pid})")
-        push_log(s.handles(), "🔧 Regenerador de recursos iniciado", "info")
-        emit_state(s)
-
-@app.get("/api/state")
-def get_state():
+    for w in s.worlds:
+        w.broadcaster.start()
+        w.publisher.start()
+    s.lifecycle.start()
+    # Pool quente: os hosts sobem em segundo plano, antes do primeiro minerador
+    s.lifecycle.submit("warm", lambda: do_warm_pool(s), internal=True)
+    # Mundo 0 sempre; os outros voltam se houver checkpoint deles
+    for w in s.worlds:
+        cp = restore_checkpoint(w) if RESTORE else None
+        if w.id == 0 or cp is not None:
+            s.lifecycle.submit("open_world", lambda w=w, cp=cp: do_open_world(s, w, cp),
+                               internal=True, world=w.id)
+    s.supervisor.start()
+
+@app.on_event("shutdown")
+async def _stop_broadcaster():
+    if STATE is not None:
+        for w in STATE.worlds:
+            if w.active and w.checkpointer.active:
+                w.checkpointer.stop()
+                # Último checkpoint com os mineradores ainda registrados
+                await run_in_threadpool(w.checkpointer.save_now)
+        for w in STATE.worlds:
+            await w.publisher.stop()
+            await w.broadcaster.stop()
+            if w.journal is not None:
+                await run_in_threadpool(w.journal.stop)
+        STATE.supervisor.stop()
+        # Para o gerente antes: depois dele ninguém mais mexe no pool
+        await run_in_threadpool(STATE.lifecycle.stop)
+        STATE.pool.shutdown()
+        # O processo-pai é o dono dos blocos de memória compartilhada
+        for w in STATE.worlds:
+            w.world.close()
+            w.counters.close()
+            w.metrics.close()
+            w.logs.close()
+            w.history.close()
+            w.events.close()
+            w.deposits.close()
+
+# Rotas de um mundo: montadas em /api (mundo 0) e em /api/worlds/{world_id}
+router = APIRouter()
+
+def get_world(world_id: int) -> World:
     s = init_state()
-    return JSONResponse(snapshot(s))
+    if not 0 <= world_id < len(s.worlds) or not s.worlds[world_id].active:
+        raise HTTPException(status_code=404, detail=f"mundo {world_id} não existe")
+    return s.worlds[world_id]
+
+@router.get("/state")
+def get_state(world_id: int = 0):
+    w = get_world(world_id)
+    return JSONResponse(snapshot(w))
 
-@app.post("/api/start")
-def start():
+@router.get("/logs")
+def get_logs(world_id: int = 0, after: int = 0, limit: int = 100):
+    # Paginação por cursor: devolve só os logs com seq > after
+    w = get_world(world_id)
+    limit = max(1, min(limit, LOG_CAPACITY))
+    logs = w.logs.read_after(after, limit)
+    return {
+        "logs": logs,
+        "next": logs[-1]["seq"] if logs else max(after, 0),
+        "head": w.logs.head,
+    }
+
+def history_names(w: World, series: str) -> List[str]:
+    # Nomes separados por vírgula; grupos: resources, stats, miners (os ativos)
+    names: List[str] = []
+    for part in series.split(","):
+        part = part.strip()
+        if part == "resources":
+            names += RESOURCES
+        elif part == "stats":
+            names += METRICS
+        elif part == "miners":
+            names += [f"miner.{i}" for i in w.world.ids()]
+        elif part:
+            names.append(part)
+    return list(dict.fromkeys(names))
+
+@router.get("/history")
+def get_history(world_id: int = 0, series: str = "resources", window: float = 300.0,
+                step: Optional[float] = None):
+    # Colunas: t[] e, por série, mean[] (+ min[]/max[] quando agregado)
+    w = get_world(world_id)
+    names = history_names(w, series)
+    unknown = [n for n in names if n not in w.history.series]
+    if unknown:
+        return JSONResponse(
+            {"error": "unknown_series", "message": f"Séries desconhecidas: {', '.join(unknown)}"},
+            status_code=400,
+        )
+    if window <= 0 or (step is not None and step <= 0):
+        return JSONResponse(
+            {"error": "invalid_window", "message": "window e step devem ser positivos"},
+            status_code=400,
+        )
+    data = w.history.read(names, window, step)
+    data["levels"] = [
+        {"step": w.history.step(lv), "span": w.history.step(lv) * cap}
+        for lv, (_, cap) in enumerate(w.history.levels)
+    ]
+    return data
+
+@app.get("/api/processes")
+def get_processes():
+    # PIDs por papel (pai, hosts), usados pelo benchmark para CPU/RSS.
+    # Regeneradores são atores dentro dos hosts, como os mineradores.
     s = init_state()
-    s.running.value = True
-    push_log(s.handles(), "▶️ Execução iniciada", "success")
-    emit_state(s)
-    print("▶️ Execução INICIADA")
-    return {"ok": True, "isRunning": True}
+    procs = [{"role": "parent", "pid": os.getpid()}]
+    for host in list(s.pool.hosts.values()):
+        if host.proc.is_alive():
+            keys = list(host.miners)
+            procs.append({
+                "role": "host",
+                "id": host.id,
+                "pid": host.proc.pid,
+                "miners": sum(1 for k in keys if s.table.is_miner(k)),
+                "regenerators": sum(1 for k in keys if not s.table.is_miner(k)),
+                "worlds": sorted({s.table.split(k)[0] for k in keys}),
+                "coldStart": host.cold_start,
+            })
+    return {"processes": procs}
+
+def describe_world(s: State, w: World, sse: Dict[str, int]) -> Dict[str, Any]:
+    # Contabilidade do mundo: recursos, estatísticas, custo nos hosts e stream
+    usage = w.metrics.usage_totals()
+    return {
+        "id": w.id,
+        "active": w.active,
+        "isRunning": bool(w.running.value),
+        "miners": len(miner_ids(s, w)),
+        "resources": {
+            "minerals": int(w.minerals.value),
+            "energy": int(w.energy.value),
+            "crystals": int(w.crystals.value),
+        },
+        "stats": w.counters.totals(),
+        "usage": {
+            "steps": int(usage["steps"]),
+            "busySeconds": round(usage["busy_seconds"], 6),
+            "eventsProduced": w.events.totals()["written"] + w.publisher.frames,
+            "eventsDroppedAtSource": w.events.totals()["dropped"],
+            "eventsDelivered": sse["delivered"],
+            "subscribers": sse["subscribers"],
+        },
+    }
 
-@app.post("/api/pause")
-def pause():
+@app.get("/api/worlds")
+async def list_worlds(all: bool = False):
+    # `all`: inclui os slots livres
     s = init_state()
-    s.running.value = False
-    push_log(s.handles(), "⏸️ Execução pausada", "warning")
-    emit_state(s)
-    print("⏸️ Execução PAUSADA")
-    return {"ok": True, "isRunning": False}
+    sse = {w.id: w.broadcaster.stats() for w in s.worlds}
+    worlds = [w for w in s.worlds if w.active or all]
+    data = await run_in_threadpool(lambda: [describe_world(s, w, sse[w.id]) for w in worlds])
+    return {"worlds": data, "maxWorlds": MAX_WORLDS}
+
+def render_metrics(s: State, sse: Dict[int, Dict[str, int]]) -> str:
+    # Formato de texto do Prometheus (exposition format 0.0.4); séries por mundo
+    worlds = [w for w in s.worlds if w.active]
+
+    def family(name: str, kind: str, help_text: str, values: Callable[[World], List[str]]) -> List[str]:
+        out = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for w in worlds:
+            out += values(w)
+        return out
 
-@app.post("/api/reset")
-def reset():
+    def wl(w: World) -> str:
+        return f'world="{w.id}"'
+
+    lines = exposition([(wl(w), w.metrics) for w in worlds])
+    lines += family("mining_events_produced_total", "counter", "Eventos gerados por origem", lambda w: [
+        f'mining_events_produced_total{{{wl(w)},source="log"}} {w.events.totals()["written"]}',
+        f'mining_events_produced_total{{{wl(w)},source="delta"}} {w.publisher.frames}',
+    ])
+    lines += family("mining_events_published_total", "counter", "Eventos replicados para os assinantes SSE",
+                    lambda w: [f"mining_events_published_total{{{wl(w)}}} {sse[w.id]['published']}"])
+    lines += family("mining_events_delivered_total", "counter", "Eventos entregues aos clientes SSE",
+                    lambda w: [f"mining_events_delivered_total{{{wl(w)}}} {sse[w.id]['delivered']}"])
+    lines += family("mining_events_dropped_total", "counter", "Eventos descartados em buffers de clientes lentos",
+                    lambda w: [f"mining_events_dropped_total{{{wl(w)}}} {sse[w.id]['dropped']}"])
+    # Por produtor: anel cheio (ou fila do pai cheia) antes de chegar ao dreno
+    lines += family("mining_events_source_dropped_total", "counter", "Eventos descartados no anel do produtor", lambda w: [
+        f'mining_events_source_dropped_total{{{wl(w)},producer="{producer_name(shard)}"}} {st["dropped"]}'
+        for shard, st in w.events.stats().items()
+    ])
+    lines += family("mining_sse_subscribers", "gauge", "Clientes SSE conectados",
+                    lambda w: [f"mining_sse_subscribers{{{wl(w)}}} {sse[w.id]['subscribers']}"])
+    lines += family("mining_sse_resumes_total", "counter", "Reconexoes com Last-Event-ID por resultado", lambda w: [
+        f'mining_sse_resumes_total{{{wl(w)},result="replay"}} {sse[w.id]["resumed"]}',
+        f'mining_sse_resumes_total{{{wl(w)},result="snapshot"}} {sse[w.id]["resume_misses"]}',
+    ])
+    # Estatísticas do jogo: gauge, pois o reset volta a zero
+    lines += family("mining_stat", "gauge", "Estatisticas do jogo (as mesmas de /api/state)", lambda w: [
+        f'mining_stat{{{wl(w)},name="{name}"}} {value}' for name, value in w.counters.totals().items()
+    ])
+    lines += family("mining_resource", "gauge", "Recursos compartilhados", lambda w: [
+        f'mining_resource{{{wl(w)},name="{name}"}} {int(getattr(w, name).value)}'
+        for name in ("minerals", "energy", "crystals")
+    ])
+    lines += family("mining_miners", "gauge", "Mineradores ativos",
+                    lambda w: [f"mining_miners{{{wl(w)}}} {len(miner_ids(s, w))}"])
+    lines += family("mining_checkpoint_saves_total", "counter", "Checkpoints gravados",
+                    lambda w: [f"mining_checkpoint_saves_total{{{wl(w)}}} {w.checkpointer.saves}"])
+    lines += family("mining_checkpoint_failures_total", "counter", "Checkpoints que falharam",
+                    lambda w: [f"mining_checkpoint_failures_total{{{wl(w)}}} {w.checkpointer.failures}"])
+    lines += family("mining_checkpoint_last_seconds", "gauge", "Duracao do ultimo checkpoint (captura + fsync)",
+                    lambda w: [f"mining_checkpoint_last_seconds{{{wl(w)}}} {w.checkpointer.last_seconds:.6f}"])
+    lines += family("mining_checkpoint_last_bytes", "gauge", "Tamanho do ultimo checkpoint",
+                    lambda w: [f"mining_checkpoint_last_bytes{{{wl(w)}}} {w.checkpointer.last_bytes}"])
+    if JOURNAL_PATH:
+        lines += family("mining_journal_events_total", "counter", "Eventos gravados no diario por resultado", lambda w: [
+            f'mining_journal_events_total{{{wl(w)},result="written"}} {w.journal.written}',
+            f'mining_journal_events_total{{{wl(w)},result="dropped"}} {w.journal.dropped}',
+        ])
+    lines += [
+        "# HELP mining_worlds Mundos ativos",
+        "# TYPE mining_worlds gauge",
+        f"mining_worlds {len(worlds)}",
+        "# HELP mining_supervisor_actions_total Acoes do supervisor por tipo",
+        "# TYPE mining_supervisor_actions_total counter",
+    ] + [
+        f'mining_supervisor_actions_total{{action="{a}"}} {n}' for a, n in s.supervisor.actions.items()
+    ] + [
+        "# HELP mining_restarts_pending Atores aguardando restart",
+        "# TYPE mining_restarts_pending gauge",
+        f"mining_restarts_pending {len(s.supervisor.pending)}",
+        "# HELP mining_host_cold_start_seconds Tempo ate um host novo responder (start method: " + START_METHOD + ")",
+        "# TYPE mining_host_cold_start_seconds summary",
+        f"mining_host_cold_start_seconds_sum {sum(s.pool.cold_starts):.6f}",
+        f"mining_host_cold_start_seconds_count {len(s.pool.cold_starts)}",
+        "# HELP mining_lifecycle_pending Operacoes de ciclo de vida na fila",
+        "# TYPE mining_lifecycle_pending gauge",
+        f"mining_lifecycle_pending {s.lifecycle.pending()}",
+    ]
+    return "\n".join(lines) + "\n"
+
+@app.get("/api/metrics")
+async def get_metrics():
     s = init_state()
-    print("🔄 Iniciando RESET...")
+    # Os broadcasters só são lidos no event loop; o resto roda no threadpool
+    sse = {w.id: w.broadcaster.stats() for w in s.worlds}
+    body = await run_in_threadpool(render_metrics, s, sse)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+@router.post("/start")
+def start(world_id: int = 0):
+    w = get_world(world_id)
+    set_running(w.handles(), True)
+    push_log(w.handles(), "▶️ Execução iniciada", "success")
+    emit_state(w)
+    print(f"▶️ Execução INICIADA (mundo {w.id})")
+    return {"ok": True, "isRunning": True}
+
+@router.post("/pause")
+def pause(world_id: int = 0):
+    w = get_world(world_id)
+    set_running(w.handles(), False)
+    push_log(w.handles(), "⏸️ Execução pausada", "warning")
+    emit_state(w)
+    print(f"⏸️ Execução PAUSADA (mundo {w.id})")
+    return {"ok": True, "isRunning": False}
+
+@router.post("/checkpoint")
+def save_checkpoint(world_id: int = 0):
+    # Checkpoint sob demanda (mesmo caminho do periódico)
+    w = get_world(world_id)
+    if not w.checkpointer.save_now():
+        raise HTTPException(status_code=500, detail="falha ao gravar checkpoint")
+    return {"ok": True, "path": w.checkpointer.path, "bytes": w.checkpointer.last_bytes}
+
+# ----------------------------
+# Operações de ciclo de vida (executadas pelo gerente, nunca na requisição)
+# ----------------------------
+def do_warm_pool(s: State) -> Dict[str, Any]:
+    started = time.monotonic()
+    new = s.pool.top_up()
+    ready = [h.cold_start for h in new if h.cold_start is not None]
+    if ready:
+        avg = sum(ready) / len(ready)
+        msg = (f"🔥 Pool aquecido: {len(ready)} hosts em {time.monotonic() - started:.2f}s "
+               f"(cold start médio {avg:.3f}s, {START_METHOD})")
+        print(msg)
+        push_log(s.worlds[0].handles(), msg, "info")
+    return {"hosts": len(new), "coldStarts": ready}
+
+def do_open_world(s: State, w: World, cp: Optional[Checkpoint]) -> Dict[str, Any]:
+    # Regenerador do mundo entra no pool como mais um ator; depois os
+    # mineradores do checkpoint, e só então checkpoints periódicos e diário
+    w.history.allocate()
+    w.events.allocate()
+    s.pool.attach(w.id)
+    w.active = True
+    if s.pool.add(s.table.regen_key(w.id)) is None:
+        push_log(w.handles(), "❌ Falha ao iniciar o regenerador", "error")
+        # O supervisor tenta de novo na próxima verificação
+        s.supervisor.pending[s.table.regen_key(w.id)] = time.monotonic()
+    else:
+        # O log "Regenerador iniciado" sai do próprio regenerator_actor
+        print(f"✅ Regenerador do mundo {w.id} iniciado")
+    result: Dict[str, Any] = {"id": w.id}
+    if cp is not None and cp.miners:
+        result.update(do_restore_miners(s, w, cp))
+    w.checkpointer.start()
+    if w.journal is not None:
+        w.journal.start()
+        # Base para a reprodução offline; o resto vem dos eventos publicados
+        data = snapshot(w)
+        w.journal.write({"type": "state", "version": data["version"], "ts": time.time(), "data": data})
+    emit_state(w)
+    return result
+
+def do_create_world(s: State) -> Dict[str, Any]:
+    free = [w for w in s.worlds if not w.active]
+    if not free:
+        raise OpError("max_worlds", f"Máximo de {MAX_WORLDS} mundos", 409)
+    w = free[0]
+    print(f"🌍 Criando mundo {w.id}...")
+    return do_open_world(s, w, None)
+
+def do_delete_world(s: State, w: World) -> Dict[str, Any]:
+    if w.id == 0:
+        raise OpError("protected_world", "O mundo 0 não pode ser removido", 409)
+    if not w.active:
+        raise OpError("not_found", f"Mundo {w.id} não existe", 404)
+    print(f"🗑️ Removendo mundo {w.id}...")
+    regen = s.table.regen_key(w.id)
+    keys = [s.table.key(w.id, mid) for mid in miner_ids(s, w)]
+    s.supervisor.clear(w.id)
+    s.supervisor.cancel(regen)
+    s.pool.remove_many(keys + [regen], linger=False)
+    w.checkpointer.stop()
+    w.checkpointer.active = False
+    if w.journal is not None:
+        w.journal.stop()
+    w.active = False
+    clear_world(w)
+    # Libera o histórico e os anéis de eventos; os hosts soltam os mapeamentos
+    w.history.close()
+    w.events.close()
+    s.pool.attach(w.id)
+    try:
+        os.remove(w.checkpointer.path)
+    except OSError:
+        pass
+    print(f"✅ Mundo {w.id} removido")
+    return {"id": w.id, "miners": len(keys)}
+
+def do_restore_miners(s: State, w: World, cp: Checkpoint) -> Dict[str, Any]:
+    # Cada minerador volta no mesmo id, posição e total minerado
+    restored: List[int] = []
+    skipped: List[int] = []
+    for mid, m in sorted(cp.miners.items()):
+        key = s.table.key(w.id, mid)
+        if mid >= MAX_MINERS or key in s.pool.placement:
+            skipped.append(mid)
+            continue
+        host = s.pool.add(key, x=m["x"], y=m["y"], mined=m["mined"])
+        (restored if host is not None else skipped).append(mid)
+    msg = f"♻️ {len(restored)} mineradores restaurados do checkpoint"
+    if skipped:
+        msg += f" ({len(skipped)} ignorados)"
+    print(msg)
+    push_log(w.handles(), msg, "success" if not skipped else "warning")
+    emit_state(w)
+    return {"restored": restored, "skipped": skipped}
+
+def clear_world(w: World) -> None:
+    set_running(w.handles(), False)
+    w.world.clear()
+    w.logs.clear()
+    w.counters.reset(w.lock)
+    w.deposits.fill({"minerals": w.minerals, "crystals": w.crystals})
+    w.energy.value = 100
+    w.energy_signal.ring()
+
+def do_reset(s: State, w: World) -> Dict[str, Any]:
+    print(f"🔄 Iniciando RESET do mundo {w.id}...")
     
     # Pausa execução
-    s.running.value = False
-    time.sleep(0.3)
+    set_running(w.handles(), False)
     
-    # Encerra todos os mineradores
-    for mid, proc in list(s.processes.items()):
-        print(f"  Encerrando minerador {mid}...")
-        if proc.is_alive():
-            proc.terminate()
-        proc.join(timeout=1.5)
-        if proc.is_alive():
-            proc.kill()
-        s.processes.pop(mid, None)
+    # Encerra os mineradores do mundo (hosts e regenerador continuam vivos)
+    keys = [s.table.key(w.id, mid) for mid in miner_ids(s, w)]
+    print(f"  Encerrando {len(keys)} mineradores...")
+    s.supervisor.clear(w.id)
+    s.pool.remove_many(keys, linger=False)
 
     # Limpa tudo
-    s.miners.clear()
-    s.logs[:] = []
-    s.stats["totalMined"] = 0
-    s.stats["conflicts"] = 0
-    s.stats["synchronized"] = 0
-    s.stats["energyDepleted"] = 0
-    s.minerals.value = 100
-    s.energy.value = 100
-    s.crystals.value = 50
-
-    push_log(s.handles(), "🔄 Sistema reiniciado", "info")
-    emit_state(s)
+    clear_world(w)
+
+    push_log(w.handles(), "🔄 Sistema reiniciado", "info")
+    emit_state(w)
     print("✅ RESET completo!")
-    return {"ok": True}
+    return {}
 
-@app.post("/api/miners")
-def create_miner():
-    s = init_state()
-    
-    # Limpa processos mortos
-    for mid, proc in list(s.processes.items()):
-        if not proc.is_alive():
-            s.processes.pop(mid, None)
-            if mid in s.miners:
-                try:
-                    del s.miners[mid]
-                except:
-                    pass
-    
-    active_count = len(s.processes)
-    
-    if active_count >= 6:
-        push_log(s.handles(), "⚠️ Máximo de 6 mineradores atingido", "warning")
-        emit_state(s)
-        return JSONResponse({"error": "max_miners", "message": "Máximo de 6 mineradores"}, status_code=400)
+def do_create_miner(s: State, w: World) -> Dict[str, Any]:
+    # Hosts mortos: o supervisor devolve os locks e agenda os restarts
+    s.supervisor.reap()
+    current = set(miner_ids(s, w))
+    reserved = set(s.supervisor.reserved(w.id))
+
+    active_count = len(current) + len(reserved)
+
+    if active_count >= MAX_MINERS:
+        push_log(w.handles(), f"⚠️ Máximo de {MAX_MINERS} mineradores atingido", "warning")
+        emit_state(w)
+        raise OpError("max_miners", f"Máximo de {MAX_MINERS} mineradores")
 
     # Encontra ID disponível
     new_id = 0
-    while new_id in s.processes:
+    while new_id in current or new_id in reserved:
         new_id += 1
 
-    print(f"➕ Criando minerador {new_id}...")
-    p = mp.Process(target=miner_worker, args=(new_id, s.handles(),), daemon=True)
-    p.start()
-    s.processes[new_id] = p
+    print(f"➕ Criando minerador {new_id} (mundo {w.id})...")
+    host = s.pool.add(s.table.key(w.id, new_id))
+    if host is None:
+        push_log(w.handles(), f"❌ Falha ao criar Minerador-{new_id}", "error")
+        raise OpError("host_unavailable", "Nenhum host respondeu", 503)
     
-    push_log(s.handles(), f"➕ Minerador-{new_id} criado (PID: {p.pid})", "info")
-    print(f"✅ Minerador {new_id} criado com PID {p.pid}")
+    push_log(w.handles(), f"➕ Minerador-{new_id} criado (host {host.id}, PID: {host.proc.pid})", "info")
+    print(f"✅ Minerador {new_id} criado no host {host.id} (PID {host.proc.pid})")
     
-    time.sleep(0.15)
-    emit_state(s)
-    return {"ok": True, "id": new_id, "pid": p.pid}
+    emit_state(w)
+    return {"id": new_id, "pid": host.proc.pid}
 
-@app.delete("/api/miners/{miner_id}")
-def kill_miner(miner_id: int):
-    s = init_state()
+def do_kill_miner(s: State, w: World, miner_id: int) -> Dict[str, Any]:
+    print(f"❌ Tentando matar minerador {miner_id} (mundo {w.id})")
+    print(f"   Mineradores ativos: {miner_ids(s, w)}")
+    key = s.table.key(w.id, miner_id) if 0 <= miner_id < MAX_MINERS else None
     
-    print(f"❌ Tentando matar minerador {miner_id}")
-    print(f"   Processos ativos: {list(s.processes.keys())}")
-    
-    proc = s.processes.get(miner_id)
-    if not proc:
+    if key is not None and s.supervisor.cancel(key) and key not in s.pool.placement:
+        # Aguardava restart: basta desistir dele
+        w.world.remove(miner_id)
+        push_log(w.handles(), f"❌ Minerador-{miner_id} terminado", "error")
+        emit_state(w)
+        return {"id": miner_id}
+
+    if key is None or key not in s.pool.placement:
         print(f"   Minerador {miner_id} não encontrado!")
-        return JSONResponse({"error": "not_found", "message": f"Minerador {miner_id} não existe"}, status_code=404)
-    
-    print(f"   Processo encontrado, terminando...")
-    if proc.is_alive():
-        proc.terminate()
-    proc.join(timeout=1.5)
-    if proc.is_alive():
-        proc.kill()
+        raise OpError("not_found", f"Minerador {miner_id} não existe", 404)
     
-    s.processes.pop(miner_id, None)
-    
-    # Marca como terminado
-    try:
-        if miner_id in s.miners:
-            d = dict(s.miners[miner_id])
-            d["status"] = "terminated"
-            s.miners[miner_id] = d
-            # Remove após 1s
-            time.sleep(0.5)
-            del s.miners[miner_id]
-    except:
-        pass
+    # O host encerra o minerador (libera o semáforo se estiver com ele),
+    # mostra "terminated" e remove o slot logo depois
+    if not s.pool.remove(key):
+        w.world.remove(miner_id)
     
-    push_log(s.handles(), f"❌ Minerador-{miner_id} terminado", "error")
-    emit_state(s)
+    push_log(w.handles(), f"❌ Minerador-{miner_id} terminado", "error")
+    emit_state(w)
     print(f"✅ Minerador {miner_id} encerrado")
-    return {"ok": True}
+    return {"id": miner_id}
 
-@app.get("/api/events")
-def sse_events():
-    s = init_state()
-    
-    def event_generator():
-        # Estado inicial
+def do_create_batch(s: State, w: World, count: int) -> Dict[str, Any]:
+    # Vários mineradores numa operação: todos os "add" saem juntos para os
+    # hosts, um log só e um único estado ao final
+    if count < 1:
+        raise OpError("invalid_count", "count deve ser pelo menos 1")
+    started = time.perf_counter()
+    s.supervisor.reap()
+    taken = set(miner_ids(s, w)) | set(s.supervisor.reserved(w.id))
+    free = [i for i in range(MAX_MINERS) if i not in taken][:count]
+    if not free:
+        push_log(w.handles(), f"⚠️ Máximo de {MAX_MINERS} mineradores atingido", "warning")
+        emit_state(w)
+        raise OpError("max_miners", f"Máximo de {MAX_MINERS} mineradores")
+
+    print(f"➕ Criando {len(free)} mineradores em lote (mundo {w.id})...")
+    placed = s.pool.add_many([(s.table.key(w.id, mid), None) for mid in free])
+    created = [{"id": s.table.split(k)[1], "pid": h.proc.pid} for k, h in placed.items() if h is not None]
+    failed = [s.table.split(k)[1] for k, h in placed.items() if h is None]
+    if not created:
+        push_log(w.handles(), f"❌ Falha ao criar {len(free)} mineradores", "error")
+        raise OpError("host_unavailable", "Nenhum host respondeu", 503)
+
+    elapsed = round(time.perf_counter() - started, 4)
+    msg = f"➕ {len(created)} mineradores criados em {elapsed:.3f}s"
+    if failed or len(free) < count:
+        msg += f" ({count - len(created)} não criados)"
+    push_log(w.handles(), msg, "info" if not failed else "warning")
+    print(f"✅ {msg}")
+    emit_state(w)
+    return {"requested": count, "miners": created, "failed": failed, "elapsed": elapsed}
+
+def do_kill_batch(s: State, w: World, ids: Optional[List[int]], keep: Optional[int]) -> Dict[str, Any]:
+    # `ids` explícitos, ou todos menos os `keep` de menor id
+    started = time.perf_counter()
+    current = sorted(set(miner_ids(s, w)) | set(s.supervisor.reserved(w.id)))
+    if ids is not None:
+        targets = sorted(set(ids))
+    elif keep is not None and keep >= 0:
+        targets = current[keep:]
+    else:
+        raise OpError("invalid_batch", "Informe ids ou keep")
+
+    missing = [mid for mid in targets if mid not in current]
+    targets = [mid for mid in targets if mid in current]
+    key = lambda mid: s.table.key(w.id, mid)
+    # Aguardando restart: basta desistir deles
+    waiting = [mid for mid in targets if s.supervisor.cancel(key(mid)) and key(mid) not in s.pool.placement]
+    for mid in waiting:
+        w.world.remove(mid)
+    removed = s.pool.remove_many([key(mid) for mid in targets if mid not in waiting])
+    for k, ok in removed.items():
+        if not ok:
+            w.world.remove(s.table.split(k)[1])
+
+    elapsed = round(time.perf_counter() - started, 4)
+    if targets:
+        push_log(w.handles(), f"❌ {len(targets)} mineradores terminados em {elapsed:.3f}s", "error")
+        emit_state(w)
+    print(f"✅ {len(targets)} mineradores encerrados em lote")
+    return {"removed": targets, "notFound": missing, "elapsed": elapsed}
+
+async def op_response(op: Operation, wait: bool):
+    # Sem wait: 202 com o id da operação (o resultado chega como evento "op").
+    # Com wait: espera o gerente e responde como uma chamada síncrona.
+    if wait:
         try:
-            initial = {"type": "state", "data": snapshot(s)}
-            yield f"data: {json.dumps(initial)}\n\n"
-        except Exception as e:
-            print(f"Erro ao enviar estado inicial SSE: {e}")
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(op.future)), OP_WAIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+    if op.status == "failed":
+        return JSONResponse(
+            {"error": op.error["code"], "message": op.error["message"], "op": op.id},
+            status_code=op.error["status"],
+        )
+    if op.status == "done":
+        return {"ok": True, "op": op.id, **op.result}
+    return JSONResponse({"ok": True, "op": op.id, "status": op.status}, status_code=202)
+
+@router.post("/reset")
+async def reset(world_id: int = 0, wait: bool = False):
+    s, w = init_state(), get_world(world_id)
+    op = s.lifecycle.submit("reset", lambda: do_reset(s, w), world=w.id)
+    return await op_response(op, wait)
+
+@router.post("/miners")
+async def create_miner(world_id: int = 0, wait: bool = False):
+    s, w = init_state(), get_world(world_id)
+    op = s.lifecycle.submit("create", lambda: do_create_miner(s, w), world=w.id)
+    return await op_response(op, wait)
+
+# Antes de /miners/{miner_id}, senão "batch" cairia na rota do id
+@router.post("/miners/batch")
+async def create_miners_batch(world_id: int = 0, count: int = 1, wait: bool = False):
+    s, w = init_state(), get_world(world_id)
+    op = s.lifecycle.submit("create_batch", lambda: do_create_batch(s, w, count), world=w.id)
+    return await op_response(op, wait)
+
+@router.delete("/miners/batch")
+async def kill_miners_batch(world_id: int = 0, ids: Optional[List[int]] = Query(None),
+                            keep: Optional[int] = None, wait: bool = False):
+    s, w = init_state(), get_world(world_id)
+    op = s.lifecycle.submit("kill_batch", lambda: do_kill_batch(s, w, ids, keep), world=w.id)
+    return await op_response(op, wait)
+
+@router.delete("/miners/{miner_id}")
+async def kill_miner(miner_id: int, world_id: int = 0, wait: bool = False):
+    s, w = init_state(), get_world(world_id)
+    op = s.lifecycle.submit("kill", lambda: do_kill_miner(s, w, miner_id), world=w.id)
+    return await op_response(op, wait)
+
+@app.post("/api/worlds")
+async def create_world(wait: bool = False):
+    s = init_state()
+    op = s.lifecycle.submit("create_world", lambda: do_create_world(s))
+    return await op_response(op, wait)
+
+@app.delete("/api/worlds/{world_id}")
+async def delete_world(world_id: int, wait: bool = False):
+    s, w = init_state(), get_world(world_id)
+    op = s.lifecycle.submit("delete_world", lambda: do_delete_world(s, w))
+    return await op_response(op, wait)
+
+@app.get("/api/ops/{op_id}")
+def get_op(op_id: int):
+    s = init_state()
+    op = s.lifecycle.get(op_id)
+    if op is None:
+        raise HTTPException(status_code=404, detail="operação desconhecida")
+    return op.describe()
+
+# ----------------------------
+# Profiler (sob demanda, ver profiler.py)
+# ----------------------------
+def do_start_profile(s: State, folder: str, seconds: float, interval: float, idle: bool) -> Dict[str, Any]:
+    # Cada host amostra o próprio loop e grava host-N.folded em `folder`
+    hosts = s.pool.live()
+    calls = [
+        (h, "profile", None, {"seconds": seconds, "interval": interval, "idle": idle,
+                              "path": os.path.join(folder, f"host-{h.id}.folded")})
+        for h in hosts
+    ]
+    return {"hosts": [h.id for h, ok in zip(hosts, s.pool.call_many(calls)) if ok]}
+
+def collect_profile(folder: str, hosts: List[int], timeout: float) -> Dict[int, Any]:
+    # Espera os arquivos dos hosts (host que morreu no meio fica de fora)
+    deadline = time.monotonic() + timeout
+    found: Dict[int, Any] = {}
+    while True:
+        for host_id in hosts:
+            path = os.path.join(folder, f"host-{host_id}.folded")
+            if host_id not in found and os.path.exists(path):
+                found[host_id] = load_profile(path)
+        if len(found) == len(hosts) or time.monotonic() >= deadline:
+            return found
+        time.sleep(0.05)
+
+@app.post("/api/debug/profile")
+async def debug_profile(seconds: float = 10.0, hz: float = 100.0, idle: bool = False):
+    # Amostra pilhas do pai e de todos os hosts ao mesmo tempo e devolve um
+    # único arquivo de pilhas colapsadas (flamegraph.pl, speedscope)
+    s = init_state()
+    if not 0 < seconds <= PROFILE_MAX_SECONDS or not 0 < hz <= PROFILE_MAX_HZ:
+        return JSONResponse(
+            {"error": "invalid_profile",
+             "message": f"seconds em (0, {PROFILE_MAX_SECONDS:g}] e hz em (0, {PROFILE_MAX_HZ:g}]"},
+            status_code=400,
+        )
+    if s.profiling:
+        return JSONResponse(
+            {"error": "profile_running", "message": "Já existe uma amostragem em andamento"},
+            status_code=409,
+        )
+    s.profiling = True
+    folder = tempfile.mkdtemp(prefix="mining-profile-")
+    try:
+        interval = 1.0 / hz
+        op = s.lifecycle.submit("profile", lambda: do_start_profile(s, folder, seconds, interval, idle),
+                                internal=True)
+        parent = Sampler(lambda ident, name: f"parent;{name}", interval=interval, idle=idle)
+        parent.start(seconds)
+        deadline = time.monotonic() + seconds
+        started = await asyncio.wrap_future(op.future)
+        hosts = started.result["hosts"] if started.status == "done" else []
+        await asyncio.sleep(max(0.0, deadline - time.monotonic()))
+        parent.stop()
+        # Hosts começam depois do pai (fila do gerente): a folga cobre o atraso
+        found = await run_in_threadpool(collect_profile, folder, hosts, seconds + 5.0)
+        await run_in_threadpool(parent.join, 1.0)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+        s.profiling = False
+    stacks = parent.stacks
+    for host_stacks in found.values():
+        stacks.update(host_stacks)
+    print(f"[PROFILER] {sum(stacks.values())} amostras em {seconds:g}s (hosts: {sorted(found)})")
+    return PlainTextResponse(render_profile(stacks), headers={
+        "Content-Disposition": f'attachment; filename="profile-{int(time.time())}.folded"',
+        "X-Profile-Hosts": ",".join(str(h) for h in sorted(found)),
+    })
+
+STREAM_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+# Accept que seleciona o stream binário (msgpack com prefixo de tamanho)
+BINARY_TYPES = ("application/msgpack", "application/x-msgpack")
+
+def resume_id(request: Request, last_event_id: Optional[str]) -> Optional[str]:
+    # EventSource manda o cabeçalho sozinho ao reconectar; o parâmetro serve
+    # para clientes que recriam a conexão (ou não controlam cabeçalhos)
+    return request.headers.get("last-event-id") or last_event_id
+
+async def event_stream(w: World, sub: Subscriber, encode: Callable[[Frame], bytes], heartbeat: bytes,
+                       missed: Optional[List[Frame]], head: str):
+    # Frames já vêm codificados do broadcaster: aqui só escolhemos qual forma enviar
+    try:
+        if missed is not None:
+            # Retomada: só o que o cliente perdeu, sem snapshot
+            for frame in missed:
+                yield encode(frame)
+        else:
+            # Estado inicial, com o id do último evento que ele já cobre
+            try:
+                data = await run_in_threadpool(snapshot, w)
+                frame = Frame({"type": "state", "version": data["version"], "data": data})
+                frame.stamp(0, head)
+                yield encode(frame)
+            except Exception as e:
+                print(f"Erro ao enviar estado inicial SSE: {e}")
         
         # Loop de eventos
         while True:
-            try:
-                item = s.events_queue.get(timeout=1.5)
-                yield f"data: {json.dumps(item)}\n\n"
-            except:
-                # Heartbeat
-                yield ": ping\n\n"
-    
+            frame = await sub.get(timeout=SSE_HEARTBEAT)
+            if frame is None:
+                yield heartbeat
+                continue
+            yield encode(frame)
+    finally:
+        w.broadcaster.unsubscribe(sub)
+
+@router.get("/events")
+async def sse_events(request: Request, world_id: int = 0, last_event_id: Optional[str] = None):
+    w = get_world(world_id)
+    # Inscreve antes do snapshot/replay para não perder eventos entre os dois
+    sub, missed, head = w.broadcaster.subscribe_from(resume_id(request, last_event_id))
     return StreamingResponse(
-        event_generator(),
+        event_stream(w, sub, lambda f: f.sse, b": ping\n\n", missed, head),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        }
+        headers=STREAM_HEADERS,
+    )
+
+@router.get("/events/binary")
+async def binary_events(request: Request, world_id: int = 0, last_event_id: Optional[str] = None):
+    # Mesmo stream em msgpack: cada frame é u32 big-endian (tamanho) + payload
+    accept = request.headers.get("accept", "")
+    if not any(t in accept for t in BINARY_TYPES):
+        return JSONResponse(
+            {"error": "not_acceptable", "message": "Envie Accept: application/msgpack"},
+            status_code=406,
+        )
+    if msgpack is None:
+        return JSONResponse(
+            {"error": "unavailable", "message": "msgpack não está instalado no servidor"},
+            status_code=501,
+        )
+    w = get_world(world_id)
+    sub, missed, head = w.broadcaster.subscribe_from(resume_id(request, last_event_id))
+    return StreamingResponse(
+        event_stream(w, sub, lambda f: f.binary(), BINARY_HEARTBEAT, missed, head),
+        media_type="application/msgpack",
+        headers=STREAM_HEADERS,
     )
 
+# Depois de todas as rotas do router: o mundo 0 sem prefixo e qualquer mundo por id
+app.include_router(router, prefix="/api")
+app.include_router(router, prefix="/api/worlds/{world_id}")
+
 if __name__ == "__main__":
     import uvicorn
     print("🚀 Iniciando servidor na porta 8000...")
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
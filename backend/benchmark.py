@@ -0,0 +1,369 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import psutil  # opcional: CPU/RSS por processo
+except ImportError:
+    psutil = None
+
+# ----------------------------
+# Benchmark de carga da API e do stream SSE
+# ----------------------------
+# Sobe o servidor (ou usa um já rodando com --url), conecta N assinantes em
+# /api/events e M clientes de controle que martelam /api/miners, /api/start,
+# /api/pause e /api/reset. Só biblioteca padrão (asyncio + HTTP/1.0 cru);
+# psutil é usado se estiver instalado, senão /proc no Linux.
+#
+# Mede:
+#   - latência fim a fim dos eventos (campo "ts" do produtor -> recebimento)
+#   - eventos/s e eventos perdidos (lacunas de versão nos deltas)
+#   - p50/p99 por endpoint de controle
+#   - CPU/RSS do pai e dos hosts (GET /api/processes)
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def summarize_ms(values: List[float]) -> Dict[str, Any]:
+    ms = [v * 1000.0 for v in values]
+    return {
+        "count": len(ms),
+        "p50": percentile(ms, 50),
+        "p99": percentile(ms, 99),
+        "max": max(ms) if ms else None,
+    }
+
+
+# ----------------------------
+# HTTP mínimo (HTTP/1.0: resposta termina no fechamento, sem chunked)
+# ----------------------------
+async def http_request(host: str, port: int, method: str, path: str, timeout: float = 10.0) -> Tuple[int, bytes]:
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(
+            f"{method} {path} HTTP/1.0\r\nHost: {host}\r\nContent-Length: 0\r\n\r\n".encode()
+        )
+        await writer.drain()
+        raw = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    head, _, body = raw.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1]) if head else 0
+    return status, body
+
+
+class Recorder:
+    def __init__(self):
+        self.event_latency: List[float] = []
+        self.events = 0
+        self.events_by_type: Dict[str, int] = {}
+        self.dropped = 0
+        self.subscriber_errors = 0
+        self.endpoints: Dict[str, List[float]] = {}
+        self.endpoint_errors: Dict[str, int] = {}
+        self.processes: Dict[int, Dict[str, Any]] = {}
+        # Papel -> totais do papel (soma dos processos) em cada amostra
+        self.roles: Dict[str, Dict[str, List[float]]] = {}
+
+
+async def sse_subscriber(host: str, port: int, rec: Recorder, stop: asyncio.Event) -> None:
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        rec.subscriber_errors += 1
+        return
+    writer.write(f"GET /api/events HTTP/1.0\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n".encode())
+    await writer.drain()
+    version: Optional[int] = None
+    try:
+        while not stop.is_set():
+            try:
+                line = await asyncio.wait_for(reader.readline(), 0.5)
+            except asyncio.TimeoutError:
+                continue
+            if not line:
+                rec.subscriber_errors += 1
+                break
+            if not line.startswith(b"data: "):
+                continue
+            received = time.time()
+            try:
+                item = json.loads(line[6:])
+            except ValueError:
+                continue
+            kind = item.get("type", "?")
+            rec.events += 1
+            rec.events_by_type[kind] = rec.events_by_type.get(kind, 0) + 1
+            if "ts" in item:
+                rec.event_latency.append(max(0.0, received - item["ts"]))
+            if kind == "state":
+                version = item.get("version")
+            elif kind == "delta" and version is not None:
+                gap = item["version"] - version - 1
+                if gap > 0:
+                    rec.dropped += gap
+                version = max(version, item["version"])
+    finally:
+        writer.close()
+
+
+async def control_client(host: str, port: int, rec: Recorder, stop: asyncio.Event,
+                         max_miners: int, think: float, seed: int, wait: bool) -> None:
+    rng = random.Random(seed)
+    # Pesos: criar/remover dominam; reset é raro
+    ops = [("create", 4), ("delete", 3), ("start", 2), ("pause", 1), ("reset", 0.2)]
+    names = [o for o, _ in ops]
+    weights = [w for _, w in ops]
+    while not stop.is_set():
+        op = rng.choices(names, weights)[0]
+        if op == "create":
+            method, path = "POST", "/api/miners"
+        elif op == "delete":
+            method, path = "DELETE", f"/api/miners/{rng.randrange(max(1, max_miners))}"
+        else:
+            method, path = "POST", f"/api/{op}"
+        if wait and op in ("create", "delete", "reset"):
+            # Espera a operação terminar em vez de só enfileirar (202)
+            path += "?wait=true"
+        started = time.perf_counter()
+        try:
+            status, _ = await http_request(host, port, method, path)
+        except (OSError, asyncio.TimeoutError):
+            status = 0
+        elapsed = time.perf_counter() - started
+        rec.endpoints.setdefault(op, []).append(elapsed)
+        # 400 (limite) e 404 (id inexistente) são respostas esperadas sob carga
+        if status == 0 or status >= 500:
+            rec.endpoint_errors[op] = rec.endpoint_errors.get(op, 0) + 1
+        await asyncio.sleep(think)
+
+
+# ----------------------------
+# CPU/RSS por processo
+# ----------------------------
+def _proc_times(pid: int) -> Optional[Tuple[float, int]]:
+    # (segundos de CPU, RSS em bytes)
+    if psutil is not None:
+        try:
+            p = psutil.Process(pid)
+            t = p.cpu_times()
+            return t.user + t.system, p.memory_info().rss
+        except Exception:
+            return None
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        ticks = os.sysconf("SC_CLK_TCK")
+        cpu = (int(fields[11]) + int(fields[12])) / ticks
+        rss = int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+        return cpu, rss
+    except Exception:
+        return None
+
+
+async def process_sampler(host: str, port: int, rec: Recorder, stop: asyncio.Event, interval: float) -> None:
+    last: Dict[int, Tuple[float, float]] = {}
+    while not stop.is_set():
+        try:
+            status, body = await http_request(host, port, "GET", "/api/processes")
+            procs = json.loads(body).get("processes", []) if status == 200 else []
+        except (OSError, ValueError, asyncio.TimeoutError):
+            procs = []
+        now = time.monotonic()
+        totals: Dict[str, Dict[str, float]] = {}
+        for p in procs:
+            pid = p["pid"]
+            got = _proc_times(pid)
+            if got is None:
+                continue
+            cpu, rss = got
+            entry = rec.processes.setdefault(pid, {"role": p["role"], "cpu": [], "rss": []})
+            entry["rss"].append(rss)
+            role = totals.setdefault(p["role"], {"cpu": 0.0, "rss": 0.0, "measured": 0})
+            role["rss"] += rss
+            if pid in last:
+                prev_cpu, prev_t = last[pid]
+                if now > prev_t:
+                    pct = 100.0 * (cpu - prev_cpu) / (now - prev_t)
+                    entry["cpu"].append(pct)
+                    role["cpu"] += pct
+                    role["measured"] += 1
+            last[pid] = (cpu, now)
+        for name, t in totals.items():
+            series = rec.roles.setdefault(name, {"cpu": [], "rss": []})
+            series["rss"].append(t["rss"])
+            # CPU só quando algum processo do papel já tem amostra anterior
+            if t["measured"]:
+                series["cpu"].append(t["cpu"])
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+def summarize_processes(rec: Recorder) -> Dict[str, Any]:
+    # Tudo em totais do papel: a cada amostra somam-se CPU e RSS dos processos
+    # do papel; média e máximo são sobre essas somas (máx >= média sempre)
+    roles: Dict[str, Dict[str, Any]] = {}
+    for pid, entry in rec.processes.items():
+        roles.setdefault(entry["role"], {"pids": []})["pids"].append(pid)
+    for name, role in roles.items():
+        series = rec.roles.get(name, {"cpu": [], "rss": []})
+        cpu, rss = series["cpu"], series["rss"]
+        role["cpuTotalAvgPercent"] = round(sum(cpu) / len(cpu), 2) if cpu else 0.0
+        role["cpuTotalMaxPercent"] = round(max(cpu), 2) if cpu else 0.0
+        role["rssTotalMaxMB"] = round(max(rss) / (1024 * 1024), 2) if rss else 0.0
+    return roles
+
+
+# ----------------------------
+# Servidor
+# ----------------------------
+def start_server(port: int, env: Dict[str, str], log_path: str) -> subprocess.Popen:
+    here = os.path.dirname(os.path.abspath(__file__))
+    log = open(log_path, "w")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=here,
+        env={**os.environ, **env},
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+
+
+async def wait_ready(host: str, port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            status, _ = await http_request(host, port, "GET", "/api/state", timeout=2.0)
+            if status == 200:
+                return
+        except (OSError, asyncio.TimeoutError):
+            pass
+        await asyncio.sleep(0.3)
+    raise RuntimeError("servidor não respondeu a tempo")
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    host, port = args.host, args.port
+    await wait_ready(host, port)
+
+    rec = Recorder()
+    stop = asyncio.Event()
+    await http_request(host, port, "POST", "/api/reset")
+    await http_request(host, port, "POST", "/api/start")
+
+    tasks = [asyncio.create_task(sse_subscriber(host, port, rec, stop)) for _ in range(args.subscribers)]
+    tasks += [
+        asyncio.create_task(control_client(host, port, rec, stop, args.miners, args.think, args.seed + i, args.wait))
+        for i in range(args.controllers)
+    ]
+    tasks.append(asyncio.create_task(process_sampler(host, port, rec, stop, args.sample_interval)))
+
+    started = time.monotonic()
+    await asyncio.sleep(args.duration)
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.monotonic() - started
+
+    try:
+        status, body = await http_request(host, port, "GET", "/api/state")
+        final = json.loads(body) if status == 200 else {}
+    except (OSError, ValueError, asyncio.TimeoutError):
+        final = {}
+
+    return {
+        "config": {
+            "subscribers": args.subscribers,
+            "controllers": args.controllers,
+            "duration": args.duration,
+            "think": args.think,
+            "waitOps": args.wait,
+            "maxMiners": args.miners,
+            "hosts": args.hosts,
+            "lockPolicy": args.lock_policy,
+            "stateHz": args.state_hz,
+            "psutil": psutil is not None,
+        },
+        "elapsed": round(elapsed, 3),
+        "events": {
+            "received": rec.events,
+            "perSecond": round(rec.events / elapsed, 2) if elapsed else 0.0,
+            "byType": rec.events_by_type,
+            "dropped": rec.dropped,
+            "subscriberErrors": rec.subscriber_errors,
+            "latencyMs": summarize_ms(rec.event_latency),
+        },
+        "endpoints": {
+            op: {**summarize_ms(values), "errors": rec.endpoint_errors.get(op, 0)}
+            for op, values in sorted(rec.endpoints.items())
+        },
+        "processes": summarize_processes(rec),
+        "finalStats": final.get("stats", {}),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de carga da API e do SSE")
+    parser.add_argument("--subscribers", type=int, default=20)
+    parser.add_argument("--controllers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--think", type=float, default=0.05, help="pausa entre requisições de cada cliente (s)")
+    parser.add_argument("--wait", action="store_true", help="criar/remover/resetar esperam a operação (?wait=true)")
+    parser.add_argument("--miners", type=int, default=50, help="MAX_MINERS do servidor")
+    parser.add_argument("--hosts", type=int, default=None, help="MINER_HOSTS do servidor")
+    parser.add_argument("--lock-policy", default=None)
+    parser.add_argument("--state-hz", type=float, default=None)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--url", action="store_true", help="usa um servidor já rodando em --host/--port")
+    parser.add_argument("--sample-interval", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default=None, help="arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args(argv)
+
+    proc = None
+    if not args.url:
+        env = {"MAX_MINERS": str(args.miners)}
+        if args.hosts is not None:
+            env["MINER_HOSTS"] = str(args.hosts)
+        if args.lock_policy is not None:
+            env["LOCK_POLICY"] = args.lock_policy
+        if args.state_hz is not None:
+            env["STATE_HZ"] = str(args.state_hz)
+        proc = start_server(args.port, env, os.environ.get("BENCH_SERVER_LOG", os.devnull))
+
+    try:
+        result = asyncio.run(run(args))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+        ev = result["events"]
+        print(f"✅ {ev['received']} eventos ({ev['perSecond']}/s, {ev['dropped']} perdidos) -> {args.out}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import asyncio
+import json
+import struct
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+try:
+    import msgpack  # opcional: codificação binária do stream
+except ImportError:
+    msgpack = None
+
+# ----------------------------
+# Fan-out de eventos para os clientes SSE
+# ----------------------------
+# Um único dreno lê os anéis de eventos dos produtores (event_ring.py) e
+# replica cada evento no buffer de todos os assinantes. Cada assinante tem
+# buffer próprio e limitado: se o cliente for lento, descarta primeiro o delta
+# de estado mais antigo (o cliente percebe a lacuna de versão e pede um
+# snapshot) e só depois o evento mais antigo, então logs têm prioridade.
+#
+# Cada evento é codificado uma única vez num Frame imutável (os eventos dos
+# anéis já chegam em JSON, codificados pelo produtor): os bytes SSE
+# ("data: ...\n\n") são gerados na publicação e compartilhados por todos os
+# assinantes; a versão binária (msgpack com prefixo de tamanho) só é gerada
+# quando o primeiro cliente binário pede, e também fica em cache.
+#
+# Na publicação cada frame recebe um id "<época>-<seq>" (seq cresce de 1 em 1;
+# a época muda a cada início do servidor) e entra num buffer de replay
+# limitado. Um cliente que reconecta com Last-Event-ID recebe só o que perdeu,
+# se ainda estiver no buffer; senão, recebe um snapshot novo.
+
+
+def _json_keys(value: Any) -> Any:
+    # Mesmas chaves do JSON (ids inteiros viram strings) na versão binária
+    if isinstance(value, dict):
+        return {str(k): _json_keys(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_json_keys(v) for v in value]
+    return value
+
+
+# Tipos de evento que um estado mais novo torna dispensáveis
+SUPERSEDED = ("delta",)
+
+
+class Frame:
+    __slots__ = ("item", "kind", "data", "seq", "id", "sse", "_binary")
+
+    def __init__(self, item: Optional[Dict[str, Any]], data: Optional[bytes] = None):
+        # `data`: JSON já codificado (item fica None até alguém precisar dele)
+        self.item = item
+        self.kind = item.get("type") if item is not None else None
+        self.data = json.dumps(item).encode("utf-8") if data is None else data
+        self.seq = 0
+        self.id: Optional[str] = None
+        self.sse = b"data: " + self.data + b"\n\n"
+        self._binary: Optional[bytes] = None
+
+    def stamp(self, seq: int, event_id: str) -> None:
+        # Só concatena: o JSON já foi gerado (na thread do dreno)
+        self.seq = seq
+        self.id = event_id
+        self.sse = b"id: " + event_id.encode("ascii") + b"\ndata: " + self.data + b"\n\n"
+
+    def binary(self) -> bytes:
+        # u32 big-endian com o tamanho + payload msgpack (com o id do evento)
+        if self._binary is None:
+            if self.item is None:
+                self.item = json.loads(self.data)
+            item = self.item if self.id is None else {**self.item, "id": self.id}
+            payload = msgpack.packb(_json_keys(item), use_bin_type=True)
+            self._binary = struct.pack(">I", len(payload)) + payload
+        return self._binary
+
+
+# Frame binário vazio: heartbeat do stream binário
+BINARY_HEARTBEAT = struct.pack(">I", 0)
+
+class Subscriber:
+    def __init__(self, maxsize: int):
+        self.buffer: deque = deque(maxlen=maxsize)
+        self.dropped = 0
+        self.delivered = 0
+        self._wakeup = asyncio.Event()
+
+    def push(self, item: Frame) -> None:
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+            # Cheio: sai o delta mais antigo, se houver; senão o mais antigo
+            for old in self.buffer:
+                if old.kind in SUPERSEDED:
+                    self.buffer.remove(old)
+                    break
+        self.buffer.append(item)
+        self._wakeup.set()
+
+    async def get(self, timeout: float) -> Optional[Frame]:
+        # Retorna None se nada chegar dentro do timeout (usado para heartbeat)
+        if not self.buffer:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        self.delivered += 1
+        return self.buffer.popleft()
+
+
+class Broadcaster:
+    def __init__(self, source: Any, buffer_size: int = 256, batch_size: int = 256, replay_size: int = 1024):
+        self.source = source
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.subscribers: Set[Subscriber] = set()
+        self.epoch = uuid.uuid4().hex[:8]
+        self.last_seq = 0
+        self.replay: deque = deque(maxlen=replay_size)
+        # Diário opcional (checkpoint.Journal): recebe os bytes JSON de cada evento
+        self.journal: Any = None
+        # Contabilidade para /api/metrics (só tocada no event loop)
+        self.published = 0
+        self.resumed = 0
+        self.resume_misses = 0
+        self._retired_delivered = 0
+        self._retired_dropped = 0
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        # Thread dedicada: só ela dorme esperando os produtores, nunca o threadpool das rotas
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sse-drain")
+
+    def subscribe(self) -> Subscriber:
+        sub = Subscriber(self.buffer_size)
+        self.subscribers.add(sub)
+        return sub
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.epoch}-{seq}"
+
+    def since(self, last_event_id: Optional[str]) -> Optional[List[Frame]]:
+        # Frames depois de `last_event_id`, ou None se não dá para retomar
+        # (outra época, id inválido ou já saiu do buffer)
+        if not last_event_id:
+            return None
+        epoch, _, raw = last_event_id.strip().partition("-")
+        try:
+            seq = int(raw)
+        except ValueError:
+            return None
+        if epoch != self.epoch or seq > self.last_seq:
+            return None
+        oldest = self.replay[0].seq if self.replay else self.last_seq + 1
+        if seq + 1 < oldest:
+            return None
+        return [f for f in self.replay if f.seq > seq]
+
+    def subscribe_from(self, last_event_id: Optional[str]) -> Tuple[Subscriber, Optional[List[Frame]], str]:
+        # Inscrição + replay sem await no meio (no event loop): nada se perde
+        # nem se repete entre o buffer de replay e o buffer do assinante
+        missed = self.since(last_event_id)
+        if last_event_id:
+            if missed is None:
+                self.resume_misses += 1
+            else:
+                self.resumed += 1
+        return self.subscribe(), missed, self.event_id(self.last_seq)
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        if sub in self.subscribers:
+            self.subscribers.discard(sub)
+            self._retired_delivered += sub.delivered
+            self._retired_dropped += sub.dropped
+
+    def stats(self) -> Dict[str, int]:
+        subs = list(self.subscribers)
+        return {
+            "subscribers": len(subs),
+            "published": self.published,
+            "delivered": self._retired_delivered + sum(s.delivered for s in subs),
+            "dropped": self._retired_dropped + sum(s.dropped for s in subs),
+            "resumed": self.resumed,
+            "resume_misses": self.resume_misses,
+        }
+
+    def publish(self, item: Any) -> None:
+        # Deve ser chamado apenas no event loop; aceita o evento ou um Frame pronto
+        frame = item if isinstance(item, Frame) else Frame(item)
+        self.published += 1
+        self.last_seq += 1
+        frame.stamp(self.last_seq, self.event_id(self.last_seq))
+        self.replay.append(frame)
+        if self.journal is not None:
+            self.journal.append(frame.data)
+        for sub in list(self.subscribers):
+            sub.push(frame)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._closed = False
+            self._task = asyncio.get_running_loop().create_task(self._drain())
+
+    async def stop(self) -> None:
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._executor.shutdown(wait=False)
+
+    def _get_batch(self) -> List[Frame]:
+        # Roda na thread do dreno: a montagem dos frames também sai do event loop
+        items = self.source.drain(self.batch_size)
+        if not items:
+            self.source.wait(0.5)
+            items = self.source.drain(self.batch_size)
+        return [Frame(None, data) for data in items]
+
+    async def _drain(self) -> None:
+        loop = asyncio.get_running_loop()
+        while not self._closed:
+            items = await loop.run_in_executor(self._executor, self._get_batch)
+            for item in items:
+                self.publish(item)
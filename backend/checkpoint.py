@@ -0,0 +1,350 @@
+import argparse
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# ----------------------------
+# Checkpoints do mundo e diário de eventos
+# ----------------------------
+# Checkpoint: arquivo binário pequeno (little-endian) com recursos, flag de
+# execução, estatísticas, a tabela de mineradores (posição e total minerado)
+# e a quantidade em cada depósito do mapa:
+#
+#   cabeçalho : magic "GSCK", formato (u16), salvo em (f64), versão do mundo (u64),
+#               minerals/energy/crystals (i32), running (u8), n_stats (u16), n_miners (u16)
+#   stats     : nomes (u16 tamanho + nomes separados por \0) e valores i64[n_stats]
+#   mineradores: (id u16, x f64, y f64, mined i64)[n_miners]
+#   depósitos : n_deposits (u32) e amount i32[n_deposits]  (formato 2+)
+#   crc32     : u32 de tudo que vem antes
+#
+# O formato 1 (sem depósitos) ainda é lido: os totais são repartidos pelo mapa.
+#
+# A escrita vai para "<arquivo>.tmp", faz fsync e troca com os.replace, então
+# quem lê sempre encontra o checkpoint anterior inteiro ou o novo inteiro. O
+# fsync do diretório depois da troca garante que a troca em si sobrevive a
+# uma queda.
+#
+# A captura só lê a memória compartilhada (seqlocks, sem lock de escrita) e
+# roda numa thread própria do processo-pai: mineradores e regenerador nunca
+# esperam pelo checkpoint nem pelo disco.
+#
+# Diário: cada evento publicado no stream vira uma linha JSON (os mesmos bytes
+# já codificados pelo broadcaster), gravada por outra thread. Começa com um
+# snapshot "state", então `python checkpoint.py replay` reconstrói a sessão.
+
+MAGIC = b"GSCK"
+FORMAT_VERSION = 2
+# Formatos que ainda sabemos ler
+FORMATS = (1, 2)
+
+_HEADER = struct.Struct("<4sHdQiiiBHH")
+_MINER = struct.Struct("<Hddq")
+_CRC = struct.Struct("<I")
+
+
+@dataclass
+class Checkpoint:
+    saved_at: float
+    version: int
+    resources: Dict[str, int]
+    running: bool
+    stats: Dict[str, int]
+    # id -> {"x", "y", "mined"}
+    miners: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+    # Quantidade por depósito (vazio num checkpoint do formato 1)
+    deposits: List[int] = field(default_factory=list)
+
+    def encode(self) -> bytes:
+        names = "\0".join(self.stats).encode("utf-8")
+        parts = [
+            _HEADER.pack(
+                MAGIC, FORMAT_VERSION, self.saved_at, self.version & 0xFFFFFFFFFFFFFFFF,
+                self.resources["minerals"], self.resources["energy"], self.resources["crystals"],
+                1 if self.running else 0, len(self.stats), len(self.miners),
+            ),
+            struct.pack("<H", len(names)),
+            names,
+            struct.pack(f"<{len(self.stats)}q", *self.stats.values()),
+        ]
+        for mid in sorted(self.miners):
+            m = self.miners[mid]
+            parts.append(_MINER.pack(mid, m["x"], m["y"], m["mined"]))
+        parts.append(struct.pack(f"<I{len(self.deposits)}i", len(self.deposits), *self.deposits))
+        body = b"".join(parts)
+        return body + _CRC.pack(zlib.crc32(body))
+
+    @classmethod
+    def decode(cls, raw: bytes) -> "Checkpoint":
+        if len(raw) < _HEADER.size + _CRC.size:
+            raise ValueError("checkpoint truncado")
+        body, (crc,) = raw[:-_CRC.size], _CRC.unpack(raw[-_CRC.size:])
+        if zlib.crc32(body) != crc:
+            raise ValueError("checkpoint corrompido (crc)")
+        try:
+            return cls._parse(body)
+        except (struct.error, UnicodeDecodeError) as e:
+            # crc certo, mas contagens que não batem com o tamanho do arquivo
+            raise ValueError(f"checkpoint inconsistente: {e}") from None
+
+    @classmethod
+    def _parse(cls, body: bytes) -> "Checkpoint":
+        (magic, fmt, saved_at, version, minerals, energy, crystals,
+         running, n_stats, n_miners) = _HEADER.unpack_from(body, 0)
+        if magic != MAGIC or fmt not in FORMATS:
+            raise ValueError(f"formato de checkpoint desconhecido: {magic!r} v{fmt}")
+        off = _HEADER.size
+        (names_len,) = struct.unpack_from("<H", body, off)
+        off += 2
+        names = body[off:off + names_len].decode("utf-8").split("\0") if names_len else []
+        off += names_len
+        values = struct.unpack_from(f"<{n_stats}q", body, off)
+        off += 8 * n_stats
+        miners: Dict[int, Dict[str, Any]] = {}
+        for _ in range(n_miners):
+            mid, x, y, mined = _MINER.unpack_from(body, off)
+            off += _MINER.size
+            miners[mid] = {"x": x, "y": y, "mined": mined}
+        deposits: List[int] = []
+        if fmt >= 2:
+            (n_deposits,) = struct.unpack_from("<I", body, off)
+            off += 4
+            deposits = list(struct.unpack_from(f"<{n_deposits}i", body, off))
+        return cls(
+            saved_at=saved_at,
+            version=version,
+            resources={"minerals": minerals, "energy": energy, "crystals": crystals},
+            running=bool(running),
+            stats=dict(zip(names, values)),
+            miners=miners,
+            deposits=deposits,
+        )
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "savedAt": self.saved_at,
+            "version": self.version,
+            "resources": self.resources,
+            "isRunning": self.running,
+            "stats": self.stats,
+            "miners": {str(mid): m for mid, m in self.miners.items()},
+            "deposits": self.deposits,
+        }
+
+
+def save(path: str, cp: Checkpoint) -> int:
+    # Escreve e troca atomicamente; devolve o tamanho em bytes
+    raw = cp.encode()
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(raw)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    fsync_dir(path)
+    return len(raw)
+
+
+def fsync_dir(path: str) -> None:
+    # A entrada do diretório (o novo nome) só é durável depois disto.
+    # Windows não abre diretórios: lá o os.replace já é o melhor que dá.
+    if os.name != "posix":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def load(path: str) -> Optional[Checkpoint]:
+    # None se não existe; ValueError se o arquivo é inválido
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return None
+    return Checkpoint.decode(raw)
+
+
+class Checkpointer:
+    def __init__(self, path: str, capture: Callable[[], Checkpoint], generation: Callable[[], int],
+                 interval: float = 10.0):
+        self.path = path
+        self.capture = capture
+        self.generation = generation
+        self.interval = interval
+        # Contabilidade para /api/metrics
+        self.saves = 0
+        self.failures = 0
+        self.last_bytes = 0
+        self.last_seconds = 0.0
+        self.last_saved: Optional[float] = None
+        self.active = False
+        self._last_generation: Optional[int] = None
+        self._save_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.interval > 0 and (self._thread is None or not self._thread.is_alive()):
+            self.active = True
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="checkpoint", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+
+    def _run(self) -> None:
+        print(f"[CHECKPOINT] A cada {self.interval}s em {self.path}")
+        while not self._stop.wait(self.interval):
+            self.save_now(force=False)
+
+    def save_now(self, force: bool = True) -> bool:
+        # Sem mudanças desde o último checkpoint: nada a escrever
+        with self._save_lock:
+            gen = self.generation()
+            if not force and gen == self._last_generation:
+                return False
+            started = time.perf_counter()
+            try:
+                size = save(self.path, self.capture())
+            except Exception as e:
+                self.failures += 1
+                print(f"[CHECKPOINT] Erro ao salvar {self.path}: {e}")
+                return False
+            self._last_generation = gen
+            self.saves += 1
+            self.last_bytes = size
+            self.last_seconds = time.perf_counter() - started
+            self.last_saved = time.time()
+            return True
+
+
+class Journal:
+    def __init__(self, path: str, maxsize: int = 10000):
+        self.path = path
+        self.written = 0
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=maxsize)
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="journal", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=1.0)
+            except queue.Full:
+                pass
+            self._thread.join(timeout=5.0)
+
+    def append(self, data: bytes) -> None:
+        # Chamado no event loop: nunca bloqueia (disco lento descarta linhas)
+        try:
+            self._queue.put_nowait(data)
+        except queue.Full:
+            self.dropped += 1
+
+    def write(self, item: Dict[str, Any]) -> None:
+        self.append(json.dumps(item).encode("utf-8"))
+
+    def _run(self) -> None:
+        print(f"[JOURNAL] Gravando eventos em {self.path}")
+        with open(self.path, "ab") as f:
+            while True:
+                data = self._queue.get()
+                if data is None:
+                    break
+                f.write(data + b"\n")
+                self.written += 1
+                # Descarrega quando a fila esvazia (rajadas viram uma escrita só)
+                if self._queue.empty():
+                    f.flush()
+            f.flush()
+
+
+# ----------------------------
+# Reprodução offline
+# ----------------------------
+def apply_event(state: Dict[str, Any], event: Dict[str, Any]) -> None:
+    # Mesma regra do frontend: "state" substitui, "delta" mescla valores absolutos
+    kind = event.get("type")
+    data = event.get("data") or {}
+    if kind == "state":
+        state.clear()
+        state.update({k: data.get(k) for k in ("resources", "stats", "miners", "deposits", "isRunning")})
+        state["miners"] = dict(state.get("miners") or {})
+        state["deposits"] = dict(state.get("deposits") or {})
+    elif kind == "delta":
+        for key in ("resources", "stats"):
+            if key in data:
+                state.setdefault(key, {}).update(data[key])
+        if "isRunning" in data:
+            state["isRunning"] = data["isRunning"]
+        miners = state.setdefault("miners", {})
+        for mid, fields in (data.get("miners") or {}).items():
+            miners[str(mid)] = {**miners.get(str(mid), {}), **fields}
+        for mid in data.get("removed") or []:
+            miners.pop(str(mid), None)
+        deposits = state.setdefault("deposits", {})
+        for did, fields in (data.get("deposits") or {}).items():
+            deposits[str(did)] = {**deposits.get(str(did), {}), **fields}
+    if "version" in event:
+        state["version"] = event["version"]
+
+
+def replay(path: str) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    # (evento, estado reconstruído até ele) para cada linha do diário
+    state: Dict[str, Any] = {}
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            apply_event(state, event)
+            yield event, state
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Inspeciona checkpoints e reproduz diários de eventos")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    show = sub.add_parser("show", help="mostra um checkpoint como JSON")
+    show.add_argument("path")
+    rep = sub.add_parser("replay", help="reconstrói o estado a partir de um diário")
+    rep.add_argument("path")
+    rep.add_argument("--every", type=int, default=0, help="imprime o estado a cada N eventos")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "show":
+        cp = load(args.path)
+        if cp is None:
+            raise SystemExit(f"{args.path} não existe")
+        print(json.dumps(cp.describe(), indent=2, ensure_ascii=False))
+        return
+
+    counts: Dict[str, int] = {}
+    state: Dict[str, Any] = {}
+    for n, (event, state) in enumerate(replay(args.path), start=1):
+        kind = event.get("type", "?")
+        counts[kind] = counts.get(kind, 0) + 1
+        if kind == "log":
+            print(f"[{event['data'].get('time', '')}] {event['data'].get('message', '')}")
+        if args.every and n % args.every == 0:
+            print(json.dumps(state, ensure_ascii=False))
+    print(json.dumps({"events": counts, "final": state}, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import time
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional
+
+# ----------------------------
+# Contadores fragmentados (um slot por processo por métrica)
+# ----------------------------
+# Layout do bloco de memória compartilhada:
+#
+#   header   : reset_seq (u64)   seqlock do reset (ímpar = reset em andamento)
+#   values   : i64[shards][metrics]   escritos só pelo dono do shard
+#   baseline : i64[shards][metrics]   valor de cada slot no último reset
+#
+# Incrementar é uma escrita local no próprio shard, sem lock e sem IPC. A
+# leitura soma (values - baseline) de todos os shards. O reset não zera os
+# slots (isso disputaria com os donos): copia os valores atuais para a
+# baseline dentro do seqlock, então nenhum leitor vê um reset pela metade.
+
+METRICS = [
+    "totalMined",
+    "conflicts",
+    "synchronized",
+    "energyDepleted",
+    "attempts",
+    "mineralsMined",
+    "crystalsMined",
+    "energyConsumed",
+    "conflictsGlobal",
+    "conflictsMinerals",
+    "conflictsCrystals",
+    "conflictsEnergy",
+]
+
+_METRIC_INDEX = {name: i for i, name in enumerate(METRICS)}
+
+# Shards fixos; mineradores usam MINER_SHARD_BASE + id
+PARENT_SHARD = 0
+REGEN_SHARD = 1
+MINER_SHARD_BASE = 2
+
+
+def miner_shard(miner_id: int) -> int:
+    return MINER_SHARD_BASE + miner_id
+
+
+class ShardedCounters:
+    def __init__(self, shards: int, name: Optional[str] = None):
+        self.shards = shards
+        self._owner = name is None
+        if self._owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=self._size(shards))
+            self.shm.buf[:] = bytes(len(self.shm.buf))
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self._map()
+
+    @staticmethod
+    def _size(shards: int) -> int:
+        return 8 * (1 + 2 * shards * len(METRICS))
+
+    def _map(self) -> None:
+        n = self.shards * len(METRICS)
+        buf = self.shm.buf
+        self._header = buf[0:8].cast('Q')
+        self._values = buf[8:8 + 8 * n].cast('q')
+        self._baseline = buf[8 + 8 * n:8 + 16 * n].cast('q')
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"name": self.shm.name, "shards": self.shards}
+
+    def __setstate__(self, st: Dict[str, Any]) -> None:
+        self.shards = st["shards"]
+        self._owner = False
+        self.shm = shared_memory.SharedMemory(name=st["name"])
+        self._map()
+
+    def close(self) -> None:
+        for v in (self._header, self._values, self._baseline):
+            v.release()
+        self.shm.close()
+        if self._owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    def add(self, shard: int, metric: str, delta: int = 1) -> None:
+        # Só o dono do shard chama: leitura-modificação-escrita sem disputa
+        self._values[shard * len(METRICS) + _METRIC_INDEX[metric]] += delta
+
+    def _read(self) -> List[int]:
+        while True:
+            s1 = self._header[0]
+            if s1 & 1:
+                time.sleep(0)
+                continue
+            values = self._values.tolist()
+            baseline = self._baseline.tolist()
+            if self._header[0] == s1:
+                return [v - b for v, b in zip(values, baseline)]
+
+    def totals(self) -> Dict[str, int]:
+        raw = self._read()
+        m = len(METRICS)
+        return {name: sum(raw[i::m]) for i, name in enumerate(METRICS)}
+
+    def shard_totals(self, shard: int) -> Dict[str, int]:
+        raw = self._read()
+        m = len(METRICS)
+        return dict(zip(METRICS, raw[shard * m:(shard + 1) * m]))
+
+    def reset(self, lock: Any) -> None:
+        # Resets concorrentes (vários handlers) serializam pelo lock
+        with lock:
+            self._header[0] += 1
+            try:
+                self._baseline[:] = self._values
+            finally:
+                self._header[0] += 1
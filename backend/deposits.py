@@ -0,0 +1,235 @@
+import math
+from multiprocessing import shared_memory
+from random import Random
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# ----------------------------
+# Mapa de depósitos (memória compartilhada + índice em grade)
+# ----------------------------
+# Minerais e cristais ficam em depósitos espalhados pelo campo de 700x400,
+# cada um com quantidade e capacidade próprias. O mapa é gerado no pai (semente
+# = id do mundo, então o mesmo mundo tem sempre o mesmo mapa) num único bloco:
+#
+#   x, y     : f64[n]
+#   amount   : i64[n]   quantidade atual
+#   capacity : i64[n]
+#   kind     : u8[n]    índice em KINDS
+#
+# Posição, tipo e capacidade nunca mudam; só `amount` é escrito, sempre sob o
+# lock do mp.Value agregado do tipo (h.minerals / h.crystals), que continua
+# sendo a soma dos depósitos: recursos, histórico e checkpoint não mudam de
+# significado. A disputa da mineração em si é pelo lock do depósito (ver
+# locking.py), não por esse lock de contabilidade.
+#
+# Cada processo monta o próprio índice em grade uniforme (células de `cell`
+# px por tipo) na primeira consulta: achar o depósito disponível mais
+# próximo olha só os anéis de células em volta do minerador, sem varrer o
+# mapa inteiro, então milhares de depósitos e mineradores continuam baratos.
+
+FIELD_W = 700
+FIELD_H = 400
+# Margem das bordas (mesma área onde os mineradores nascem)
+MARGIN = 25
+KINDS = ["minerals", "crystals"]
+# Capacidade de cada depósito: com o mapa padrão (5 + 5) os totais são os
+# 100 minerais e 50 cristais de sempre
+CAPACITY = {"minerals": 20, "crystals": 10}
+
+_KIND_INDEX = {name: i for i, name in enumerate(KINDS)}
+
+
+class SharedDeposits:
+    def __init__(self, count: int, seed: int = 0, cell: float = 50.0, name: Optional[str] = None):
+        self.count = count
+        self.cell = cell
+        self._owner = name is None
+        if self._owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=max(1, 33 * count))
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self._map()
+        if self._owner:
+            self._place(seed)
+
+    def _map(self) -> None:
+        n = self.count
+        buf = self.shm.buf
+        self._x = buf[0:8 * n].cast('d')
+        self._y = buf[8 * n:16 * n].cast('d')
+        self._amount = buf[16 * n:24 * n].cast('q')
+        self._capacity = buf[24 * n:32 * n].cast('q')
+        self._kind = buf[32 * n:33 * n].cast('B')
+        # Só no processo que consulta (montado sob demanda)
+        self._grid: Optional[List[List[List[int]]]] = None
+        self._cols = max(1, math.ceil(FIELD_W / self.cell))
+        self._rows = max(1, math.ceil(FIELD_H / self.cell))
+        # Cursor do regenerador por tipo (rodízio entre os depósitos)
+        self._cursor = [0] * len(KINDS)
+
+    def _place(self, seed: int) -> None:
+        rng = Random(seed)
+        for i in range(self.count):
+            kind = KINDS[i % len(KINDS)]
+            self._x[i] = MARGIN + rng.random() * (FIELD_W - 2 * MARGIN)
+            self._y[i] = MARGIN + rng.random() * (FIELD_H - 2 * MARGIN)
+            self._kind[i] = _KIND_INDEX[kind]
+            self._capacity[i] = CAPACITY[kind]
+            self._amount[i] = CAPACITY[kind]
+
+    # Pickle: apenas o nome do bloco; o processo filho reanexa
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"name": self.shm.name, "count": self.count, "cell": self.cell}
+
+    def __setstate__(self, st: Dict[str, Any]) -> None:
+        self.count = st["count"]
+        self.cell = st["cell"]
+        self._owner = False
+        self.shm = shared_memory.SharedMemory(name=st["name"])
+        self._map()
+
+    def close(self) -> None:
+        for v in (self._x, self._y, self._amount, self._capacity, self._kind):
+            v.release()
+        self.shm.close()
+        if self._owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    # ----------------------------
+    # Leitura
+    # ----------------------------
+    def kind(self, i: int) -> str:
+        return KINDS[self._kind[i]]
+
+    def position(self, i: int) -> Tuple[float, float]:
+        return self._x[i], self._y[i]
+
+    def capacity(self, kind: str) -> int:
+        # Capacidade total do tipo (teto do mp.Value agregado)
+        k = _KIND_INDEX[kind]
+        return sum(self._capacity[i] for i in range(self.count) if self._kind[i] == k)
+
+    def total(self, kind: str) -> int:
+        k = _KIND_INDEX[kind]
+        return sum(self._amount[i] for i in range(self.count) if self._kind[i] == k)
+
+    def amounts(self) -> List[int]:
+        return list(self._amount)
+
+    def layout(self) -> Dict[int, Dict[str, Any]]:
+        # Estado publicado: só `amount` muda, então os deltas carregam só ele
+        return {
+            i: {
+                "id": i,
+                "kind": KINDS[self._kind[i]],
+                "x": round(self._x[i], 1),
+                "y": round(self._y[i], 1),
+                "capacity": self._capacity[i],
+                "amount": self._amount[i],
+            }
+            for i in range(self.count)
+        }
+
+    # ----------------------------
+    # Índice em grade
+    # ----------------------------
+    def _cell_of(self, x: float, y: float) -> Tuple[int, int]:
+        cx = min(self._cols - 1, max(0, int(x // self.cell)))
+        cy = min(self._rows - 1, max(0, int(y // self.cell)))
+        return cx, cy
+
+    def _build(self) -> List[List[List[int]]]:
+        grid: List[List[List[int]]] = [[[] for _ in range(self._cols * self._rows)] for _ in KINDS]
+        for i in range(self.count):
+            cx, cy = self._cell_of(self._x[i], self._y[i])
+            grid[self._kind[i]][cy * self._cols + cx].append(i)
+        return grid
+
+    def nearest(self, kind: str, x: float, y: float,
+                available: Optional[Callable[[int], bool]] = None) -> Optional[int]:
+        # Depósito mais próximo do tipo com recurso (ou que passe em `available`).
+        # Percorre anéis de células em volta de (x, y) e para quando o anel
+        # seguinte já não pode ter nada mais perto que o melhor encontrado.
+        if self._grid is None:
+            self._grid = self._build()
+        cells = self._grid[_KIND_INDEX[kind]]
+        ok = available or (lambda i: self._amount[i] > 0)
+        cx, cy = self._cell_of(x, y)
+        best, best_d = None, math.inf
+        for r in range(max(self._cols, self._rows)):
+            if best is not None and ((r - 1) * self.cell) ** 2 >= best_d:
+                break
+            for i, j in self._ring(cx, cy, r):
+                for d in cells[j * self._cols + i]:
+                    dist = (self._x[d] - x) ** 2 + (self._y[d] - y) ** 2
+                    if dist < best_d and ok(d):
+                        best, best_d = d, dist
+        return best
+
+    def _ring(self, cx: int, cy: int, r: int) -> List[Tuple[int, int]]:
+        # Células na borda do quadrado de raio r (distância de Chebyshev)
+        if r == 0:
+            return [(cx, cy)]
+        out = []
+        for i in range(cx - r, cx + r + 1):
+            out.append((i, cy - r))
+            out.append((i, cy + r))
+        for j in range(cy - r + 1, cy + r):
+            out.append((cx - r, j))
+            out.append((cx + r, j))
+        return [(i, j) for i, j in out if 0 <= i < self._cols and 0 <= j < self._rows]
+
+    # ----------------------------
+    # Escrita (sempre sob o lock do agregado do tipo)
+    # ----------------------------
+    def take(self, i: int, amount: int, total: Any) -> int:
+        # Retira até `amount` do depósito; devolve o retirado
+        with total.get_lock():
+            got = min(amount, self._amount[i])
+            self._amount[i] -= got
+            total.value -= got
+            return got
+
+    def grow(self, kind: str, amount: int, total: Any) -> int:
+        # Regenerador (único chamador): próximo depósito não cheio do tipo
+        k = _KIND_INDEX[kind]
+        with total.get_lock():
+            for step in range(self.count):
+                i = (self._cursor[k] + step) % self.count
+                if self._kind[i] == k and self._amount[i] < self._capacity[i]:
+                    self._cursor[k] = i + 1
+                    got = min(amount, self._capacity[i] - self._amount[i])
+                    self._amount[i] += got
+                    total.value += got
+                    return got
+            return 0
+
+    def fill(self, totals: Dict[str, Any]) -> None:
+        # Mapa cheio (reset); `totals`: tipo -> mp.Value agregado
+        for kind, total in totals.items():
+            k = _KIND_INDEX[kind]
+            with total.get_lock():
+                for i in range(self.count):
+                    if self._kind[i] == k:
+                        self._amount[i] = self._capacity[i]
+                total.value = self.total(kind)
+
+    def restore(self, amounts: List[int], totals: Dict[str, Any]) -> None:
+        # Checkpoint com outro número de depósitos (mapa mudou): reparte o total
+        # salvo de cada tipo pelos depósitos atuais, enchendo em ordem
+        if len(amounts) == self.count:
+            for i, a in enumerate(amounts):
+                self._amount[i] = min(self._capacity[i], max(0, a))
+        else:
+            for kind, total in totals.items():
+                k = _KIND_INDEX[kind]
+                left = total.value
+                for i in range(self.count):
+                    if self._kind[i] == k:
+                        self._amount[i] = min(self._capacity[i], max(0, left))
+                        left -= self._amount[i]
+        for kind, total in totals.items():
+            with total.get_lock():
+                total.value = self.total(kind)
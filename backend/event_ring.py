@@ -0,0 +1,263 @@
+import multiprocessing as mp
+import threading
+from collections import deque
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional
+
+from counters import PARENT_SHARD, REGEN_SHARD, MINER_SHARD_BASE
+
+# ----------------------------
+# Transporte de eventos: um anel SPSC por produtor
+# ----------------------------
+# Cada produtor (o regenerador e cada minerador, pelo shard) escreve só no
+# próprio anel em memória compartilhada e o dreno do pai é o único leitor:
+# nenhum pipe, lock ou thread alimentadora é disputado entre produtores.
+#
+#   header : waiting (u64)  o leitor marca antes de dormir no semáforo
+#   anel   : head, tail, written, dropped (u64)  head/written/dropped só o
+#            produtor escreve, tail só o leitor
+#   slots  : cap x (tamanho u32 + até SLOT_BYTES de JSON)
+#
+# O evento é codificado em JSON uma única vez, pelo produtor; o pai monta o
+# Frame direto desses bytes. Anel cheio descarta o evento novo e conta no
+# próprio anel: a perda aparece por produtor em /api/metrics em vez de sumir.
+# Logs descartados continuam no anel de logs (GET /api/logs?after=).
+#
+# O pai (várias threads) não passa pela memória compartilhada: usa uma fila
+# local com lock, drenada junto com os anéis.
+#
+# O bloco só existe com o mundo aberto (com 1000 mineradores são ~33 MB por
+# mundo): o objeto e o semáforo nascem com o slot, o pai cria o bloco em
+# allocate() e o remove em close(); hosts já criados recebem o nome por
+# attach(). Sem bloco, só a fila local do pai funciona.
+
+SLOT_BYTES = 508
+_SLOT = 4 + SLOT_BYTES
+_RING_WORDS = 4  # head, tail, written, dropped
+
+
+def producer_name(shard: int) -> str:
+    if shard == PARENT_SHARD:
+        return "parent"
+    if shard == REGEN_SHARD:
+        return "regenerator"
+    return f"miner-{shard - MINER_SHARD_BASE}"
+
+
+class EventRings:
+    def __init__(self, producers: int, capacity: int = 64, parent_capacity: int = 1024,
+                 name: Optional[str] = None, bell: Any = None, allocate: bool = True):
+        self.producers = producers
+        self.capacity = capacity
+        # O pai produz rajadas (ex.: supervisor reiniciando um host inteiro)
+        self.parent_capacity = parent_capacity
+        self.bell = mp.Semaphore(0) if bell is None else bell
+        self._owner = name is None
+        self.shm: Optional[shared_memory.SharedMemory] = None
+        self._init_local()
+        if name is not None:
+            self.attach(name)
+        elif allocate:
+            self.allocate()
+
+    @staticmethod
+    def _size(producers: int, capacity: int) -> int:
+        return 8 * (1 + producers * _RING_WORDS) + producers * capacity * _SLOT
+
+    def _map(self) -> None:
+        buf = self.shm.buf
+        n = 1 + self.producers * _RING_WORDS
+        self._words = buf[0:8 * n].cast('Q')
+        self._slots = buf[8 * n:]
+        self._next = 0
+
+    def _init_local(self) -> None:
+        # Fila do pai (só usada no processo-pai) e a trava do mapeamento do
+        # bloco contra o dreno, que roda em outra thread
+        self._local: deque = deque()
+        self._local_lock = threading.Lock()
+        self._map_lock = threading.Lock()
+        self.local_written = 0
+        self.local_dropped = 0
+
+    # Pickle: nome do bloco (None se o mundo está fechado) e semáforo (este só
+    # na criação do processo)
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"name": self.name, "producers": self.producers, "capacity": self.capacity,
+                "parent_capacity": self.parent_capacity, "bell": self.bell}
+
+    def __setstate__(self, st: Dict[str, Any]) -> None:
+        self.producers = st["producers"]
+        self.capacity = st["capacity"]
+        self.parent_capacity = st["parent_capacity"]
+        self.bell = st["bell"]
+        self._owner = False
+        self.shm = None
+        self._init_local()
+        try:
+            self.attach(st["name"])
+        except FileNotFoundError:
+            # Mundo removido enquanto o processo nascia: fica sem bloco
+            pass
+
+    @property
+    def name(self) -> Optional[str]:
+        return self.shm.name if self.shm is not None else None
+
+    def allocate(self) -> None:
+        # Pai, ao abrir o mundo. Páginas zeradas pelo SO e só ocupadas ao serem escritas
+        with self._map_lock:
+            if self.shm is None:
+                self.shm = shared_memory.SharedMemory(create=True, size=self._size(self.producers, self.capacity))
+                self._map()
+
+    def attach(self, name: Optional[str]) -> None:
+        # Host: passa a usar o bloco `name` (None solta o atual)
+        with self._map_lock:
+            if self.name == name:
+                return
+            self._unmap()
+            if name is not None:
+                self.shm = shared_memory.SharedMemory(name=name)
+                self._map()
+
+    def close(self) -> None:
+        with self._map_lock:
+            self._unmap()
+
+    def _unmap(self) -> None:
+        if self.shm is None:
+            return
+        self._words.release()
+        self._slots.release()
+        self.shm.close()
+        if self._owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+        self.shm = None
+
+    # ----------------------------
+    # Produtores
+    # ----------------------------
+    def put(self, shard: int, data: bytes) -> bool:
+        if shard == PARENT_SHARD:
+            with self._local_lock:
+                if len(self._local) >= self.parent_capacity:
+                    self.local_dropped += 1
+                    return False
+                self._local.append(data)
+                self.local_written += 1
+            with self._map_lock:
+                if self.shm is not None:
+                    self._notify()
+            return True
+        if self.shm is None:
+            return False
+        w = self._words
+        base = 1 + shard * _RING_WORDS
+        head = w[base]
+        if len(data) > SLOT_BYTES or head - w[base + 1] >= self.capacity:
+            w[base + 3] += 1
+            return False
+        off = (shard * self.capacity + head % self.capacity) * _SLOT
+        self._slots[off:off + 4] = len(data).to_bytes(4, "little")
+        self._slots[off + 4:off + 4 + len(data)] = data
+        # Publica o slot só depois de escrito
+        w[base] = head + 1
+        w[base + 2] += 1
+        self._notify()
+        return True
+
+    def _notify(self) -> None:
+        if self._words[0]:
+            self._words[0] = 0
+            self.bell.release()
+
+    # ----------------------------
+    # Leitor (thread de dreno do pai)
+    # ----------------------------
+    def pending(self) -> bool:
+        with self._map_lock:
+            return self._pending()
+
+    def _pending(self) -> bool:
+        if self._local:
+            return True
+        if self.shm is None:
+            return False
+        w = self._words
+        for shard in range(1, self.producers):
+            base = 1 + shard * _RING_WORDS
+            if w[base] != w[base + 1]:
+                return True
+        return False
+
+    def wait(self, timeout: float) -> None:
+        # Dorme até algum produtor escrever (ou timeout)
+        with self._map_lock:
+            if self._pending():
+                return
+            if self.shm is not None:
+                self._words[0] = 1
+                # Marca antes de reler: quem escrever depois dá release
+                if self._pending():
+                    self._words[0] = 0
+                    return
+        self.bell.acquire(timeout=timeout)
+        with self._map_lock:
+            if self.shm is not None:
+                self._words[0] = 0
+
+    def drain(self, limit: int) -> List[bytes]:
+        # Eventos do pai primeiro; os anéis em rodízio, para um produtor
+        # agitado não atrasar sempre os mesmos
+        out: List[bytes] = []
+        with self._local_lock:
+            while self._local and len(out) < limit:
+                out.append(self._local.popleft())
+        with self._map_lock:
+            if self.shm is not None:
+                self._drain_rings(out, limit)
+        return out
+
+    def _drain_rings(self, out: List[bytes], limit: int) -> None:
+        w = self._words
+        rings = self.producers - 1
+        start = self._next
+        for step in range(rings):
+            if len(out) >= limit:
+                break
+            shard = 1 + (start + step) % rings
+            base = 1 + shard * _RING_WORDS
+            tail, head = w[base + 1], w[base]
+            while tail < head and len(out) < limit:
+                off = (shard * self.capacity + tail % self.capacity) * _SLOT
+                size = int.from_bytes(self._slots[off:off + 4], "little")
+                out.append(bytes(self._slots[off + 4:off + 4 + size]))
+                tail += 1
+            w[base + 1] = tail
+        self._next = (start + 1) % rings
+
+    # ----------------------------
+    # Contabilidade
+    # ----------------------------
+    def stats(self) -> Dict[int, Dict[str, int]]:
+        # shard -> {"written", "dropped"} dos produtores que já escreveram algo
+        out = {PARENT_SHARD: {"written": self.local_written, "dropped": self.local_dropped}}
+        with self._map_lock:
+            if self.shm is not None:
+                self._ring_stats(out)
+        return out
+
+    def _ring_stats(self, out: Dict[int, Dict[str, int]]) -> None:
+        w = self._words
+        for shard in range(1, self.producers):
+            base = 1 + shard * _RING_WORDS
+            if w[base + 2] or w[base + 3]:
+                out[shard] = {"written": w[base + 2], "dropped": w[base + 3]}
+
+    def totals(self) -> Dict[str, int]:
+        stats = self.stats().values()
+        return {"written": sum(s["written"] for s in stats), "dropped": sum(s["dropped"] for s in stats)}
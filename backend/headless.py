@@ -0,0 +1,309 @@
+import argparse
+import json
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from counters import METRICS
+from locking import CONFLICT_METRICS, LOCK_POLICIES
+
+# ----------------------------
+# Motor de simulação headless (vetorizado)
+# ----------------------------
+# Mesmas regras de miner_actor/regenerator_actor, sem processos nem
+# time.sleep: um relógio simulado avança em passos de `dt` e todos os
+# mineradores são tratados de uma vez como arrays NumPy, com RNG semeado.
+# Uma hora simulada com milhares de mineradores roda em segundos, o que
+# serve para planejar capacidade e calibrar regeneração x consumo.
+#
+# Aproximações em relação ao servidor:
+#   - decisões tomadas no mesmo passo enxergam a energia do início do passo;
+#   - a espera pelo lock é resolvida a cada passo (o servidor tenta a cada
+#     SEM_POLL); entre os que esperam, os contemplados são sorteados;
+#   - o lock de energia de striped/kpermit é tratado como instantâneo.
+#   - não há mapa: cada tipo é um único depósito agregado (os locks de
+#     depósito de striped/kpermit viram um lock por tipo).
+
+READY, WAITING, MINING, STARVED = 0, 1, 2, 3
+MINERALS, CRYSTALS = 0, 1
+
+
+@dataclass
+class Rules:
+    attempt_prob: float = 0.7
+    minerals_prob: float = 0.6
+    mineral_yield: int = 5
+    crystal_yield: int = 3
+    mineral_energy: int = 5
+    crystal_energy: int = 8
+    regen_interval: float = 0.25
+    regen_minerals: int = 1
+    regen_energy: int = 2
+    regen_crystals: int = 1
+    crystal_every: int = 5
+    max_minerals: int = 100
+    max_energy: int = 100
+    max_crystals: int = 50
+    start_minerals: int = 100
+    start_energy: int = 100
+    start_crystals: int = 50
+    lock_timeout: float = 1.0
+    depleted_log_prob: float = 0.15
+
+
+class HeadlessSim:
+    def __init__(self, miners: int, policy: str = "single", permits: int = 2,
+                 seed: Optional[int] = None, dt: float = 0.05, rules: Optional[Rules] = None):
+        if policy not in LOCK_POLICIES:
+            raise ValueError(f"política de lock desconhecida: {policy}")
+        self.n = miners
+        self.policy = policy
+        self.dt = dt
+        self.rules = rules or Rules()
+        self.rng = np.random.default_rng(seed)
+        self.seed = seed
+
+        # Locks de depósito: índice por alvo (minerais, cristais)
+        if policy == "single":
+            self.lock_names = ["global"]
+            self.lock_of_target = np.array([0, 0], dtype=np.int64)
+            self.capacity = np.array([1], dtype=np.int64)
+        else:
+            k = max(1, permits) if policy == "kpermit" else 1
+            self.lock_names = ["minerals", "crystals"]
+            self.lock_of_target = np.array([0, 1], dtype=np.int64)
+            self.capacity = np.array([k, k], dtype=np.int64)
+        self.holders = np.zeros(len(self.lock_names), dtype=np.int64)
+
+        r = self.rules
+        self.clock = 0.0
+        self.regen_tick = 0
+        self.next_regen = r.regen_interval
+        self.minerals = r.start_minerals
+        self.energy = r.start_energy
+        self.crystals = r.start_crystals
+        self.stats: Dict[str, int] = {k: 0 for k in METRICS}
+
+        self.phase = np.full(miners, READY, dtype=np.int8)
+        self.wake = self.rng.uniform(0.0, 0.5, miners)
+        self.deadline = np.zeros(miners)
+        self.target = np.zeros(miners, dtype=np.int8)
+        self.lock = np.zeros(miners, dtype=np.int64)
+        self.mined = np.zeros(miners, dtype=np.int64)
+
+    # ----------------------------
+    # Regras
+    # ----------------------------
+    def _regen(self, t: float) -> None:
+        r = self.rules
+        self.regen_tick += 1
+        self.minerals = min(r.max_minerals, self.minerals + r.regen_minerals)
+        before = self.energy
+        self.energy = min(r.max_energy, self.energy + r.regen_energy)
+        # Como o sinal de energia do servidor: cruzou um limiar, todos os
+        # parados por falta de energia voltam a sortear a próxima ação
+        if any(before < need <= self.energy for need in (r.mineral_energy, r.crystal_energy)):
+            starved = np.flatnonzero(self.phase == STARVED)
+            self.phase[starved] = READY
+            self.wake[starved] = t
+        if self.regen_tick % r.crystal_every == 0:
+            self.crystals = min(r.max_crystals, self.crystals + r.regen_crystals)
+
+    def _pause(self, count: int, low: float, high: float) -> np.ndarray:
+        return self.rng.uniform(low, high, count)
+
+    def _decide(self, ready: np.ndarray, t: float) -> np.ndarray:
+        # Mineradores livres sorteiam a próxima ação; devolve os que vão esperar lock
+        r = self.rules
+        n = ready.size
+        attempt = self.rng.random(n) < r.attempt_prob
+        target = np.where(self.rng.random(n) < r.minerals_prob, MINERALS, CRYSTALS).astype(np.int8)
+        needed = np.where(target == MINERALS, r.mineral_energy, r.crystal_energy)
+
+        idle = ready[~attempt]
+        self.wake[idle] = t + self._pause(idle.size, 0.5, 1.2)
+
+        starving = attempt & (self.energy < needed)
+        starved = ready[starving]
+        if starved.size:
+            self.stats["energyDepleted"] += int((self.rng.random(starved.size) < r.depleted_log_prob).sum())
+            self.phase[starved] = STARVED
+            self.wake[starved] = np.inf
+
+        go = attempt & ~starving
+        waiting = ready[go]
+        self.stats["attempts"] += int(waiting.size)
+        self.phase[waiting] = WAITING
+        self.target[waiting] = target[go]
+        self.lock[waiting] = self.lock_of_target[target[go]]
+        self.deadline[waiting] = t + r.lock_timeout
+        self.wake[waiting] = t
+        return waiting
+
+    def _grant(self, waiting: np.ndarray, t: float) -> None:
+        for li, name in enumerate(self.lock_names):
+            queue = waiting[self.lock[waiting] == li]
+            if not queue.size:
+                continue
+            free = int(self.capacity[li] - self.holders[li])
+            if free > 0:
+                take = min(free, queue.size)
+                order = self.rng.permutation(queue.size)
+                granted = queue[order[:take]]
+                queue = queue[order[take:]]
+                self.phase[granted] = MINING
+                self.wake[granted] = t + self._pause(granted.size, 0.4, 0.9)
+                self.holders[li] += take
+            expired = queue[self.deadline[queue] <= t]
+            if expired.size:
+                self.stats["conflicts"] += int(expired.size)
+                self.stats[CONFLICT_METRICS[name]] += int(expired.size)
+                self.phase[expired] = READY
+                self.wake[expired] = t + self._pause(expired.size, 0.4, 0.9)
+
+    def _finish(self, done: np.ndarray, t: float) -> None:
+        # Poucos por passo (limitado pelas permissões): laço em ordem aleatória
+        r = self.rules
+        for i in done[self.rng.permutation(done.size)]:
+            if self.target[i] == MINERALS:
+                needed, stock = r.mineral_energy, self.minerals
+            else:
+                needed, stock = r.crystal_energy, self.crystals
+            if self.energy < needed:
+                self.stats["energyDepleted"] += 1
+            elif stock > 0:
+                if self.target[i] == MINERALS:
+                    delta = min(r.mineral_yield, self.minerals)
+                    self.minerals -= delta
+                    self.stats["mineralsMined"] += delta
+                else:
+                    delta = min(r.crystal_yield, self.crystals)
+                    self.crystals -= delta
+                    self.stats["crystalsMined"] += delta
+                spent = min(needed, self.energy)
+                self.energy -= spent
+                self.stats["energyConsumed"] += spent
+                self.stats["totalMined"] += delta
+                self.stats["synchronized"] += 1
+                self.mined[i] += delta
+        np.subtract.at(self.holders, self.lock[done], 1)
+        self.phase[done] = READY
+        self.wake[done] = t + self._pause(done.size, 0.5, 1.2)
+
+    # ----------------------------
+    # Relógio simulado
+    # ----------------------------
+    def step(self) -> None:
+        t = self.clock = self.clock + self.dt
+        while self.next_regen <= t:
+            self._regen(self.next_regen)
+            self.next_regen += self.rules.regen_interval
+
+        due = np.flatnonzero(self.wake <= t)
+        if not due.size:
+            return
+        phase = self.phase[due]
+        done = due[phase == MINING]
+        if done.size:
+            self._finish(done, t)
+        waiting = due[phase == WAITING]
+        ready = due[phase == READY]
+        if ready.size:
+            waiting = np.concatenate([waiting, self._decide(ready, t)])
+        if waiting.size:
+            self._grant(waiting, t)
+
+    def run(self, seconds: float, sample_every: Optional[float] = None) -> List[Dict[str, Any]]:
+        samples: List[Dict[str, Any]] = []
+        next_sample = self.clock
+        end = self.clock + seconds
+        while self.clock < end:
+            if sample_every and self.clock >= next_sample:
+                samples.append(self.sample())
+                next_sample += sample_every
+            self.step()
+        if sample_every:
+            samples.append(self.sample())
+        return samples
+
+    def sample(self) -> Dict[str, Any]:
+        return {
+            "t": round(self.clock, 3),
+            "minerals": self.minerals,
+            "energy": self.energy,
+            "crystals": self.crystals,
+            "totalMined": self.stats["totalMined"],
+            "conflicts": self.stats["conflicts"],
+        }
+
+    def result(self) -> Dict[str, Any]:
+        # Mesmo esquema de resources/stats de GET /api/state
+        return {
+            "resources": {
+                "minerals": int(self.minerals),
+                "energy": int(self.energy),
+                "crystals": int(self.crystals),
+            },
+            "stats": {k: int(v) for k, v in self.stats.items()},
+            "isRunning": False,
+            "miners": {
+                "count": self.n,
+                "minMined": int(self.mined.min()) if self.n else 0,
+                "meanMined": float(self.mined.mean()) if self.n else 0.0,
+                "maxMined": int(self.mined.max()) if self.n else 0,
+            },
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Simulação headless da mineração")
+    parser.add_argument("--miners", type=int, default=1000)
+    parser.add_argument("--hours", type=float, default=1.0)
+    parser.add_argument("--policy", choices=LOCK_POLICIES, default="single")
+    parser.add_argument("--permits", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--dt", type=float, default=0.05, help="passo do relógio simulado (s)")
+    parser.add_argument("--sample", type=float, default=None, help="intervalo de amostragem (s simulados)")
+    parser.add_argument("--regen-energy", type=int, default=None)
+    parser.add_argument("--regen-minerals", type=int, default=None)
+    parser.add_argument("--out", default=None, help="arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args(argv)
+
+    rules = Rules()
+    if args.regen_energy is not None:
+        rules.regen_energy = args.regen_energy
+    if args.regen_minerals is not None:
+        rules.regen_minerals = args.regen_minerals
+
+    sim = HeadlessSim(args.miners, args.policy, args.permits, args.seed, args.dt, rules)
+    started = time.perf_counter()
+    samples = sim.run(args.hours * 3600, args.sample)
+    elapsed = time.perf_counter() - started
+
+    out = sim.result()
+    out["sim"] = {
+        "miners": args.miners,
+        "simulatedSeconds": args.hours * 3600,
+        "wallSeconds": round(elapsed, 3),
+        "policy": args.policy,
+        "permits": args.permits,
+        "seed": args.seed,
+        "dt": args.dt,
+        "rules": asdict(rules),
+    }
+    if samples:
+        out["samples"] = samples
+
+    text = json.dumps(out, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"✅ {args.hours}h simuladas em {elapsed:.2f}s -> {args.out}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+import math
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# ----------------------------
+# Histórico em memória compartilhada (anéis em várias resoluções)
+# ----------------------------
+# Cada nível é um anel de pontos com passo fixo: o nível 0 guarda a amostra
+# crua de cada tick do regenerador; os demais guardam min/max/média de
+# `fator` ticks seguidos. Layout do bloco:
+#
+#   header : head (u64) por nível, pontos já escritos (o ponto i fica no slot i % cap)
+#   nível  : ts f64[cap]; valores f64[séries][k][cap] (k = 1 no nível 0,
+#            3 = min/max/média nos demais). Colunas por série: ler uma série
+#            é copiar fatias contíguas.
+#
+# Um único escritor por mundo (o regenerador, a cada tick): os agregados em
+# andamento ficam no próprio ator (Recorder), sem IPC por amostra. O leitor
+# não trava: copia as colunas e relê o head; pontos sobrescritos durante a
+# cópia (índice <= head - cap) são descartados, como no anel de logs.
+#
+# O bloco só existe com o mundo aberto (com 1000 mineradores e os níveis
+# padrão são ~115 MB por mundo): o pai o cria em allocate() ao abrir o mundo
+# e o remove em close(); hosts já criados recebem o nome por attach(). Um
+# mundo reaberto começa com o histórico vazio.
+
+ROLLUP = ["min", "max", "mean"]
+
+
+def parse_levels(spec: str, tick: float) -> List[Tuple[int, int]]:
+    # "0.25:300,5:21600" (passo:janela em segundos) -> [(fator em ticks, pontos)]
+    levels: List[Tuple[int, int]] = []
+    for part in spec.split(","):
+        step_s, span_s = part.split(":")
+        factor = max(1, round(float(step_s) / tick))
+        levels.append((factor, max(1, math.ceil(float(span_s) / (factor * tick)))))
+    levels.sort()
+    if levels[0][0] != 1:
+        # O nível cru sempre existe: é dele que saem os agregados
+        levels.insert(0, (1, levels[0][0]))
+    return levels
+
+
+class SharedHistory:
+    def __init__(self, series: Sequence[str], levels: List[Tuple[int, int]], tick: float,
+                 name: Optional[str] = None, allocate: bool = True):
+        self.series = list(series)
+        self.levels = levels
+        self.tick = tick
+        self._index = {s: i for i, s in enumerate(self.series)}
+        self._owner = name is None
+        self.shm: Optional[shared_memory.SharedMemory] = None
+        # Mapeamento do bloco x leituras do pai (threads das rotas)
+        self._map_lock = threading.Lock()
+        if name is not None:
+            self.attach(name)
+        elif allocate:
+            self.allocate()
+
+    def _width(self, level: int) -> int:
+        return 1 if level == 0 else len(ROLLUP)
+
+    def _size(self) -> int:
+        words = len(self.levels)
+        for lv, (_, cap) in enumerate(self.levels):
+            words += cap * (1 + len(self.series) * self._width(lv))
+        return 8 * words
+
+    def _map(self) -> None:
+        buf = self.shm.buf
+        n = len(self.levels)
+        self._heads = buf[0:8 * n].cast('Q')
+        off = 8 * n
+        self._ts = []
+        self._values = []
+        for lv, (_, cap) in enumerate(self.levels):
+            self._ts.append(buf[off:off + 8 * cap].cast('d'))
+            off += 8 * cap
+            words = cap * len(self.series) * self._width(lv)
+            self._values.append(buf[off:off + 8 * words].cast('d'))
+            off += 8 * words
+
+    # Pickle: apenas o nome do bloco (None se o mundo está fechado); o
+    # processo filho reanexa
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"name": self.name, "series": self.series, "levels": self.levels, "tick": self.tick}
+
+    def __setstate__(self, st: Dict[str, Any]) -> None:
+        self.series = st["series"]
+        self.levels = st["levels"]
+        self.tick = st["tick"]
+        self._index = {s: i for i, s in enumerate(self.series)}
+        self._owner = False
+        self.shm = None
+        self._map_lock = threading.Lock()
+        try:
+            self.attach(st["name"])
+        except FileNotFoundError:
+            # Mundo removido enquanto o processo nascia: fica sem bloco
+            pass
+
+    @property
+    def name(self) -> Optional[str]:
+        return self.shm.name if self.shm is not None else None
+
+    def allocate(self) -> None:
+        # Pai, ao abrir o mundo. Páginas zeradas pelo SO e só ocupadas ao serem escritas
+        with self._map_lock:
+            if self.shm is None:
+                self.shm = shared_memory.SharedMemory(create=True, size=self._size())
+                self._map()
+
+    def attach(self, name: Optional[str]) -> None:
+        # Host: passa a usar o bloco `name` (None solta o atual)
+        with self._map_lock:
+            if self.name == name:
+                return
+            self._unmap()
+            if name is not None:
+                self.shm = shared_memory.SharedMemory(name=name)
+                self._map()
+
+    def close(self) -> None:
+        # Só com o escritor parado (mundo removido ou servidor encerrando)
+        with self._map_lock:
+            self._unmap()
+
+    def _unmap(self) -> None:
+        if self.shm is None:
+            return
+        for v in [self._heads] + self._ts + self._values:
+            v.release()
+        self.shm.close()
+        if self._owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+        self.shm = None
+
+    def step(self, level: int) -> float:
+        return self.levels[level][0] * self.tick
+
+    # ----------------------------
+    # Escrita (só o regenerador do mundo)
+    # ----------------------------
+    def recorder(self) -> "Recorder":
+        return Recorder(self)
+
+    def _write(self, level: int, ts: float, columns: List[List[float]]) -> None:
+        # columns[k][série]
+        cap = self.levels[level][1]
+        head = self._heads[level]
+        slot = head % cap
+        values = self._values[level]
+        for k, column in enumerate(columns):
+            for i, v in enumerate(column):
+                values[(i * len(columns) + k) * cap + slot] = v
+        self._ts[level][slot] = ts
+        self._heads[level] = head + 1
+
+    # ----------------------------
+    # Leitura (pai, sem lock entre processos)
+    # ----------------------------
+    def pick(self, window: float, step: Optional[float]) -> int:
+        # Nível mais fino que cobre a janela, entre os de passo <= step pedido
+        levels = list(range(len(self.levels)))
+        if step is not None:
+            levels = [lv for lv in levels if self.step(lv) <= step] or [0]
+        for lv in levels:
+            if self.step(lv) * self.levels[lv][1] >= window:
+                return lv
+        return levels[-1]
+
+    def read(self, series: List[str], window: float, step: Optional[float] = None) -> Dict[str, Any]:
+        level = self.pick(window, step)
+        factor, cap = self.levels[level]
+        lv_step = factor * self.tick
+        width = self._width(level)
+        want = min(cap, max(1, math.ceil(window / lv_step)))
+
+        with self._map_lock:
+            if self.shm is None:
+                # Mundo fechado entre a validação da rota e a leitura
+                first = drop = 0
+                ts: List[float] = []
+                cols: Dict[str, List[List[float]]] = {name: [[] for _ in range(width)] for name in series}
+            else:
+                values = self._values[level]
+                head = self._heads[level]
+                count = min(head, want)
+                first = head - count
+                slots = [i % cap for i in range(first, head)]
+                ts = [self._ts[level][s] for s in slots]
+                cols = {}
+                for name in series:
+                    i = self._index[name]
+                    cols[name] = [
+                        [values[(i * width + k) * cap + s] for s in slots] for k in range(width)
+                    ]
+                # Pontos sobrescritos durante a cópia saem da janela
+                drop = max(0, (self._heads[level] - cap + 1) - first)
+        if drop:
+            ts = ts[drop:]
+            for name in cols:
+                cols[name] = [c[drop:] for c in cols[name]]
+        cutoff = time.time() - window
+        keep = next((j for j, t in enumerate(ts) if t > cutoff), len(ts))
+        ts = ts[keep:]
+
+        # Agrupa mais se o passo pedido for maior que o do nível
+        group = max(1, int(step // lv_step)) if step else 1
+        out: Dict[str, Any] = {}
+        for name, c in cols.items():
+            c = [col[keep:] for col in c]
+            if width == 1:
+                lo = hi = mean = c[0]
+            else:
+                lo, hi, mean = c
+            if group > 1:
+                lo = _group(lo, group, min)
+                hi = _group(hi, group, max)
+                mean = _group(mean, group, _mean)
+            entry = {"mean": _clean(mean)}
+            if width > 1 or group > 1:
+                entry["min"] = _clean(lo)
+                entry["max"] = _clean(hi)
+            out[name] = entry
+        if group > 1:
+            ts = [ts[min(j + group, len(ts)) - 1] for j in range(0, len(ts), group)]
+        return {"level": level, "step": lv_step * group, "t": [round(t, 3) for t in ts], "series": out}
+
+
+class Recorder:
+    # Estado do escritor: agregados em andamento de cada nível acima do 0
+    def __init__(self, history: SharedHistory):
+        self.history = history
+        self.ticks = 0
+        n = len(history.series)
+        self._acc = [[[math.inf] * n, [-math.inf] * n, [0.0] * n, [0] * n]
+                     for _ in history.levels[1:]]
+
+    def record(self, sample: List[float], ts: Optional[float] = None) -> None:
+        # `sample`: um valor por série (NaN = sem dado, ex.: minerador inativo)
+        ts = time.time() if ts is None else ts
+        h = self.history
+        h._write(0, ts, [sample])
+        self.ticks += 1
+        for lv, acc in enumerate(self._acc, start=1):
+            lo, hi, total, seen = acc
+            for i, v in enumerate(sample):
+                if v == v:  # não é NaN
+                    if v < lo[i]:
+                        lo[i] = v
+                    if v > hi[i]:
+                        hi[i] = v
+                    total[i] += v
+                    seen[i] += 1
+            if self.ticks % h.levels[lv][0] == 0:
+                nan = math.nan
+                h._write(lv, ts, [
+                    [lo[i] if seen[i] else nan for i in range(len(sample))],
+                    [hi[i] if seen[i] else nan for i in range(len(sample))],
+                    [total[i] / seen[i] if seen[i] else nan for i in range(len(sample))],
+                ])
+                self._acc[lv - 1] = [[math.inf] * len(sample), [-math.inf] * len(sample),
+                                     [0.0] * len(sample), [0] * len(sample)]
+
+
+def _group(values: List[float], size: int, fn: Any) -> List[float]:
+    out = []
+    for j in range(0, len(values), size):
+        chunk = [v for v in values[j:j + size] if v == v]
+        out.append(fn(chunk) if chunk else math.nan)
+    return out
+
+
+def _mean(values: List[float]) -> float:
+    return sum(values) / len(values)
+
+
+def _clean(values: List[float]) -> List[Optional[float]]:
+    # NaN não existe em JSON
+    return [None if v != v else round(v, 3) for v in values]
@@ -0,0 +1,122 @@
+import itertools
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+# ----------------------------
+# Gerente do ciclo de vida dos mineradores
+# ----------------------------
+# Uma única thread em segundo plano é dona do HostPool: criar, matar e
+# resetar viram operações numa fila, executadas em ordem. Os handlers só
+# enfileiram e respondem na hora com o id da operação; o resultado sai como
+# evento {"type": "op"} no stream (e fica consultável por id por um tempo).
+# Assim nenhuma thread de requisição espera host subir nem mexe no pool.
+
+
+class OpError(Exception):
+    # Falha esperada de uma operação (vira resposta HTTP com `status`)
+    def __init__(self, code: str, message: str, status: int = 400):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.status = status
+
+
+@dataclass
+class Operation:
+    id: int
+    kind: str
+    fn: Callable[[], Dict[str, Any]]
+    # Operações internas (ex.: tick do supervisor) não viram evento nem histórico
+    internal: bool = False
+    # Mundo cujo stream recebe o evento "op"
+    world: int = 0
+    submitted: float = field(default_factory=time.time)
+    status: str = "queued"  # queued | running | done | failed
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[Dict[str, Any]] = None
+    elapsed: Optional[float] = None
+    # Resolvido com a própria operação ao terminar (sucesso ou falha)
+    future: Future = field(default_factory=Future)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "op": self.id,
+            "kind": self.kind,
+            "world": self.world,
+            "status": self.status,
+            "ok": self.status == "done",
+            "result": self.result,
+            "error": self.error,
+            "elapsed": self.elapsed,
+        }
+
+
+class LifecycleManager:
+    def __init__(self, on_done: Callable[[Operation], None], history: int = 256):
+        self.on_done = on_done
+        self.history = history
+        self._queue: "queue.Queue[Optional[Operation]]" = queue.Queue()
+        self._ids = itertools.count(1)
+        self._ops: "OrderedDict[int, Operation]" = OrderedDict()
+        self._ops_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="lifecycle", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def submit(self, kind: str, fn: Callable[[], Dict[str, Any]], internal: bool = False,
+               world: int = 0) -> Operation:
+        op = Operation(id=0 if internal else next(self._ids), kind=kind, fn=fn, internal=internal, world=world)
+        if not internal:
+            with self._ops_lock:
+                self._ops[op.id] = op
+                while len(self._ops) > self.history:
+                    self._ops.popitem(last=False)
+        self._queue.put(op)
+        return op
+
+    def get(self, op_id: int) -> Optional[Operation]:
+        with self._ops_lock:
+            return self._ops.get(op_id)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self) -> None:
+        print("[LIFECYCLE] Gerente de mineradores iniciado")
+        while True:
+            op = self._queue.get()
+            if op is None:
+                break
+            op.status = "running"
+            started = time.perf_counter()
+            try:
+                op.result = op.fn() or {}
+                op.status = "done"
+            except OpError as e:
+                op.error = {"code": e.code, "message": e.message, "status": e.status}
+                op.status = "failed"
+            except Exception as e:
+                print(f"[LIFECYCLE] Erro na operação {op.id} ({op.kind}): {e}")
+                op.error = {"code": "internal", "message": str(e), "status": 500}
+                op.status = "failed"
+            op.elapsed = round(time.perf_counter() - started, 4)
+            if not op.internal:
+                try:
+                    self.on_done(op)
+                except Exception as e:
+                    print(f"[LIFECYCLE] Erro ao publicar operação {op.id}: {e}")
+            op.future.set_result(op)
+        print("[LIFECYCLE] Gerente de mineradores finalizado")
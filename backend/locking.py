@@ -0,0 +1,121 @@
+import multiprocessing as mp
+import time
+from typing import Any, Dict, Generator, List, Optional
+
+# ----------------------------
+# Políticas de lock da seção crítica
+# ----------------------------
+#   single  : um semáforo global (comportamento original)
+#   striped : um lock por depósito do mapa (ver deposits.py); só disputa quem
+#             minera o mesmo depósito. Antes do mapa era um lock por recurso;
+#             como cada depósito é de um só tipo, minerais continuam sem
+#             bloquear cristais
+#   kpermit : como striped, mas cada depósito aceita K mineradores ao mesmo tempo
+#
+# Todo minerador adquire locks na ordem de LOCK_ORDER, segura no máximo um
+# depósito e nunca segura o lock de energia enquanto espera outro, então não
+# há ciclo possível (sem deadlock). O lock do depósito é segurado durante a
+# mineração; o de energia só durante o débito, que não cede a vez ao host.
+# Os dois são adquiridos por `acquire` (tenta e cede a vez): um semáforo
+# preso por um host morto não para os outros atores do host que espera.
+#
+# Locks de depósito se chamam "deposit.<índice>". Os semáforos são criados no
+# pai, um por depósito, e só chegam aos hosts na criação deles.
+
+LOCK_POLICIES = ("single", "striped", "kpermit")
+LOCK_ORDER = ["global", "deposit", "energy"]
+
+# Métrica de conflitos por lock (somada também em "conflicts"); conflitos num
+# depósito contam no tipo dele
+CONFLICT_METRICS = {
+    "global": "conflictsGlobal",
+    "minerals": "conflictsMinerals",
+    "crystals": "conflictsCrystals",
+    "energy": "conflictsEnergy",
+}
+
+
+# Bits da máscara publicada: um por lock fixo; o depósito vai acima deles
+# como índice + 1 (a tabela do mundo guarda a máscara em u32)
+_FIXED_BITS = {"global": 0, "energy": 1}
+_DEPOSIT_SHIFT = 8
+
+
+def _rank(name: str) -> int:
+    return LOCK_ORDER.index(name.split(".")[0])
+
+
+class LockPolicy:
+    def __init__(self, mode: str = "single", permits: int = 2, deposits: int = 0):
+        if mode not in LOCK_POLICIES:
+            raise ValueError(f"política de lock desconhecida: {mode}")
+        self.mode = mode
+        self.permits = max(1, permits) if mode == "kpermit" else 1
+        self.deposits = deposits
+        if mode == "single":
+            self.locks: Dict[str, Any] = {"global": mp.Semaphore(1)}
+        else:
+            self.locks = {f"deposit.{i}": mp.Semaphore(self.permits) for i in range(deposits)}
+            self.locks["energy"] = mp.Semaphore(1)
+
+    def describe(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "permits": self.permits, "locks": self.names(),
+                "deposits": self.deposits if self.mode != "single" else 0}
+
+    def names(self) -> List[str]:
+        # Tipos de lock (os de depósito aparecem uma vez, como "deposit")
+        return [n for n in LOCK_ORDER if n in self.locks or (n == "deposit" and self.mode != "single")]
+
+    def plan(self, deposit: int) -> List[str]:
+        # Locks segurados durante a mineração do depósito
+        return ["global"] if self.mode == "single" else [f"deposit.{deposit}"]
+
+    def energy_lock(self) -> Optional[Any]:
+        # None quando o lock global já protege o débito de energia
+        return self.locks.get("energy")
+
+    def acquire(self, names: List[str], timeout: float, poll: float) -> Generator[float, None, Optional[str]]:
+        # Sub-gerador para `yield from`: tenta sem bloquear o host e cede a vez
+        # por `poll` segundos entre tentativas. Devolve None se pegou todos, ou
+        # o nome do lock disputado (nesse caso nada fica preso).
+        held: List[str] = []
+        deadline = time.monotonic() + timeout
+        try:
+            for name in sorted(names, key=_rank):
+                sem = self.locks[name]
+                while not sem.acquire(False):
+                    if time.monotonic() >= deadline:
+                        self.release(held)
+                        held = []
+                        return name
+                    yield poll
+                held.append(name)
+        except BaseException:
+            # Minerador encerrado no meio da espera
+            self.release(held)
+            raise
+        return None
+
+    def release(self, names: List[str]) -> None:
+        for name in reversed(sorted(names, key=_rank)):
+            self.locks[name].release()
+
+    # Máscara dos locks segurados, publicada na tabela do mundo (held) para
+    # que o supervisor possa devolvê-los se o host do minerador morrer
+    @staticmethod
+    def mask(names: List[str]) -> int:
+        m = 0
+        for name in names:
+            if name in _FIXED_BITS:
+                m |= 1 << _FIXED_BITS[name]
+            else:
+                m |= (int(name.split(".")[1]) + 1) << _DEPOSIT_SHIFT
+        return m
+
+    @staticmethod
+    def unmask(mask: int) -> List[str]:
+        names = [name for name, bit in _FIXED_BITS.items() if mask & (1 << bit)]
+        deposit = mask >> _DEPOSIT_SHIFT
+        if deposit:
+            names.append(f"deposit.{deposit - 1}")
+        return sorted(names, key=_rank)
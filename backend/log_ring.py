@@ -0,0 +1,144 @@
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional
+
+# ----------------------------
+# Anel de logs em memória compartilhada
+# ----------------------------
+# Registros de tamanho fixo, indexados por um número de sequência que só
+# cresce (o primeiro log é seq=1). O registro seq fica no slot seq % cap.
+#
+#   header  : head (u64) último seq escrito, floor (u64) seqs <= floor foram limpos
+#   seq     : u64[cap]   seq do registro no slot (0 = escrita em andamento)
+#   ts      : f64[cap]
+#   length  : u16[cap]   bytes válidos da mensagem
+#   level   : u8[cap]    índice em LEVELS
+#   text    : u8[cap * MESSAGE_BYTES]  UTF-8
+#
+# Escritores serializam pelo lock do anel (O(1) por append). Leitores não
+# travam: copiam o slot e conferem o seq; se foi sobrescrito no meio da
+# cópia, o registro já saiu da janela e é ignorado.
+
+LEVELS = ["info", "success", "warning", "error"]
+MESSAGE_BYTES = 240
+
+_LEVEL_INDEX = {name: i for i, name in enumerate(LEVELS)}
+
+
+class LogRing:
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity
+        self._owner = True
+        self.lock = mp.Lock()
+        self.shm = shared_memory.SharedMemory(create=True, size=self._size(capacity))
+        self.shm.buf[:] = bytes(len(self.shm.buf))
+        self._map()
+
+    @staticmethod
+    def _size(cap: int) -> int:
+        return 8 * 2 + cap * (8 + 8 + 2 + 1 + MESSAGE_BYTES)
+
+    def _map(self) -> None:
+        cap = self.capacity
+        buf = self.shm.buf
+        off = 0
+
+        def take(fmt: str, count: int, width: int):
+            nonlocal off
+            view = buf[off:off + count * width].cast(fmt)
+            off += count * width
+            return view
+
+        self._header = take('Q', 2, 8)
+        self._seq = take('Q', cap, 8)
+        self._ts = take('d', cap, 8)
+        self._length = take('H', cap, 2)
+        self._level = take('B', cap, 1)
+        self._text = buf[off:off + cap * MESSAGE_BYTES]
+
+    # Pickle: nome do bloco + lock (só durante o spawn, como todo mp.Lock)
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"name": self.shm.name, "capacity": self.capacity, "lock": self.lock}
+
+    def __setstate__(self, st: Dict[str, Any]) -> None:
+        self.capacity = st["capacity"]
+        self.lock = st["lock"]
+        self._owner = False
+        self.shm = shared_memory.SharedMemory(name=st["name"])
+        self._map()
+
+    def close(self) -> None:
+        for v in (self._header, self._seq, self._ts, self._length, self._level, self._text):
+            v.release()
+        self.shm.close()
+        if self._owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    @property
+    def head(self) -> int:
+        return self._header[0]
+
+    def append(self, message: str, level: str = "info") -> Dict[str, Any]:
+        data = message.encode("utf-8")[:MESSAGE_BYTES]
+        # Corta em fronteira de caractere
+        data = data.decode("utf-8", errors="ignore").encode("utf-8")
+        ts = time.time()
+        with self.lock:
+            seq = self._header[0] + 1
+            i = seq % self.capacity
+            self._seq[i] = 0
+            self._ts[i] = ts
+            self._level[i] = _LEVEL_INDEX.get(level, 0)
+            self._length[i] = len(data)
+            start = i * MESSAGE_BYTES
+            self._text[start:start + len(data)] = data
+            self._seq[i] = seq
+            self._header[0] = seq
+        return self._entry(seq, ts, level, data.decode("utf-8"))
+
+    def clear(self) -> None:
+        with self.lock:
+            self._header[1] = self._header[0]
+
+    @staticmethod
+    def _entry(seq: int, ts: float, level: str, message: str) -> Dict[str, Any]:
+        return {
+            "seq": seq,
+            "time": time.strftime("%H:%M:%S", time.localtime(ts)),
+            "level": level,
+            "message": message,
+        }
+
+    def _read(self, seq: int) -> Optional[Dict[str, Any]]:
+        i = seq % self.capacity
+        if self._seq[i] != seq:
+            return None
+        ts = self._ts[i]
+        level = self._level[i]
+        length = self._length[i]
+        start = i * MESSAGE_BYTES
+        raw = bytes(self._text[start:start + length])
+        if self._seq[i] != seq:
+            return None
+        return self._entry(seq, ts, LEVELS[level], raw.decode("utf-8", errors="ignore"))
+
+    def read_after(self, after: int, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        # Registros com seq > after ainda presentes no anel, do mais antigo ao mais novo
+        head, floor = self._header[0], self._header[1]
+        start = max(after + 1, floor + 1, head - self.capacity + 1, 1)
+        stop = head + 1
+        if limit is not None:
+            stop = min(stop, start + max(0, limit))
+        out = []
+        for seq in range(start, stop):
+            entry = self._read(seq)
+            if entry is not None:
+                out.append(entry)
+        return out
+
+    def tail(self, count: int) -> List[Dict[str, Any]]:
+        return self.read_after(max(0, self._header[0] - count))
@@ -0,0 +1,147 @@
+from bisect import bisect_left
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+# ----------------------------
+# Métricas de contenção em memória compartilhada
+# ----------------------------
+# Histogramas por minerador do tempo de espera pelo lock do depósito e do
+# tempo segurando a seção crítica, mais o custo dos atores nos hosts.
+# (Eventos produzidos e descartados são contados nos próprios anéis de
+# eventos, ver event_ring.py.)
+#
+#   hist_counts : i64[slots][HIST_KINDS][len(BUCKETS) + 1]  (não cumulativos)
+#   hist_sums   : f64[slots][HIST_KINDS]                    segundos somados
+#   usage       : f64[shards][USAGE]                    custo dos atores nos hosts
+#
+# Cada minerador escreve só o próprio slot e cada processo só o próprio shard
+# (o mesmo esquema de counters.py): registrar é uma escrita local, sem lock
+# entre processos e sem IPC. Tudo é cumulativo e nunca zera, como esperam os
+# coletores no formato Prometheus.
+#
+# Cada mundo tem o seu bloco; `usage` é a contabilidade de recursos do mundo
+# nos hosts compartilhados (retomadas de atores e segundos ocupados).
+
+HIST_KINDS = ["wait", "hold"]
+BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+
+# steps: retomadas de atores; busy_seconds: tempo dentro dos atores
+USAGE = ["steps", "busy_seconds"]
+
+_KIND_INDEX = {name: i for i, name in enumerate(HIST_KINDS)}
+_NB = len(BUCKETS) + 1
+
+
+class SharedMetrics:
+    def __init__(self, slots: int, shards: int, name: Optional[str] = None):
+        self.slots = slots
+        self.shards = shards
+        self._owner = name is None
+        if self._owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=self._size(slots, shards))
+            self.shm.buf[:] = bytes(len(self.shm.buf))
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self._map()
+
+    @staticmethod
+    def _size(slots: int, shards: int) -> int:
+        k = len(HIST_KINDS)
+        return 8 * (slots * k * _NB + slots * k + shards * len(USAGE))
+
+    def _map(self) -> None:
+        k = len(HIST_KINDS)
+        buf = self.shm.buf
+        n_counts = self.slots * k * _NB
+        n_sums = self.slots * k
+        off = 0
+        self._counts = buf[off:off + 8 * n_counts].cast('q')
+        off += 8 * n_counts
+        self._sums = buf[off:off + 8 * n_sums].cast('d')
+        off += 8 * n_sums
+        self._usage = buf[off:off + 8 * self.shards * len(USAGE)].cast('d')
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"name": self.shm.name, "slots": self.slots, "shards": self.shards}
+
+    def __setstate__(self, st: Dict[str, Any]) -> None:
+        self.slots = st["slots"]
+        self.shards = st["shards"]
+        self._owner = False
+        self.shm = shared_memory.SharedMemory(name=st["name"])
+        self._map()
+
+    def close(self) -> None:
+        for v in (self._counts, self._sums, self._usage):
+            v.release()
+        self.shm.close()
+        if self._owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    def observe(self, slot: int, kind: str, seconds: float) -> None:
+        # Só o minerador dono do slot chama
+        k = slot * len(HIST_KINDS) + _KIND_INDEX[kind]
+        self._counts[k * _NB + bisect_left(BUCKETS, seconds)] += 1
+        self._sums[k] += seconds
+
+    def usage(self, shard: int, seconds: float) -> None:
+        # Só o host que está executando o ator dono do shard chama
+        base = shard * len(USAGE)
+        self._usage[base] += 1
+        self._usage[base + 1] += seconds
+
+    def usage_totals(self) -> Dict[str, float]:
+        raw = self._usage.tolist()
+        m = len(USAGE)
+        return {name: sum(raw[i::m]) for i, name in enumerate(USAGE)}
+
+    def histogram(self, slot: int, kind: str) -> Optional[Dict[str, Any]]:
+        # Buckets cumulativos (le) do slot, ou None se nunca registrou nada
+        k = slot * len(HIST_KINDS) + _KIND_INDEX[kind]
+        counts = self._counts[k * _NB:(k + 1) * _NB].tolist()
+        total = sum(counts)
+        if not total:
+            return None
+        cumulative: List[int] = []
+        running = 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+        return {"buckets": cumulative, "sum": self._sums[k], "count": total}
+
+
+def exposition(sources: List[Tuple[str, SharedMetrics]], prefix: str = "mining") -> List[str]:
+    # Linhas no formato de texto do Prometheus para os histogramas e o uso.
+    # `sources`: (rótulos extras, ex. 'world="0"', métricas) de cada mundo.
+    lines: List[str] = []
+    help_text = {
+        "wait": "Tempo de espera pelo lock do deposito (inclui timeouts)",
+        "hold": "Tempo segurando a secao critica",
+    }
+    for kind in HIST_KINDS:
+        metric = f"{prefix}_lock_{kind}_seconds"
+        lines.append(f"# HELP {metric} {help_text[kind]}")
+        lines.append(f"# TYPE {metric} histogram")
+        for extra, m in sources:
+            for slot in range(m.slots):
+                h = m.histogram(slot, kind)
+                if h is None:
+                    continue
+                labels = f'{extra},miner="{slot}"' if extra else f'miner="{slot}"'
+                for bound, value in zip(BUCKETS + ["+Inf"], h["buckets"]):
+                    lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {value}')
+                lines.append(f"{metric}_sum{{{labels}}} {h['sum']:.6f}")
+                lines.append(f"{metric}_count{{{labels}}} {h['count']}")
+    lines.append(f"# HELP {prefix}_actor_steps_total Retomadas de atores nos hosts")
+    lines.append(f"# TYPE {prefix}_actor_steps_total counter")
+    usage = [(extra, m.usage_totals()) for extra, m in sources]
+    for extra, u in usage:
+        lines.append(f"{prefix}_actor_steps_total{{{extra}}} {int(u['steps'])}")
+    lines.append(f"# HELP {prefix}_actor_busy_seconds_total Tempo de CPU dos atores nos hosts")
+    lines.append(f"# TYPE {prefix}_actor_busy_seconds_total counter")
+    for extra, u in usage:
+        lines.append(f"{prefix}_actor_busy_seconds_total{{{extra}}} {u['busy_seconds']:.6f}")
+    return lines
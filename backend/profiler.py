@@ -0,0 +1,129 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Optional
+
+# ----------------------------
+# Profiler por amostragem (sob demanda)
+# ----------------------------
+# Desligado, não existe: nenhuma thread, nenhum sys.setprofile/settrace. Ligado
+# por POST /api/debug/profile, uma thread em cada processo lê
+# sys._current_frames() a cada `interval` e conta as pilhas colapsadas
+# ("raiz;...;folha N", o formato do flamegraph.pl/speedscope) com um prefixo
+# que identifica processo e ator:
+#
+#   parent;<thread>;...                 processo do servidor
+#   host-N;world-W;miner-M;...          minerador em execução no host
+#   host-N;world-W;regenerator;...      regenerador em execução no host
+#   host-N;loop;...                     host fora de um ator
+#
+# Pilhas paradas em espera (fila vazia, lock, select) são descartadas por
+# padrão: o flamegraph mostra onde vai o tempo de CPU, não quem dorme.
+# Hosts gravam o resultado num arquivo (a fila de respostas só leva ok/falha)
+# e o pai soma tudo.
+
+# (arquivo, função) da folha de uma pilha que só está esperando
+IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("connection.py", "_poll"),
+    ("connection.py", "wait"),
+    # Host bloqueado em commands.get() esperando os bytes do próximo comando
+    ("connection.py", "_recv"),
+    ("connection.py", "_recv_bytes"),
+    ("synchronize.py", "wait"),
+    ("synchronize.py", "wait_for"),
+    ("thread.py", "_worker"),
+    ("event_ring.py", "wait"),
+    ("wakeup.py", "wait"),
+}
+
+# Rótulo de uma thread: prefixo da pilha, ou None para ignorá-la
+Label = Callable[[int, str], Optional[str]]
+
+
+def frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)})".replace(";", ":")
+
+
+def collapse(frame, idle: bool) -> Optional[str]:
+    leaf = frame.f_code
+    if not idle and (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_LEAVES:
+        return None
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Sampler:
+    def __init__(self, label: Label, interval: float = 0.01, idle: bool = False):
+        self.label = label
+        self.interval = interval
+        self.idle = idle
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, seconds: float, done: Optional[Callable[["Sampler"], None]] = None) -> None:
+        self._thread = threading.Thread(target=self._run, args=(seconds, done), name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self, seconds: float, done: Optional[Callable[["Sampler"], None]]) -> None:
+        me = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline and not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                prefix = self.label(ident, names.get(ident, "?"))
+                if prefix is None:
+                    continue
+                stack = collapse(frame, self.idle)
+                if stack is not None:
+                    self.stacks[f"{prefix};{stack}"] += 1
+            self.samples += 1
+        if done is not None:
+            try:
+                done(self)
+            except Exception as e:
+                print(f"[PROFILER] Erro ao finalizar amostragem: {e}")
+
+
+# ----------------------------
+# Arquivos de pilhas colapsadas
+# ----------------------------
+def render(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items()))
+
+
+def dump(stacks: Counter, path: str) -> None:
+    # Atômico: o pai só enxerga o arquivo completo
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render(stacks))
+    os.replace(tmp, path)
+
+
+def load(path: str) -> Counter:
+    stacks: Counter = Counter()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if stack:
+                stacks[stack] += int(count)
+    return stacks
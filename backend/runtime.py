@@ -0,0 +1,422 @@
+import heapq
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Generator, List, Optional, Set, Tuple, Union
+
+from profiler import Sampler, dump
+from wakeup import Wait
+
+# ----------------------------
+# Runtime de mineradores multiplexados
+# ----------------------------
+# Poucos processos "host" (um por núcleo) executam muitos mineradores cada.
+# Um minerador é um gerador que faz `yield <segundos>` onde antes chamava
+# time.sleep; o host mantém um heap de timers e retoma cada gerador na hora
+# certa. Nada bloqueia o host além da espera pelo próximo timer/comando.
+#
+# Um ator parado cede `Wait(sinal, geração)` (ver wakeup.py): fica fora do
+# heap até o sinal tocar. Uma thread do host espera no semáforo do próprio host
+# e, quando algo toca, enfileira um "wake" para o próprio host.
+#
+# Comandos do pai chegam pela fila do host como (ticket, op, chave, args) e são
+# confirmados na fila de respostas compartilhada como (ticket, host_id, ok).
+#
+# O host não conhece mundos nem mineradores: recebe uma tabela de atores
+# (simulation.Worlds) que cria o gerador de cada chave (`actor(chave, **args)`),
+# grava o heartbeat (`beat`), contabiliza o tempo gasto (`account`), nomeia o
+# ator no profiler (`tag`), libera o slot depois da remoção (`release`) e troca
+# os blocos de memória de um mundo aberto ou removido depois da criação do
+# host (`attach`). `args` de um "add" vem do pai (ex.: posição restaurada de um
+# checkpoint).
+
+Actor = Generator[Union[float, Wait], None, None]
+
+# Atraso entre o encerramento e a remoção do slot (mostra "terminated" na UI)
+REAP_DELAY = 0.5
+# Espera máxima pelo primeiro ping de um host recém-criado
+SPAWN_TIMEOUT = 30.0
+# Heartbeat dos atores parados em sinais (o supervisor não os vê como travados)
+PARK_BEAT = 1.0
+
+
+def watch_doorbell(bell: Any, host_id: int, commands: Any, pending: threading.Event) -> None:
+    # Thread do host: bloqueada no semáforo de assinante do host. Um "wake"
+    # pendente basta para vários toques seguidos.
+    seen = bell.snapshot()
+    while True:
+        current = bell.wait(seen, host_id)
+        if current == seen:
+            continue
+        seen = current
+        if not pending.is_set():
+            pending.set()
+            commands.put((0, "wake", None, None))
+
+
+def host_main(host_id: int, table: Any, commands: Any, replies: Any) -> None:
+    print(f"[HOST {host_id}] Iniciando processo PID={os.getpid()}")
+    actors: Dict[int, Actor] = {}
+    # (quando, desempate, miner_id, gerador ou None para remoção do slot)
+    timers: List[Tuple[float, int, int, Optional[Actor]]] = []
+    order = itertools.count()
+    # Atores parados: miner_id -> sinal esperado
+    parked: Dict[int, Wait] = {}
+    next_beat = 0.0
+    pending = threading.Event()
+    # Ator em execução agora (lido só pelo profiler, ver profiler.py)
+    running: List[Optional[int]] = [None]
+    main_thread = threading.get_ident()
+    threading.Thread(target=watch_doorbell, args=(table.bell, host_id, commands, pending),
+                     name="doorbell", daemon=True).start()
+
+    def schedule(delay: float, mid: int, gen: Optional[Actor]) -> None:
+        heapq.heappush(timers, (time.monotonic() + delay, next(order), mid, gen))
+
+    def step(mid: int, gen: Actor) -> None:
+        # Heartbeat a cada retomada: o supervisor detecta ator ou host parado
+        table.beat(mid)
+        running[0] = mid
+        started = time.perf_counter()
+        try:
+            delay = next(gen)
+        except StopIteration:
+            actors.pop(mid, None)
+            return
+        except Exception as e:
+            print(f"[HOST {host_id}] Ator {mid} falhou: {e}")
+            actors.pop(mid, None)
+            return
+        finally:
+            table.account(mid, time.perf_counter() - started)
+            running[0] = None
+        if isinstance(delay, Wait):
+            if delay.ready:
+                # Tocou entre o teste do ator e o yield
+                schedule(0.0, mid, gen)
+            else:
+                parked[mid] = delay
+            return
+        schedule(max(0.0, float(delay)), mid, gen)
+
+    def wake() -> None:
+        pending.clear()
+        for mid, wait in list(parked.items()):
+            if wait.ready:
+                del parked[mid]
+                schedule(0.0, mid, actors[mid])
+
+    def stop_actor(mid: int) -> None:
+        parked.pop(mid, None)
+        gen = actors.pop(mid, None)
+        if gen is not None:
+            try:
+                gen.close()  # executa os finally do minerador (libera semáforo)
+            except Exception as e:
+                print(f"[HOST {host_id}] Erro ao encerrar minerador {mid}: {e}")
+
+    def label(ident: int, name: str) -> Optional[str]:
+        # Só o loop do host executa atores; as outras threads só esperam
+        if ident != main_thread:
+            return None
+        key = running[0]
+        return f"host-{host_id};" + (table.tag(key) if key is not None else "loop")
+
+    def profile(args: Dict[str, Any]) -> None:
+        # Amostra em segundo plano; o resultado vai para o arquivo pedido pelo pai
+        sampler = Sampler(label, interval=args["interval"], idle=args["idle"])
+        sampler.start(args["seconds"], done=lambda smp: dump(smp.stacks, args["path"]))
+
+    def handle(cmd: Tuple[int, str, Optional[int], Optional[Dict[str, Any]]]) -> bool:
+        ticket, op, mid, args = cmd
+        ok = True
+        if op == "add":
+            # Também serve para reiniciar um ator que morreu ou travou
+            stop_actor(mid)
+            gen = table.actor(mid, **(args or {}))
+            actors[mid] = gen
+            # Primeiro passo já aqui: o registro termina antes da confirmação
+            step(mid, gen)
+        elif op == "remove":
+            ok = mid in actors
+            stop_actor(mid)
+            schedule(REAP_DELAY, mid, None)
+        elif op == "drop":
+            # Remoção imediata (reset): o slot pode ser reutilizado na hora
+            stop_actor(mid)
+            table.release(mid)
+        elif op == "attach":
+            try:
+                table.attach(args["world"], args["blocks"])
+            except OSError as e:
+                # Bloco já removido (mundo apagado logo depois de aberto)
+                print(f"[HOST {host_id}] Erro ao anexar blocos do mundo {args['world']}: {e}")
+                ok = False
+        elif op == "ping":
+            ok = True
+        elif op == "profile":
+            profile(args)
+        elif op == "wake":
+            # Da thread do próprio host: sem resposta
+            wake()
+            return True
+        elif op == "stop":
+            for m in list(actors):
+                stop_actor(m)
+            replies.put((ticket, host_id, True))
+            return False
+        replies.put((ticket, host_id, ok))
+        return True
+
+    try:
+        while True:
+            due = timers[0][0] if timers else None
+            if parked:
+                due = next_beat if due is None else min(due, next_beat)
+            timeout = max(0.0, due - time.monotonic()) if due is not None else None
+            try:
+                cmd = commands.get(timeout=timeout) if timeout != 0.0 else commands.get_nowait()
+            except queue.Empty:
+                cmd = None
+            if cmd is not None and not handle(cmd):
+                break
+
+            now = time.monotonic()
+            if parked and now >= next_beat:
+                for mid in parked:
+                    table.beat(mid)
+                next_beat = now + PARK_BEAT
+            while timers and timers[0][0] <= now:
+                _, _, mid, gen = heapq.heappop(timers)
+                if gen is None:
+                    # Remoção atrasada, a menos que o id tenha sido reutilizado
+                    if mid not in actors:
+                        table.release(mid)
+                elif actors.get(mid) is gen:
+                    step(mid, gen)
+    except KeyboardInterrupt:
+        print(f"[HOST {host_id}] Interrompido")
+    finally:
+        for m in list(actors):
+            stop_actor(m)
+        print(f"[HOST {host_id}] Processo finalizado")
+
+
+# ----------------------------
+# Lado do pai
+# ----------------------------
+@dataclass
+class Host:
+    id: int
+    proc: mp.Process
+    commands: Any
+    miners: Set[int] = field(default_factory=set)
+    # Segundos do start() até o host responder ao primeiro ping
+    cold_start: Optional[float] = None
+
+
+class HostPool:
+    def __init__(self, table: Any, size: int):
+        self.table = table
+        self.size = max(1, size)
+        self.hosts: Dict[int, Host] = {}
+        self.placement: Dict[int, int] = {}  # chave do ator -> host_id
+        self.replies = mp.Queue()
+        self._tickets = itertools.count(1)
+        self.cold_starts: List[float] = []
+        # Handlers rodam em threads do servidor: todas as operações serializam aqui
+        self.lock = threading.RLock()
+
+    def spawn(self) -> Host:
+        return self.spawn_many(1)[0]
+
+    def spawn_many(self, count: int) -> List[Host]:
+        # Inicia todos os processos antes de pingar: os cold starts se sobrepõem.
+        # Só retorna com os hosts prontos (ou sem resposta) e mede cada cold start.
+        with self.lock:
+            started = time.monotonic()
+            new: List[Host] = []
+            for _ in range(count):
+                host_id = 0
+                while host_id in self.hosts:
+                    host_id += 1
+                commands = mp.Queue()
+                p = mp.Process(
+                    target=host_main,
+                    args=(host_id, self.table, commands, self.replies),
+                    daemon=True,
+                )
+                p.start()
+                host = Host(id=host_id, proc=p, commands=commands)
+                self.hosts[host_id] = host
+                new.append(host)
+            replied: List[Optional[float]] = []
+            results = self.call_many([(h, "ping", None, None) for h in new], SPAWN_TIMEOUT, replied)
+            for host, ok, at in zip(new, results, replied):
+                if ok and at is not None:
+                    host.cold_start = at - started
+                    self.cold_starts.append(host.cold_start)
+            return new
+
+    def live(self) -> List[Host]:
+        return [h for h in self.hosts.values() if h.proc.is_alive()]
+
+    def top_up(self) -> List[Host]:
+        # Completa o pool quente até `size` hosts vivos; devolve os novos
+        with self.lock:
+            missing = self.size - len(self.live())
+            # Hosts que não subirem ficam para a próxima rodada
+            return self.spawn_many(missing) if missing > 0 else []
+
+    def place(self) -> Host:
+        # Espalha pelos núcleos primeiro; depois, o host menos carregado
+        live = self.live()
+        if len(live) < self.size:
+            return self.spawn()
+        return min(live, key=lambda h: len(h.miners))
+
+    def call(self, host: Host, op: str, miner_id: Optional[int] = None, timeout: float = 5.0,
+             args: Optional[Dict[str, Any]] = None) -> bool:
+        return self.call_many([(host, op, miner_id, args)], timeout)[0]
+
+    def call_many(self, calls: List[Tuple[Host, str, Optional[int], Optional[Dict[str, Any]]]],
+                  timeout: float = 5.0, replied: Optional[List[Optional[float]]] = None) -> List[bool]:
+        # Envia todos os comandos antes de esperar: hosts diferentes trabalham em
+        # paralelo. `replied` recebe o instante (monotonic) de cada resposta.
+        with self.lock:
+            pending: Dict[int, int] = {}  # ticket -> índice em calls
+            for i, (host, op, miner_id, args) in enumerate(calls):
+                ticket = next(self._tickets)
+                host.commands.put((ticket, op, miner_id, args))
+                pending[ticket] = i
+            results = [False] * len(calls)
+            times: List[Optional[float]] = [None] * len(calls)
+            deadline = time.monotonic() + timeout
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                for ticket, i in list(pending.items()):
+                    if not calls[i][0].proc.is_alive():
+                        del pending[ticket]
+                if not pending:
+                    break
+                try:
+                    got, _, ok = self.replies.get(timeout=min(remaining, 0.5))
+                except queue.Empty:
+                    continue
+                # Resposta atrasada de uma chamada que já expirou: descarta
+                i = pending.pop(got, None)
+                if i is not None:
+                    results[i] = ok
+                    times[i] = time.monotonic()
+            if replied is not None:
+                replied.extend(times)
+            return results
+
+    def add(self, miner_id: int, **init: Any) -> Optional[Host]:
+        with self.lock:
+            host = self.place()
+            if not self.call(host, "add", miner_id, args=init or None):
+                return None
+            host.miners.add(miner_id)
+            self.placement[miner_id] = host.id
+            return host
+
+    def add_many(self, miners: List[Tuple[int, Optional[Dict[str, Any]]]],
+                 timeout: float = 5.0) -> Dict[int, Optional[Host]]:
+        # Completa o pool, distribui pelos hosts menos carregados e envia todos
+        # os "add" de uma vez; devolve o host de cada minerador (None se falhou)
+        with self.lock:
+            self.top_up()
+            live = self.live()
+            if not live:
+                return {mid: None for mid, _ in miners}
+            load = {h.id: len(h.miners) for h in live}
+            calls: List[Tuple[Host, str, Optional[int], Optional[Dict[str, Any]]]] = []
+            for mid, init in miners:
+                host = min(live, key=lambda h: load[h.id])
+                load[host.id] += 1
+                calls.append((host, "add", mid, init or None))
+            placed: Dict[int, Optional[Host]] = {}
+            for (host, _, mid, _), ok in zip(calls, self.call_many(calls, timeout)):
+                if ok:
+                    host.miners.add(mid)
+                    self.placement[mid] = host.id
+                placed[mid] = host if ok else None
+            return placed
+
+    def remove_many(self, miner_ids: List[int], timeout: float = 5.0, linger: bool = True) -> Dict[int, bool]:
+        # linger: mostra "terminated" por REAP_DELAY antes de liberar o slot
+        op = "remove" if linger else "drop"
+        with self.lock:
+            calls: List[Tuple[Host, str, Optional[int], Optional[Dict[str, Any]]]] = []
+            removed: Dict[int, bool] = {}
+            for mid in miner_ids:
+                host_id = self.placement.pop(mid, None)
+                host = self.hosts.get(host_id) if host_id is not None else None
+                if host is None:
+                    removed[mid] = False
+                    continue
+                host.miners.discard(mid)
+                calls.append((host, op, mid, None))
+            for (_, _, mid, _), ok in zip(calls, self.call_many(calls, timeout)):
+                removed[mid] = ok
+            return removed
+
+    def remove(self, miner_id: int) -> bool:
+        with self.lock:
+            host_id = self.placement.pop(miner_id, None)
+            host = self.hosts.get(host_id) if host_id is not None else None
+            if host is None:
+                return False
+            host.miners.discard(miner_id)
+            return self.call(host, "remove", miner_id)
+
+    def attach(self, world_id: int, timeout: float = 5.0) -> List[bool]:
+        # Blocos atuais do mundo para todos os hosts vivos; hosts criados
+        # depois já recebem a tabela com eles
+        with self.lock:
+            args = {"world": world_id, "blocks": self.table.blocks(world_id)}
+            return self.call_many([(h, "attach", None, args) for h in self.live()], timeout)
+
+    def host_of(self, miner_id: int) -> Optional[Host]:
+        host_id = self.placement.get(miner_id)
+        return self.hosts.get(host_id) if host_id is not None else None
+
+    def kill_host(self, host_id: int) -> List[int]:
+        # Host travado: mata o processo; devolve os mineradores que rodavam nele
+        with self.lock:
+            host = self.hosts.get(host_id)
+            if host is None:
+                return []
+            host.proc.kill()
+            host.proc.join(timeout=1.0)
+            return self.reap_dead()
+
+    def reap_dead(self) -> List[int]:
+        # Hosts que morreram levam seus mineradores; devolve os ids perdidos
+        with self.lock:
+            lost: List[int] = []
+            for host_id, host in list(self.hosts.items()):
+                if not host.proc.is_alive():
+                    lost.extend(host.miners)
+                    for mid in host.miners:
+                        self.placement.pop(mid, None)
+                    self.hosts.pop(host_id, None)
+            return lost
+
+    def shutdown(self) -> None:
+        with self.lock:
+            for host in list(self.hosts.values()):
+                if host.proc.is_alive():
+                    self.call(host, "stop", timeout=1.0)
+                host.proc.join(timeout=1.0)
+                if host.proc.is_alive():
+                    host.proc.kill()
+            self.hosts.clear()
+            self.placement.clear()
@@ -0,0 +1,252 @@
+import time
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional
+
+# ----------------------------
+# Mundo em memória compartilhada (struct-of-arrays)
+# ----------------------------
+# Layout fixo de um único bloco multiprocessing.shared_memory:
+#
+#   header   : version (u64)
+#   seq      : u64[cap]   seqlock por slot (ímpar = escrita em andamento)
+#   x, y     : f64[cap]
+#   mined    : i64[cap]
+#   active   : u8[cap]
+#   status   : u8[cap]    índice em STATUSES
+#   locked   : u8[cap]
+#   target   : u8[cap]    índice em TARGETS
+#   beat     : f64[cap]   último heartbeat (time.monotonic) do minerador
+#   held     : u32[cap]   máscara dos locks segurados (ver LockPolicy.mask)
+#   deposit  : i32[cap]   depósito do alvo atual (-1 = nenhum)
+#
+# Cada minerador escreve apenas o próprio slot (slot = id do minerador), então
+# não há lock entre escritores; leitores usam o seqlock para obter cópias
+# consistentes sem passar por nenhum processo servidor.
+#
+# beat e held ficam fora do seqlock e não mudam a versão: são escritas de
+# uma palavra lidas só pelo supervisor, e não aparecem no estado publicado.
+
+COLORS = ['#3b82f6', '#ef4444', '#10b981', '#f59e0b', '#8b5cf6', '#ec4899']
+
+STATUSES = ["idle", "waiting", "mining", "terminated", "blocked", "no_energy"]
+TARGETS = [None, "minerals", "crystals"]
+
+_STATUS_INDEX = {name: i for i, name in enumerate(STATUSES)}
+_TARGET_INDEX = {name: i for i, name in enumerate(TARGETS)}
+
+_HEADER_SLOTS = 1  # version
+# Tentativas de leitura de um slot em escrita antes de desistir: só um
+# escritor morto no meio da escrita deixa o seqlock ímpar por tanto tempo
+READ_RETRIES = 1000
+
+
+def miner_name(miner_id: int) -> str:
+    return f"Minerador-{miner_id}"
+
+
+def miner_color(miner_id: int) -> str:
+    return COLORS[miner_id % len(COLORS)]
+
+
+class SharedWorld:
+    def __init__(self, capacity: int, name: Optional[str] = None):
+        self.capacity = capacity
+        self._owner = name is None
+        if self._owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=self._size(capacity))
+            self.shm.buf[:] = bytes(len(self.shm.buf))
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self._map()
+
+    @staticmethod
+    def _size(cap: int) -> int:
+        words = _HEADER_SLOTS + 5 * cap
+        return 8 * words + 4 * cap + 4 * cap + 4 * cap
+
+    def _map(self) -> None:
+        cap = self.capacity
+        buf = self.shm.buf
+        off = 0
+
+        def take(fmt: str, count: int, width: int):
+            nonlocal off
+            view = buf[off:off + count * width].cast(fmt)
+            off += count * width
+            return view
+
+        self._header = take('Q', _HEADER_SLOTS, 8)
+        self._seq = take('Q', cap, 8)
+        self._x = take('d', cap, 8)
+        self._y = take('d', cap, 8)
+        self._mined = take('q', cap, 8)
+        self._beat = take('d', cap, 8)
+        self._held = take('I', cap, 4)
+        self._deposit = take('i', cap, 4)
+        self._active = take('B', cap, 1)
+        self._status = take('B', cap, 1)
+        self._locked = take('B', cap, 1)
+        self._target = take('B', cap, 1)
+
+    # Pickle: apenas o nome do bloco; o processo filho reanexa
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"name": self.shm.name, "capacity": self.capacity}
+
+    def __setstate__(self, st: Dict[str, Any]) -> None:
+        self.capacity = st["capacity"]
+        self._owner = False
+        self.shm = shared_memory.SharedMemory(name=st["name"])
+        self._map()
+
+    def close(self) -> None:
+        views = [self._header, self._seq, self._x, self._y,
+                 self._mined, self._beat, self._held, self._deposit, self._active, self._status,
+                 self._locked, self._target]
+        for v in views:
+            v.release()
+        self.shm.close()
+        if self._owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    # ----------------------------
+    # Versão global (incrementada a cada escrita)
+    # ----------------------------
+    @property
+    def version(self) -> int:
+        return self._header[0]
+
+    def _bump(self) -> None:
+        # Incrementos concorrentes podem colidir, mas o valor sempre muda
+        self._header[0] = (self._header[0] + 1) & 0xFFFFFFFFFFFFFFFF
+
+    def touch(self) -> None:
+        # Marca o mundo como alterado (recursos e flags fora da tabela)
+        self._bump()
+
+    # ----------------------------
+    # Tabela de mineradores
+    # ----------------------------
+    def register(self, miner_id: int, x: float, y: float, mined: int = 0) -> None:
+        self.repair(miner_id)
+        self._held[miner_id] = 0
+        self.beat(miner_id)
+        self._write(miner_id, active=1, x=x, y=y, mined=mined,
+                    status="idle", locked=False, target=None, deposit=None)
+
+    def update(self, miner_id: int, **fields: Any) -> None:
+        self._write(miner_id, **fields)
+
+    def remove(self, miner_id: int) -> None:
+        self._write(miner_id, active=0)
+
+    def repair(self, miner_id: int) -> None:
+        # Host morto entre os dois incrementos do seqlock: deixa o slot par de
+        # novo (só quando nenhum escritor vivo pode estar no meio da escrita)
+        if self._seq[miner_id] & 1:
+            self._seq[miner_id] += 1
+            self._bump()
+
+    def clear(self) -> None:
+        for i in range(self.capacity):
+            if self._active[i]:
+                self.remove(i)
+
+    def _write(self, i: int, **fields: Any) -> None:
+        self._seq[i] += 1
+        try:
+            for key, value in fields.items():
+                if key == "x":
+                    self._x[i] = float(value)
+                elif key == "y":
+                    self._y[i] = float(value)
+                elif key == "mined":
+                    self._mined[i] = int(value)
+                elif key == "active":
+                    self._active[i] = 1 if value else 0
+                elif key == "status":
+                    self._status[i] = _STATUS_INDEX[value]
+                elif key == "locked":
+                    self._locked[i] = 1 if value else 0
+                elif key == "target":
+                    self._target[i] = _TARGET_INDEX[value]
+                elif key == "deposit":
+                    self._deposit[i] = -1 if value is None else int(value)
+                else:
+                    raise KeyError(key)
+        finally:
+            self._seq[i] += 1
+            self._bump()
+
+    # ----------------------------
+    # Heartbeat e locks segurados (lidos pelo supervisor)
+    # ----------------------------
+    def beat(self, miner_id: int) -> None:
+        self._beat[miner_id] = time.monotonic()
+
+    def beat_age(self, miner_id: int) -> float:
+        return time.monotonic() - self._beat[miner_id]
+
+    def set_held(self, miner_id: int, mask: int) -> None:
+        self._held[miner_id] = mask
+
+    def held(self, miner_id: int) -> int:
+        return self._held[miner_id]
+
+    def is_active(self, miner_id: int) -> bool:
+        return bool(self._active[miner_id])
+
+    def read(self, miner_id: int) -> Optional[Dict[str, Any]]:
+        i = miner_id
+        for _ in range(READ_RETRIES):
+            s1 = self._seq[i]
+            if s1 & 1:
+                time.sleep(0)
+                continue
+            active = self._active[i]
+            x, y = self._x[i], self._y[i]
+            mined = self._mined[i]
+            status, locked, target = self._status[i], self._locked[i], self._target[i]
+            deposit = self._deposit[i]
+            if self._seq[i] == s1:
+                break
+        else:
+            raise RuntimeError(f"slot {i} preso em escrita (seqlock ímpar)")
+        if not active:
+            return None
+        return {
+            "id": i,
+            "name": miner_name(i),
+            "x": x,
+            "y": y,
+            "color": miner_color(i),
+            "status": STATUSES[status],
+            "mined": int(mined),
+            "locked": bool(locked),
+            "target": TARGETS[target],
+            "deposit": None if deposit < 0 else deposit,
+        }
+
+    def mined_column(self) -> List[float]:
+        # Total minerado de cada slot, NaN se inativo (amostra do histórico;
+        # leitura de palavra única, sem seqlock)
+        return [float(self._mined[i]) if self._active[i] else float("nan") for i in range(self.capacity)]
+
+    def ids(self) -> List[int]:
+        return [i for i in range(self.capacity) if self._active[i]]
+
+    def miners(self) -> Dict[int, Dict[str, Any]]:
+        out = {}
+        for i in range(self.capacity):
+            if self._active[i]:
+                try:
+                    m = self.read(i)
+                except RuntimeError as e:
+                    # Não trava publicador nem checkpoint; o supervisor repara
+                    print(f"[WORLD] {e}")
+                    continue
+                if m is not None:
+                    out[i] = m
+        return out
@@ -0,0 +1,422 @@
+import json
+import math
+import os
+import time
+from dataclasses import dataclass
+from random import Random
+from typing import Any, Dict, Generator, List, Optional, Tuple, Union
+
+from counters import METRICS, PARENT_SHARD, REGEN_SHARD, ShardedCounters, miner_shard
+from deposits import FIELD_H, FIELD_W, MARGIN, SharedDeposits
+from event_ring import EventRings
+from history import SharedHistory
+from locking import CONFLICT_METRICS, LockPolicy
+from log_ring import LogRing
+from metrics import SharedMetrics
+from shm_world import SharedWorld, miner_name
+from wakeup import Doorbell, Signal, Wait
+
+# ----------------------------
+# Simulação (sem a pilha web)
+# ----------------------------
+# Tudo o que roda nos processos filhos: os handles compartilhados, o ator
+# minerador e o regenerador. Não importa FastAPI nem app.py, então o
+# forkserver pré-carrega só este módulo e um host novo nasce pronto.
+#
+# Vários mundos independentes dividem os mesmos hosts. Cada ator tem uma chave
+# global `mundo * (capacidade + 1) + id local`: ids locais 0..capacidade-1 são
+# mineradores e o id local `capacidade` é o regenerador daquele mundo.
+
+# Intervalo entre tentativas de pegar o semáforo sem bloquear o host
+SEM_POLL = 0.02
+# Energia gasta por alvo; o regenerador acorda os mineradores sem energia
+# quando cruza um desses limiares
+ENERGY_NEEDED = {"minerals": 5, "crystals": 8}
+# Distância em que o minerador para ao lado do depósito
+DOCK_RADIUS = 22.0
+# Tick do regenerador (também a resolução crua do histórico)
+REGEN_TICK = 0.25
+RESOURCES = ["minerals", "energy", "crystals"]
+
+# ----------------------------
+# Handles compartilháveis (pickláveis)
+# ----------------------------
+@dataclass
+class SharedHandles:
+    minerals: Any
+    energy: Any
+    crystals: Any
+    running: Any
+    world: SharedWorld
+    counters: ShardedCounters
+    metrics: SharedMetrics
+    logs: LogRing
+    locks: LockPolicy
+    lock: Any
+    events: EventRings
+    # Tocam quando `running` muda e quando a energia cruza um limiar
+    run_signal: Signal
+    energy_signal: Signal
+    history: SharedHistory
+    # Mapa de depósitos; minerals/crystals acima são os totais dele
+    deposits: SharedDeposits
+
+def history_series(capacity: int) -> List[str]:
+    # Recursos, estatísticas e o total de cada minerador ("miner.<id>")
+    return RESOURCES + METRICS + [f"miner.{i}" for i in range(capacity)]
+
+def history_sample(h: SharedHandles) -> List[float]:
+    # Mesma ordem de history_series; só leituras da memória compartilhada
+    totals = h.counters.totals()
+    return ([float(getattr(h, r).value) for r in RESOURCES]
+            + [float(totals[m]) for m in METRICS]
+            + h.world.mined_column())
+
+# ----------------------------
+# Eventos e recursos
+# ----------------------------
+class Worlds:
+    # Handles de todos os mundos (pré-alocados: semáforos e filas só passam
+    # para os hosts na criação; os blocos grandes vêm depois, ver attach) e a
+    # tradução das chaves de ator
+    def __init__(self, handles: List[SharedHandles], bell: Doorbell):
+        self.handles = handles
+        # Condição compartilhada dos sinais (o host espera nela numa thread)
+        self.bell = bell
+        self.capacity = handles[0].world.capacity
+        self.stride = self.capacity + 1
+
+    def __len__(self) -> int:
+        return len(self.handles)
+
+    def key(self, world_id: int, local_id: int) -> int:
+        return world_id * self.stride + local_id
+
+    def regen_key(self, world_id: int) -> int:
+        return self.key(world_id, self.capacity)
+
+    def split(self, key: int) -> Tuple[int, int]:
+        return divmod(key, self.stride)
+
+    def is_miner(self, key: int) -> bool:
+        return key % self.stride < self.capacity
+
+    def keys_of(self, world_id: int, keys: Any) -> List[int]:
+        return [k for k in keys if k // self.stride == world_id]
+
+    def name(self, key: int) -> str:
+        wid, local = self.split(key)
+        return miner_name(local) if local < self.capacity else "Regenerador"
+
+    # Usados pelo host (runtime.host_main)
+    def tag(self, key: int) -> str:
+        # Prefixo das pilhas do ator no profiler
+        wid, local = self.split(key)
+        return f"world-{wid};" + (f"miner-{local}" if local < self.capacity else "regenerator")
+
+    def actor(self, key: int, **args: Any) -> Generator[Union[float, Wait], None, None]:
+        wid, local = self.split(key)
+        if local == self.capacity:
+            return regenerator_actor(self.handles[wid])
+        return miner_actor(local, self.handles[wid], **args)
+
+    def beat(self, key: int) -> None:
+        wid, local = self.split(key)
+        if local < self.capacity:
+            self.handles[wid].world.beat(local)
+
+    def account(self, key: int, seconds: float) -> None:
+        # Tempo de CPU gasto pelo ator, no shard dele (um host por vez o executa)
+        wid, local = self.split(key)
+        shard = miner_shard(local) if local < self.capacity else REGEN_SHARD
+        self.handles[wid].metrics.usage(shard, seconds)
+
+    def release(self, key: int) -> None:
+        wid, local = self.split(key)
+        if local < self.capacity:
+            self.handles[wid].world.remove(local)
+
+    # Blocos grandes que só existem com o mundo aberto (histórico e anéis de
+    # eventos): o pai cria/remove, os hosts vivos recebem os nomes por "attach"
+    def blocks(self, world_id: int) -> Dict[str, Optional[str]]:
+        h = self.handles[world_id]
+        return {"history": h.history.name, "events": h.events.name}
+
+    def attach(self, world_id: int, blocks: Dict[str, Optional[str]]) -> None:
+        h = self.handles[world_id]
+        h.history.attach(blocks["history"])
+        h.events.attach(blocks["events"])
+
+def push_event(h: SharedHandles, event: Dict[str, Any], shard: int = PARENT_SHARD) -> None:
+    # `shard`: produtor do evento (ver event_ring.py); JSON codificado uma vez, aqui
+    try:
+        data = json.dumps(event, ensure_ascii=False).encode("utf-8")
+    except (TypeError, ValueError) as e:
+        print(f"[EVENTS] Evento não serializável: {e}")
+        return
+    h.events.put(shard, data)
+
+def push_log(h: SharedHandles, message: str, level: str = "info", shard: int = PARENT_SHARD) -> None:
+    try:
+        entry = h.logs.append(message, level)
+    except:
+        return
+    
+    push_event(h, {"type": "log", "ts": time.time(), "data": entry}, shard)
+
+def take(value: Any, amount: int) -> int:
+    # Retira até `amount` de um mp.Value de forma atômica; devolve o retirado
+    with value.get_lock():
+        got = min(amount, value.value)
+        value.value -= got
+        return got
+
+def give(value: Any, amount: int, cap: int) -> Tuple[int, int]:
+    # Devolve (antes, depois), lidos sob o mesmo lock
+    with value.get_lock():
+        before = value.value
+        value.value = min(cap, before + amount)
+        return before, value.value
+
+def set_running(h: SharedHandles, running: bool) -> None:
+    # Acorda os mineradores parados no sinal de execução
+    h.running.value = running
+    h.run_signal.ring()
+
+# ----------------------------
+# Workers
+# ----------------------------
+def miner_actor(miner_id: int, h: SharedHandles, x: Optional[float] = None, y: Optional[float] = None,
+                mined: int = 0) -> Generator[Union[float, Wait], None, None]:
+    # Minerador cooperativo: cada `yield t` devolve o controle ao host por t segundos;
+    # `yield Wait(...)` devolve até o sinal tocar
+    rng = Random(os.getpid() ^ miner_id ^ time.time_ns())
+    name = miner_name(miner_id)
+    shard = miner_shard(miner_id)
+    
+    print(f"[WORKER {miner_id}] Iniciando no host PID={os.getpid()}")
+
+    # Posição e total ficam locais: o minerador é o único escritor do seu slot.
+    # Um checkpoint restaurado informa onde ele estava e quanto já minerou.
+    if x is None or y is None:
+        x = MARGIN + rng.random() * (FIELD_W - 2 * MARGIN)
+        y = MARGIN + rng.random() * (FIELD_H - 2 * MARGIN)
+
+    # Registro inicial
+    try:
+        h.world.register(miner_id, x, y, mined)
+        push_log(h, f"✅ {name} iniciado (PID: {os.getpid()})", "success", shard)
+    except Exception as e:
+        print(f"[WORKER {miner_id}] Erro no registro: {e}")
+        return
+
+    try:
+        iteration = 0
+        while True:
+            iteration += 1
+            
+            # Verifica se deve continuar
+            try:
+                seen = h.run_signal.generation
+                is_running = h.running.value
+            except:
+                break
+
+            if not is_running:
+                # Pausado: fora do heap do host até /api/start tocar o sinal
+                h.world.update(miner_id, status="idle", target=None)
+                yield Wait(h.run_signal, seen)
+                continue
+
+            # Decide se vai tentar minerar
+            attempt = rng.random() < 0.7
+            target = "minerals" if rng.random() < 0.6 else "crystals"
+
+            # Atualiza status: aguardando
+            h.world.update(miner_id, target=target, status="waiting", locked=False)
+
+            if attempt:
+                # VERIFICA ENERGIA ANTES DE TENTAR MINERAR
+                energy_needed = ENERGY_NEEDED[target]
+                
+                seen = h.energy_signal.generation
+                if h.energy.value < energy_needed:
+                    # Sem energia suficiente!
+                    if rng.random() < 0.15:  # Log ocasional
+                        push_log(h, f"⚠️ {name} sem energia suficiente", "warning", shard)
+                        h.counters.add(shard, "energyDepleted")
+                    
+                    h.world.update(miner_id, status="no_energy", target=None)
+                    # Parado até o regenerador cruzar um limiar de energia
+                    yield Wait(h.energy_signal, seen)
+                    continue
+                
+                # Depósito com recurso mais perto (índice em grade, sem varrer o mapa)
+                deposit = h.deposits.nearest(target, x, y)
+                if deposit is None:
+                    # Todos os depósitos desse tipo vazios: espera a regeneração
+                    h.world.update(miner_id, status="idle", target=None)
+                    yield 0.5 + rng.random() * 0.7
+                    continue
+
+                # Voa até o depósito e para ao lado dele
+                dx, dy = h.deposits.position(deposit)
+                angle = rng.random() * 2 * math.pi
+                x = max(MARGIN, min(FIELD_W - MARGIN, dx + DOCK_RADIUS * math.cos(angle)))
+                y = max(MARGIN, min(FIELD_H - MARGIN, dy + DOCK_RADIUS * math.sin(angle)))
+                h.world.update(miner_id, x=x, y=y, deposit=deposit)
+
+                # Tenta adquirir os locks do depósito (sem bloquear o host: tenta e cede a vez)
+                h.counters.add(shard, "attempts")
+                plan = h.locks.plan(deposit)
+                wait_started = time.monotonic()
+                contended = yield from h.locks.acquire(plan, timeout=1.0, poll=SEM_POLL)
+                h.metrics.observe(miner_id, "wait", time.monotonic() - wait_started)
+                if contended is None:
+                    # Publica os locks segurados (o supervisor devolve se o host morrer)
+                    h.world.set_held(miner_id, h.locks.mask(plan))
+                
+                if contended is not None:
+                    # Conflito!
+                    h.counters.add(shard, "conflicts")
+                    h.counters.add(shard, CONFLICT_METRICS.get(contended, CONFLICT_METRICS[target]))
+                    h.world.update(miner_id, status="blocked")
+                    print(f"[WORKER {miner_id}] Conflito detectado ({contended})!")
+                    yield 0.4 + rng.random() * 0.5
+                    continue
+
+                # Entrou na seção crítica
+                held_since = time.monotonic()
+                try:
+                    # Marca como minerando
+                    h.world.update(miner_id, locked=True, status="mining")
+
+                    # Simula tempo de mineração
+                    yield 0.4 + rng.random() * 0.5
+
+                    # Lock de energia (políticas por depósito): segurado só no débito.
+                    # Como os de depósito, sem bloquear o host: tenta e cede a vez
+                    energy_lock = h.locks.energy_lock()
+                    contended = None
+                    if energy_lock is not None:
+                        contended = yield from h.locks.acquire(["energy"], timeout=1.0, poll=SEM_POLL)
+                    if contended is not None:
+                        h.counters.add(shard, "conflicts")
+                        h.counters.add(shard, CONFLICT_METRICS["energy"])
+                        print(f"[WORKER {miner_id}] Conflito detectado (energy)!")
+                    else:
+                        if energy_lock is not None:
+                            h.world.set_held(miner_id, h.locks.mask(plan + ["energy"]))
+                        try:
+                            # VERIFICA ENERGIA NOVAMENTE (pode ter sido consumida por outro)
+                            if h.energy.value < energy_needed:
+                                push_log(h, f"⚠️ {name} ficou sem energia durante mineração", "warning", shard)
+                                h.counters.add(shard, "energyDepleted")
+                            else:
+                                if target == "minerals":
+                                    delta = h.deposits.take(deposit, 5, h.minerals)
+                                    if delta > 0:
+                                        spent = take(h.energy, 5)  # CONSUMO AUMENTADO
+                                        h.counters.add(shard, "totalMined", delta)
+                                        h.counters.add(shard, "mineralsMined", delta)
+                                        h.counters.add(shard, "energyConsumed", spent)
+                                        h.counters.add(shard, "synchronized")
+
+                                        mined += delta
+                                        h.world.update(miner_id, mined=mined)
+
+                                        push_log(h, f"⛏️ {name} minerou {delta} minerais no depósito {deposit} (-5 energia)", "success", shard)
+                                        print(f"[WORKER {miner_id}] Minerou {delta} minerais (Energia: {h.energy.value})")
+                                else:
+                                    delta = h.deposits.take(deposit, 3, h.crystals)
+                                    if delta > 0:
+                                        spent = take(h.energy, 8)  # CONSUMO AUMENTADO
+                                        h.counters.add(shard, "totalMined", delta)
+                                        h.counters.add(shard, "crystalsMined", delta)
+                                        h.counters.add(shard, "energyConsumed", spent)
+                                        h.counters.add(shard, "synchronized")
+
+                                        mined += delta
+                                        h.world.update(miner_id, mined=mined)
+
+                                        push_log(h, f"💎 {name} coletou {delta} cristais no depósito {deposit} (-8 energia)", "success", shard)
+                                        print(f"[WORKER {miner_id}] Coletou {delta} cristais (Energia: {h.energy.value})")
+
+                        except Exception as e:
+                            print(f"[WORKER {miner_id}] Erro ao minerar: {e}")
+                        finally:
+                            if energy_lock is not None:
+                                h.world.set_held(miner_id, h.locks.mask(plan))
+                                energy_lock.release()
+
+                finally:
+                    # Libera os locks do depósito
+                    h.world.update(miner_id, locked=False, status="idle", target=None, deposit=None)
+                    
+                    h.world.set_held(miner_id, 0)
+                    h.locks.release(plan)
+                    h.metrics.observe(miner_id, "hold", time.monotonic() - held_since)
+
+            else:
+                # Movimento sem minerar
+                x = max(MARGIN, min(FIELD_W - MARGIN, x + rng.uniform(-20, 20)))
+                y = max(MARGIN, min(FIELD_H - MARGIN, y + rng.uniform(-15, 15)))
+                h.world.update(miner_id, x=x, y=y, status="idle", target=None, deposit=None)
+
+            # Pausa entre ações
+            yield 0.5 + rng.random() * 0.7
+
+    except KeyboardInterrupt:
+        print(f"[WORKER {miner_id}] Interrompido por usuário")
+    except Exception as ex:
+        print(f"[WORKER {miner_id}] Erro fatal: {ex}")
+        push_log(h, f"❌ {name} falhou: {ex}", "error", shard)
+    finally:
+        try:
+            if h.world.is_active(miner_id):
+                h.world.update(miner_id, status="terminated")
+        except:
+            pass
+        push_log(h, f"🛑 {name} finalizado", "warning", shard)
+        print(f"[WORKER {miner_id}] Finalizado")
+
+def regenerator_actor(h: SharedHandles) -> Generator[float, None, None]:
+    # Ator como os mineradores: vários mundos dividem os mesmos hosts em vez
+    # de um processo regenerador por mundo
+    print(f"[REGEN] Regenerador iniciado no host PID={os.getpid()}")
+    push_log(h, "🔧 Regenerador de recursos iniciado", "info", REGEN_SHARD)
+    tick = 0
+    # Agregados do histórico ficam neste ator; só os pontos vão para o bloco
+    recorder = h.history.recorder()
+    try:
+        while True:
+            tick += 1
+            try:
+                # REGENERAÇÃO MAIS LENTA E BALANCEADA
+                # Minerais e cristais voltam nos depósitos (um por vez, em rodízio)
+                h.deposits.grow("minerals", 1, h.minerals)  # Reduzido de 2 para 1
+                before, after = give(h.energy, 2, 100)    # Reduzido de 3 para 2
+                if any(before < need <= after for need in ENERGY_NEEDED.values()):
+                    h.energy_signal.ring()
+                
+                # Cristais a cada 5 ticks (~1.25 segundos)
+                if tick % 5 == 0:
+                    h.deposits.grow("crystals", 1, h.crystals)
+                
+                # Log de energia baixa
+                if h.energy.value < 20 and tick % 8 == 0:
+                    push_log(h, f"⚡ Energia baixa: {h.energy.value}%", "warning", REGEN_SHARD)
+                    
+            except Exception as e:
+                print(f"[REGEN] Erro ao regenerar: {e}")
+
+            h.world.touch()
+
+            try:
+                recorder.record(history_sample(h))
+            except Exception as e:
+                print(f"[REGEN] Erro ao gravar histórico: {e}")
+
+            yield REGEN_TICK  # 4 vezes por segundo
+    finally:
+        print("[REGEN] Finalizado")
@@ -0,0 +1,140 @@
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# ----------------------------
+# Deltas versionados do estado
+# ----------------------------
+# Mantém o último estado publicado e sua versão. A cada mudança gera um delta
+# com apenas os campos alterados; a versão cresce de 1 em 1, então o cliente
+# detecta lacunas comparando com a última versão aplicada.
+#
+# Formato do delta (todos os valores são absolutos, nunca incrementos):
+#   {"resources": {...}, "stats": {...}, "isRunning": bool,
+#    "miners": {id: {campos alterados}}, "removed": [ids],
+#    "deposits": {id: {"amount": n}}}
+#
+# O mapa de depósitos é fixo: o snapshot traz posição, tipo e capacidade e os
+# deltas só a quantidade que mudou.
+
+def _diff_flat(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in new.items() if old.get(k) != v}
+
+
+def _diff_nested(old: Dict[Any, Any], new: Dict[Any, Any]) -> Dict[Any, Any]:
+    out = {}
+    for key, item in new.items():
+        prev = old.get(key)
+        changed = dict(item) if prev is None else _diff_flat(prev, item)
+        if changed:
+            out[key] = changed
+    return out
+
+
+def diff_state(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    delta: Dict[str, Any] = {}
+
+    for key in ("resources", "stats"):
+        changed = _diff_flat(old.get(key, {}), new.get(key, {}))
+        if changed:
+            delta[key] = changed
+
+    if old.get("isRunning") != new.get("isRunning"):
+        delta["isRunning"] = new.get("isRunning")
+
+    old_miners = old.get("miners", {})
+    new_miners = new.get("miners", {})
+    miners = _diff_nested(old_miners, new_miners)
+    if miners:
+        delta["miners"] = miners
+    removed = [mid for mid in old_miners if mid not in new_miners]
+    if removed:
+        delta["removed"] = removed
+
+    deposits = _diff_nested(old.get("deposits", {}), new.get("deposits", {}))
+    if deposits:
+        delta["deposits"] = deposits
+
+    return delta
+
+
+class StateTracker:
+    def __init__(self, build: Callable[[], Dict[str, Any]]):
+        self._build = build
+        self._lock = threading.Lock()
+        self.version = 0
+        self._last: Optional[Dict[str, Any]] = None
+
+    def advance(self) -> Optional[Dict[str, Any]]:
+        # Lê o estado atual e devolve o evento de delta, ou None se nada mudou
+        new = self._build()
+        with self._lock:
+            if self._last is None:
+                self._last = new
+                return None
+            delta = diff_state(self._last, new)
+            if not delta:
+                return None
+            self._last = new
+            self.version += 1
+            # ts: instante de produção (latência fim a fim no cliente)
+            return {"type": "delta", "version": self.version, "ts": time.time(), "data": delta}
+
+    def snapshot(self) -> Tuple[int, Dict[str, Any]]:
+        # Versão e estado da mesma base dos deltas: o delta version+1 é
+        # calculado contra exatamente este estado. Um estado recém-lido seria
+        # mais novo que `_last`, e o que mudou e voltou (ou um minerador criado
+        # e removido) entre os dois nunca seria corrigido no cliente.
+        with self._lock:
+            if self._last is None:
+                self._last = self._build()
+            return self.version, dict(self._last)
+
+
+# ----------------------------
+# Publicador com taxa limitada
+# ----------------------------
+# Produtores só incrementam um contador de geração na memória compartilhada.
+# O publicador acorda `hz` vezes por segundo e, se a geração mudou, gera um
+# único delta: uma rajada de mudanças vira um só frame.
+
+class StatePublisher:
+    def __init__(self, tracker: StateTracker, generation: Callable[[], int],
+                 publish: Callable[[Dict[str, Any]], None], hz: float = 10.0):
+        self.tracker = tracker
+        self.generation = generation
+        self.publish = publish
+        self.interval = 1.0 / max(0.1, hz)
+        self.frames = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        seen = None
+        while True:
+            started = loop.time()
+            gen = self.generation()
+            if gen != seen:
+                seen = gen
+                try:
+                    delta = await loop.run_in_executor(None, self.tracker.advance)
+                except Exception as e:
+                    print(f"[PUBLISHER] Erro ao gerar delta: {e}")
+                    delta = None
+                if delta is not None:
+                    self.frames += 1
+                    self.publish(delta)
+            await asyncio.sleep(max(0.0, self.interval - (loop.time() - started)))
@@ -0,0 +1,251 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# ----------------------------
+# Supervisor de mineradores (heartbeats em memória compartilhada)
+# ----------------------------
+# Cada retomada de um ator grava seu heartbeat na tabela do mundo, e o ator
+# publica ali a máscara dos locks que segura. A cada `interval` o supervisor
+# agenda uma verificação no gerente de ciclo de vida (dono do pool):
+#
+#   host morto            -> devolve os locks dos seus mineradores e agenda restart
+#   host a menos no pool  -> sobe outro (pool quente), antes dos restarts
+#   heartbeat velho       -> pinga o host: se responde, o ator morreu e é recriado
+#                            no mesmo host; se não, o host travou e é morto (locks
+#                            devolvidos, mineradores reiniciados em outro host)
+#
+# Locks só são devolvidos depois que o processo que os segurava morreu, então
+# nunca há liberação em dobro. Restarts seguem a política configurada, com
+# backoff exponencial e limite de tentativas seguidas.
+#
+# O pool guarda atores de todos os mundos por chave global (simulation.Worlds);
+# cada chave aponta para a tabela e os locks do seu mundo. Regeneradores não
+# têm slot nem heartbeat: se o host morre, voltam sempre (sem política).
+
+RESTART_POLICIES = ("on-failure", "never")
+
+ACTIONS = [
+    "crash",
+    "stall",
+    "stall_holding",
+    "force_release",
+    "restart_scheduled",
+    "restart",
+    "restart_failed",
+    "give_up",
+    "host_spawn",
+]
+
+# Tentativas seguidas voltam a zero depois desse tempo sem falhas
+RESTART_RESET_AFTER = 60.0
+
+Report = Callable[[str, Optional[int], str, str, Dict[str, Any]], None]
+
+
+class Supervisor:
+    def __init__(self, pool: Any, worlds: Any, lifecycle: Any, report: Report,
+                 interval: float = 1.0, stall_timeout: float = 5.0, policy: str = "on-failure",
+                 max_restarts: int = 5, backoff: float = 0.5, backoff_max: float = 30.0):
+        if policy not in RESTART_POLICIES:
+            raise ValueError(f"política de restart desconhecida: {policy}")
+        self.pool = pool
+        self.worlds = worlds
+        self.lifecycle = lifecycle
+        self.report = report
+        self.interval = interval
+        self.stall_timeout = stall_timeout
+        self.policy = policy
+        self.max_restarts = max_restarts
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        # Só tocados na thread do gerente de ciclo de vida
+        self.pending: Dict[int, float] = {}  # chave -> quando reiniciar
+        self.failures: Dict[int, List[float]] = {}  # chave -> [seguidas, última falha]
+        self.actions: Dict[str, int] = {a: 0 for a in ACTIONS}
+        self._queued = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ----------------------------
+    # Thread do relógio: só enfileira verificações
+    # ----------------------------
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="supervisor", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        print(f"[SUPERVISOR] Iniciado (stall={self.stall_timeout}s, restart={self.policy})")
+        while not self._stop.wait(self.interval):
+            if not self._queued:
+                self._queued = True
+                self.lifecycle.submit("supervise", self._tick, internal=True)
+
+    def _tick(self) -> Dict[str, Any]:
+        try:
+            self.tick()
+        finally:
+            self._queued = False
+        return {}
+
+    # ----------------------------
+    # Verificações (thread do gerente)
+    # ----------------------------
+    def tick(self) -> None:
+        self.reap()
+        self.check_stalls()
+        self.top_up()
+        self.restart_due()
+
+    def top_up(self) -> None:
+        # Repõe hosts perdidos no pool quente, antes dos restarts precisarem deles
+        for host in self.pool.top_up():
+            took = f"{host.cold_start:.3f}s" if host.cold_start is not None else "sem resposta"
+            self._act("host_spawn", None, f"🔥 Host {host.id} reposto no pool (PID: {host.proc.pid}, {took})",
+                      "info", host=host.id, coldStart=host.cold_start)
+
+    def _act(self, action: str, miner_id: Optional[int], message: str, level: str, **data: Any) -> None:
+        self.actions[action] += 1
+        try:
+            self.report(action, miner_id, message, level, data)
+        except Exception as e:
+            print(f"[SUPERVISOR] Erro ao reportar {action}: {e}")
+
+    def _slot(self, key: int) -> Any:
+        # (handles do mundo, id local)
+        wid, local = self.worlds.split(key)
+        return self.worlds.handles[wid], local
+
+    def reap(self) -> None:
+        # Hosts mortos (crash, OOM, kill externo)
+        for key in self.pool.reap_dead():
+            self._act("crash", key, f"💥 {self.worlds.name(key)} perdido: host morreu", "error")
+            self._lost(key, "crash")
+
+    def _lost(self, key: int, reason: str) -> None:
+        if not self.worlds.is_miner(key):
+            # Regenerador: sem locks nem slot; volta na próxima verificação
+            self.pending[key] = time.monotonic()
+            return
+        # O processo que rodava o minerador não existe mais: devolve seus locks
+        # e conserta o seqlock se ele morreu no meio de uma escrita
+        h, mid = self._slot(key)
+        h.world.repair(mid)
+        mask = h.world.held(mid)
+        if mask:
+            names = h.locks.unmask(mask)
+            h.world.set_held(mid, 0)
+            h.locks.release(names)
+            self._act("force_release", key, f"🔓 Locks de Minerador-{mid} devolvidos: {', '.join(names)}",
+                      "warning", locks=names)
+        if h.world.is_active(mid):
+            h.world.update(mid, status="terminated", locked=False, target=None)
+        self._schedule(key, reason)
+
+    def check_stalls(self) -> None:
+        stale: Dict[int, List[int]] = {}
+        for key, host_id in list(self.pool.placement.items()):
+            if key in self.pending or not self.worlds.is_miner(key):
+                continue
+            h, mid = self._slot(key)
+            age = h.world.beat_age(mid)
+            if age <= self.stall_timeout:
+                continue
+            stale.setdefault(host_id, []).append(key)
+            mask = h.world.held(mid)
+            if mask:
+                names = h.locks.unmask(mask)
+                self._act("stall_holding", key, f"⏱️ Minerador-{mid} parado há {age:.1f}s segurando {', '.join(names)}",
+                          "error", age=round(age, 2), locks=names, host=host_id)
+            else:
+                self._act("stall", key, f"⏱️ Minerador-{mid} parado há {age:.1f}s", "warning",
+                          age=round(age, 2), host=host_id)
+
+        for host_id, mids in stale.items():
+            host = self.pool.hosts.get(host_id)
+            if host is None:
+                continue
+            if self.pool.call(host, "ping", timeout=1.0):
+                # Host responde: só o ator morreu; "add" recria no mesmo host
+                for key in mids:
+                    self._schedule(key, "stall")
+            else:
+                print(f"[SUPERVISOR] Host {host_id} travado, encerrando PID={host.proc.pid}")
+                for key in self.pool.kill_host(host_id):
+                    self._lost(key, "stall")
+
+    def _schedule(self, key: int, reason: str) -> None:
+        name = self.worlds.name(key)
+        if self.policy == "never":
+            self._give_up(key, reason)
+            return
+        now = time.monotonic()
+        count, last = self.failures.get(key, [0, 0.0])
+        if now - last > RESTART_RESET_AFTER:
+            count = 0
+        count += 1
+        self.failures[key] = [count, now]
+        if count > self.max_restarts:
+            self._give_up(key, reason)
+            return
+        delay = min(self.backoff_max, self.backoff * 2 ** (count - 1))
+        self.pending[key] = now + delay
+        self._act("restart_scheduled", key, f"🔁 {name} reinicia em {delay:.1f}s (tentativa {count})",
+                  "info", reason=reason, attempt=count, delay=delay)
+
+    def _give_up(self, key: int, reason: str) -> None:
+        self.pending.pop(key, None)
+        self.failures.pop(key, None)
+        if key in self.pool.placement:
+            self.pool.remove(key)
+        h, mid = self._slot(key)
+        h.world.remove(mid)
+        self._act("give_up", key, f"🪦 Minerador-{mid} removido após falhas ({reason})", "error",
+                  reason=reason)
+
+    def restart_due(self) -> None:
+        now = time.monotonic()
+        for key, due in list(self.pending.items()):
+            if due > now:
+                continue
+            self.pending.pop(key, None)
+            name = self.worlds.name(key)
+            host = self.pool.host_of(key)
+            if host is not None and host.proc.is_alive():
+                ok = self.pool.call(host, "add", key)
+            else:
+                self.pool.placement.pop(key, None)
+                ok = self.pool.add(key) is not None
+            if ok:
+                self._act("restart", key, f"♻️ {name} reiniciado", "success")
+            elif self.worlds.is_miner(key):
+                self._act("restart_failed", key, f"❌ Falha ao reiniciar {name}", "error")
+                self._schedule(key, "restart_failed")
+            else:
+                self._act("restart_failed", key, f"❌ Falha ao reiniciar {name}", "error")
+                self.pending[key] = now + self.backoff_max
+
+    # ----------------------------
+    # Usados pelas operações de ciclo de vida
+    # ----------------------------
+    def reserved(self, world_id: int) -> List[int]:
+        # Ids locais aguardando restart fora do pool (não podem ser reutilizados)
+        keys = [k for k in self.pending if k not in self.pool.placement and self.worlds.is_miner(k)]
+        return [self.worlds.split(k)[1] for k in self.worlds.keys_of(world_id, keys)]
+
+    def cancel(self, key: int) -> bool:
+        self.failures.pop(key, None)
+        return self.pending.pop(key, None) is not None
+
+    def clear(self, world_id: int) -> None:
+        # Só mineradores: o regenerador do mundo continua sendo reposto
+        for key in self.worlds.keys_of(world_id, list(self.pending)):
+            if self.worlds.is_miner(key):
+                self.pending.pop(key, None)
+        for key in self.worlds.keys_of(world_id, list(self.failures)):
+            self.failures.pop(key, None)
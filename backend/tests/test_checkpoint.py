@@ -0,0 +1,116 @@
+import struct
+import zlib
+
+import pytest
+
+from checkpoint import _CRC, _HEADER, Checkpoint, load, save
+
+
+def sample() -> Checkpoint:
+    return Checkpoint(
+        saved_at=1792198800.25,
+        version=2 ** 64 - 3,
+        resources={"minerals": 73, "energy": 41, "crystals": -2},
+        running=True,
+        stats={"totalMined": 1234, "conflicts": 7, "energyConsumed": 2 ** 40},
+        miners={
+            0: {"x": 25.0, "y": 375.5, "mined": 90},
+            7: {"x": 350.125, "y": 200.0, "mined": 0},
+            65535: {"x": 675.0, "y": 25.0, "mined": 2 ** 33},
+        },
+        deposits=[20, 0, 13, 10, 1],
+    )
+
+
+def with_crc(body: bytes) -> bytes:
+    return body + _CRC.pack(zlib.crc32(body))
+
+
+def test_round_trip_in_memory():
+    cp = sample()
+    assert Checkpoint.decode(cp.encode()) == cp
+
+
+def test_round_trip_empty_world():
+    cp = Checkpoint(saved_at=0.0, version=0, resources={"minerals": 0, "energy": 0, "crystals": 0},
+                    running=False, stats={})
+    assert Checkpoint.decode(cp.encode()) == cp
+
+
+def test_save_then_load(tmp_path):
+    path = str(tmp_path / "checkpoint.bin")
+    cp = sample()
+    size = save(path, cp)
+    assert size == len(cp.encode())
+    assert load(path) == cp
+    # A troca é atômica: o temporário não sobra
+    assert [p.name for p in tmp_path.iterdir()] == ["checkpoint.bin"]
+
+
+def test_save_replaces_previous(tmp_path):
+    path = str(tmp_path / "checkpoint.bin")
+    save(path, sample())
+    newer = sample()
+    newer.version = 5
+    newer.miners = {}
+    save(path, newer)
+    assert load(path) == newer
+
+
+def test_load_missing_file(tmp_path):
+    assert load(str(tmp_path / "nada.bin")) is None
+
+
+def test_truncated_file_is_rejected(tmp_path):
+    raw = sample().encode()
+    path = tmp_path / "checkpoint.bin"
+    for size in (0, 1, _HEADER.size, _HEADER.size + _CRC.size, len(raw) // 2, len(raw) - 1):
+        path.write_bytes(raw[:size])
+        with pytest.raises(ValueError):
+            load(str(path))
+
+
+def test_corrupted_crc_is_rejected(tmp_path):
+    raw = bytearray(sample().encode())
+    raw[-1] ^= 0xFF
+    path = tmp_path / "checkpoint.bin"
+    path.write_bytes(bytes(raw))
+    with pytest.raises(ValueError, match="crc"):
+        load(str(path))
+
+
+def test_corrupted_body_is_rejected():
+    raw = sample().encode()
+    for i in (0, 10, _HEADER.size + 3, len(raw) - _CRC.size - 1):
+        bad = bytearray(raw)
+        bad[i] ^= 0x01
+        with pytest.raises(ValueError, match="crc"):
+            Checkpoint.decode(bytes(bad))
+
+
+def test_truncated_body_with_valid_crc_is_rejected():
+    # Contagens do cabeçalho maiores que o arquivo: ValueError, não struct.error
+    body = sample().encode()[:-_CRC.size]
+    for size in (_HEADER.size, _HEADER.size + 5, len(body) - 3):
+        with pytest.raises(ValueError, match="inconsistente"):
+            Checkpoint.decode(with_crc(body[:size]))
+
+
+def test_unknown_format_is_rejected():
+    body = bytearray(sample().encode()[:-_CRC.size])
+    struct.pack_into("<H", body, 4, 99)
+    with pytest.raises(ValueError, match="formato"):
+        Checkpoint.decode(with_crc(bytes(body)))
+    body[0:4] = b"XXXX"
+    with pytest.raises(ValueError, match="formato"):
+        Checkpoint.decode(with_crc(bytes(body)))
+
+
+def test_format_1_without_deposits_is_still_read():
+    cp = sample()
+    cp.deposits = []
+    body = bytearray(cp.encode()[:-_CRC.size])
+    # Formato 1: mesmo layout, sem a seção de depósitos (o u32 n_deposits)
+    struct.pack_into("<H", body, 4, 1)
+    old = Checkpoint.decode(with_crc(bytes(body[:-4])))
+    assert old == cp
@@ -0,0 +1,90 @@
+import math
+from random import Random
+
+import pytest
+
+from deposits import FIELD_H, FIELD_W, KINDS, SharedDeposits
+
+
+@pytest.fixture
+def deposits():
+    d = SharedDeposits(300, seed=7, cell=50.0)
+    yield d
+    d.close()
+
+
+def brute_force(d: SharedDeposits, kind: str, x: float, y: float, available=None):
+    # Varredura do mapa inteiro: distância ao quadrado do melhor, ou None
+    ok = available or (lambda i: d._amount[i] > 0)
+    best = math.inf
+    for i in range(d.count):
+        if d.kind(i) == kind and ok(i):
+            dx, dy = d.position(i)
+            best = min(best, (dx - x) ** 2 + (dy - y) ** 2)
+    return None if best == math.inf else best
+
+
+def distance(d: SharedDeposits, i, x: float, y: float):
+    if i is None:
+        return None
+    dx, dy = d.position(i)
+    return (dx - x) ** 2 + (dy - y) ** 2
+
+
+def points(rng: Random, n: int):
+    # Pontos no campo, nas bordas e fora dele (coordenadas são limitadas à grade)
+    out = [(0, 0), (FIELD_W, FIELD_H), (-50, 200), (FIELD_W + 80, -30)]
+    out += [(rng.uniform(-20, FIELD_W + 20), rng.uniform(-20, FIELD_H + 20)) for _ in range(n)]
+    return out
+
+
+def test_nearest_matches_brute_force(deposits):
+    rng = Random(1)
+    for round_ in range(5):
+        # Esvazia uma fração crescente dos depósitos
+        for i in range(deposits.count):
+            if rng.random() < round_ * 0.2:
+                deposits._amount[i] = 0
+        for x, y in points(rng, 200):
+            for kind in KINDS:
+                got = deposits.nearest(kind, x, y)
+                assert distance(deposits, got, x, y) == brute_force(deposits, kind, x, y)
+
+
+def test_nearest_with_a_single_deposit_left(deposits):
+    for i in range(deposits.count):
+        deposits._amount[i] = 0
+    last = deposits.count - 1
+    deposits._amount[last] = 1
+    kind = deposits.kind(last)
+    for x, y in points(Random(2), 50):
+        assert deposits.nearest(kind, x, y) == last
+
+
+def test_nearest_when_every_deposit_is_empty(deposits):
+    for i in range(deposits.count):
+        deposits._amount[i] = 0
+    for x, y in points(Random(3), 50):
+        for kind in KINDS:
+            assert deposits.nearest(kind, x, y) is None
+            assert brute_force(deposits, kind, x, y) is None
+
+
+def test_nearest_with_available_filter(deposits):
+    # `available` substitui o teste de quantidade (ex.: depósitos sem fila)
+    available = lambda i: i % 3 == 0
+    for x, y in points(Random(4), 100):
+        for kind in KINDS:
+            got = deposits.nearest(kind, x, y, available)
+            assert distance(deposits, got, x, y) == brute_force(deposits, kind, x, y, available)
+
+
+@pytest.mark.parametrize("cell", [7.0, 50.0, 1000.0])
+def test_nearest_for_any_cell_size(cell):
+    d = SharedDeposits(40, seed=11, cell=cell)
+    try:
+        for x, y in points(Random(5), 100):
+            for kind in KINDS:
+                assert distance(d, d.nearest(kind, x, y), x, y) == brute_force(d, kind, x, y)
+    finally:
+        d.close()
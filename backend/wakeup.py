@@ -0,0 +1,134 @@
+import multiprocessing as mp
+import os
+import signal
+import time
+from typing import List, Optional
+
+# ----------------------------
+# Sinais de despertar (gerações + um semáforo por host)
+# ----------------------------
+# Atores parados (pausa, falta de energia) não fazem polling: cedem ao host um
+# `Wait(sinal, geração)` e saem do heap de timers. Quem muda o que eles
+# esperam (POST /api/start, o regenerador ao cruzar um limiar de energia)
+# incrementa a geração do sinal e acorda os hosts.
+#
+# Cada host tem uma thread (zero CPU) bloqueada no próprio semáforo de
+# assinante; quando alguma geração muda, ela põe um comando "wake" na fila do
+# host, e o loop retoma só os atores cujo sinal mudou desde que pararam.
+#
+# Nada aqui segura lock entre processos: tocar é incrementar a geração e dar
+# release() nos semáforos dos hosts marcados como esperando, e release nunca
+# bloqueia. Um host morto (SIGKILL, OOM, kill_host do supervisor) no meio da
+# espera deixa no máximo uma permissão sobrando para quem reusar o slot; com
+# uma mp.Condition compartilhada, o próximo notify_all travava para sempre.
+#
+# Incrementos concorrentes da mesma geração podem colidir, mas o valor sempre
+# muda (como a versão do mundo). A espera tem timeout: hosts sem slot de
+# assinante (ids além dos pré-alocados) apenas comparam as gerações.
+#
+# O ator lê a geração ANTES de testar a condição: se o sinal tocar entre o
+# teste e o `yield`, o host vê a geração diferente e o retoma na hora.
+#
+# Como semáforos e filas, tudo isso só chega aos hosts na criação deles: os
+# sinais de todos os mundos e os slots dos hosts são alocados juntos no pai.
+
+# Espera máxima do vigia antes de reler as gerações
+WATCH_TIMEOUT = 1.0
+
+
+class Doorbell:
+    def __init__(self, slots: int, subscribers: int):
+        self.generations = mp.Array('Q', slots, lock=False)
+        # Um semáforo por host (slot = id do host) e a marca "estou esperando"
+        self.bells = [mp.Semaphore(0) for _ in range(subscribers)]
+        self.waiting = mp.Array('B', subscribers, lock=False)
+
+    def signal(self, slot: int) -> "Signal":
+        return Signal(self, slot)
+
+    def ring(self, slot: int) -> None:
+        self.generations[slot] = (self.generations[slot] + 1) & 0xFFFFFFFFFFFFFFFF
+        for i, bell in enumerate(self.bells):
+            if self.waiting[i]:
+                self.waiting[i] = 0
+                bell.release()
+
+    def snapshot(self) -> List[int]:
+        return self.generations[:]
+
+    def wait(self, seen: List[int], subscriber: int, timeout: Optional[float] = WATCH_TIMEOUT) -> List[int]:
+        # Bloqueia até alguma geração diferir de `seen` (ou timeout); devolve as atuais
+        if subscriber >= len(self.bells):
+            if self.generations[:] == seen:
+                time.sleep(timeout)
+            return self.generations[:]
+        self.waiting[subscriber] = 1
+        # Marca antes de reler: um toque depois da marca sempre dá release
+        current = self.generations[:]
+        if current == seen:
+            self.bells[subscriber].acquire(timeout=timeout)
+            current = self.generations[:]
+        self.waiting[subscriber] = 0
+        return current
+
+
+class Signal:
+    __slots__ = ("bell", "slot")
+
+    def __init__(self, bell: Doorbell, slot: int):
+        self.bell = bell
+        self.slot = slot
+
+    @property
+    def generation(self) -> int:
+        return self.bell.generations[self.slot]
+
+    def ring(self) -> None:
+        self.bell.ring(self.slot)
+
+
+class Wait:
+    # Cedido por um ator no lugar de segundos: "me retome quando `signal`
+    # passar da geração `seen`"
+    __slots__ = ("signal", "seen")
+
+    def __init__(self, signal: Signal, seen: int):
+        self.signal = signal
+        self.seen = seen
+
+    @property
+    def ready(self) -> bool:
+        return self.signal.generation != self.seen
+
+
+# ----------------------------
+# Verificação: host morto no meio da espera não trava quem toca
+# ----------------------------
+def _waiter(bell: Doorbell, subscriber: int) -> None:
+    seen = bell.snapshot()
+    while True:
+        seen = bell.wait(seen, subscriber)
+
+
+def check() -> None:
+    bell = Doorbell(1, 2)
+    procs = [mp.Process(target=_waiter, args=(bell, i), daemon=True) for i in range(2)]
+    for p in procs:
+        p.start()
+    time.sleep(0.5)
+    os.kill(procs[0].pid, signal.SIGKILL)
+    procs[0].join()
+    started = time.monotonic()
+    for _ in range(100):
+        bell.ring(0)
+    took = time.monotonic() - started
+    procs[1].terminate()
+    ok = took < 1.0 and bell.generations[0] == 100
+    print(f"ring depois de matar um host: {took * 1000:.1f} ms, geração {bell.generations[0]}"
+          f" -> {'ok' if ok else 'FALHOU'}")
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    check()
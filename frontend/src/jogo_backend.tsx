@@ -11,26 +11,54 @@ type Miner = {
   mined: number;
   locked: boolean;
   target: string | null;
+  deposit: number | null;
+};
+
+type Deposit = {
+  id: number;
+  kind: 'minerals' | 'crystals';
+  x: number;
+  y: number;
+  capacity: number;
+  amount: number;
 };
 
 type Resources = { minerals: number; energy: number; crystals: number; };
 type Stats = { totalMined: number; conflicts: number; synchronized: number; energyDepleted: number; };
-type LogEntry = { time: string; level: 'info'|'success'|'warning'|'error'; message: string; };
+type LogEntry = { seq?: number; time: string; level: 'info'|'success'|'warning'|'error'; message: string; };
+type StateDelta = {
+  resources?: Partial<Resources>;
+  stats?: Partial<Stats>;
+  miners?: Record<number, Partial<Miner>>;
+  removed?: number[];
+  deposits?: Record<number, Partial<Deposit>>;
+  isRunning?: boolean;
+};
 
 const API_BASE = 'http://localhost:8000';
+// ?world=N abre outro mundo (rotas /api/worlds/N/...); sem ele, o mundo 0
+const WORLD = new URLSearchParams(window.location.search).get('world');
+const API = WORLD ? `${API_BASE}/api/worlds/${WORLD}` : `${API_BASE}/api`;
 
 const SpaceMiningGame = () => {
   const [miners, setMiners] = useState<Record<number, Miner>>({});
   const [resources, setResources] = useState<Resources>({ minerals: 100, energy: 100, crystals: 50 });
+  const [capacity, setCapacity] = useState<Resources>({ minerals: 100, energy: 100, crystals: 50 });
+  const [deposits, setDeposits] = useState<Record<number, Deposit>>({});
   const [logs, setLogs] = useState<LogEntry[]>([]);
   const [isRunning, setIsRunning] = useState(false);
   const [stats, setStats] = useState<Stats>({ totalMined: 0, conflicts: 0, synchronized: 0, energyDepleted: 0 });
   const [connected, setConnected] = useState(false);
+  const [maxMiners, setMaxMiners] = useState(6);
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
   
   const logsEndRef = useRef<HTMLDivElement>(null);
   const esRef = useRef<EventSource | null>(null);
+  const versionRef = useRef<number | null>(null);
+  const lastEventIdRef = useRef<string | null>(null);
+  const resyncingRef = useRef(false);
+  const pendingDeltasRef = useRef<{ version: number; data: StateDelta }[]>([]);
 
   useEffect(() => {
     if (error) {
@@ -43,11 +71,81 @@ const SpaceMiningGame = () => {
     let reconnectTimer: any = null;
     let isUnmounted = false;
 
+    const applySnapshot = (d: any) => {
+      setResources(d.resources || { minerals: 0, energy: 0, crystals: 0 });
+      setMiners(d.miners || {});
+      setDeposits(d.deposits || {});
+      if (d.capacity) setCapacity(d.capacity);
+      setStats(d.stats || { totalMined: 0, conflicts: 0, synchronized: 0, energyDepleted: 0 });
+      setIsRunning(d.isRunning || false);
+      if (typeof d.maxMiners === 'number') setMaxMiners(d.maxMiners);
+      versionRef.current = typeof d.version === 'number' ? d.version : null;
+
+      if (d.logs && Array.isArray(d.logs)) {
+        setLogs(d.logs);
+      }
+    };
+
+    const applyDelta = (d: StateDelta) => {
+      if (d.resources) setResources(prev => ({ ...prev, ...d.resources }));
+      if (d.stats) setStats(prev => ({ ...prev, ...d.stats }));
+      if (typeof d.isRunning === 'boolean') setIsRunning(d.isRunning);
+      if (d.miners || d.removed) {
+        setMiners(prev => {
+          const next = { ...prev };
+          Object.entries(d.miners || {}).forEach(([id, fields]) => {
+            next[Number(id)] = { ...next[Number(id)], ...fields } as Miner;
+          });
+          (d.removed || []).forEach(id => { delete next[id]; });
+          return next;
+        });
+      }
+      if (d.deposits) {
+        // Mapa fixo: os deltas só trazem a quantidade de cada depósito
+        setDeposits(prev => {
+          const next = { ...prev };
+          Object.entries(d.deposits || {}).forEach(([id, fields]) => {
+            next[Number(id)] = { ...next[Number(id)], ...fields } as Deposit;
+          });
+          return next;
+        });
+      }
+    };
+
+    // Lacuna de versão: busca o estado completo e reaplica os deltas mais novos
+    const resync = async () => {
+      if (resyncingRef.current) return;
+      resyncingRef.current = true;
+      try {
+        const res = await fetch(`${API}/state`);
+        const d = await res.json();
+        if (isUnmounted) return;
+        applySnapshot(d);
+        pendingDeltasRef.current
+          .filter(p => versionRef.current === null || p.version > versionRef.current)
+          .sort((a, b) => a.version - b.version)
+          .forEach(p => {
+            applyDelta(p.data);
+            versionRef.current = p.version;
+          });
+      } catch (e) {
+        console.warn('Erro ao ressincronizar estado:', e);
+      } finally {
+        pendingDeltasRef.current = [];
+        resyncingRef.current = false;
+      }
+    };
+
     const connect = () => {
       if (isUnmounted) return;
 
       console.log('🔌 Conectando SSE...');
-      const es = new EventSource(`${API_BASE}/api/events`);
+      // Cada reconexão cria um EventSource novo, que não repete o Last-Event-ID:
+      // manda o último id pela query para receber só o que perdeu
+      const resume = lastEventIdRef.current
+        ? `?last_event_id=${encodeURIComponent(lastEventIdRef.current)}`
+        : '';
+      const es = new EventSource(`${API}/events${resume}`);
       esRef.current = es;
 
       es.onopen = () => {
@@ -59,19 +157,29 @@ const SpaceMiningGame = () => {
       es.onmessage = (evt) => {
         try {
           const msg = JSON.parse(evt.data);
+          if (evt.lastEventId) lastEventIdRef.current = evt.lastEventId;
           
           if (msg.type === 'state') {
-            const d = msg.data;
-            setResources(d.resources || { minerals: 0, energy: 0, crystals: 0 });
-            setMiners(d.miners || {});
-            setStats(d.stats || { totalMined: 0, conflicts: 0, synchronized: 0, energyDepleted: 0 });
-            setIsRunning(d.isRunning || false);
-            
-            if (d.logs && Array.isArray(d.logs)) {
-              setLogs(d.logs);
+            applySnapshot(msg.data);
+          } else if (msg.type === 'delta') {
+            if (resyncingRef.current) {
+              pendingDeltasRef.current.push({ version: msg.version, data: msg.data });
+            } else if (versionRef.current !== null && msg.version <= versionRef.current) {
+              // Já incluído no snapshot
+            } else if (versionRef.current === null || msg.version !== versionRef.current + 1) {
+              pendingDeltasRef.current.push({ version: msg.version, data: msg.data });
+              resync();
+            } else {
+              applyDelta(msg.data);
+              versionRef.current = msg.version;
             }
           } else if (msg.type === 'log') {
             setLogs(prev => [...prev.slice(-99), msg.data]);
+          } else if (msg.type === 'op') {
+            // Resultado de criar/remover/resetar (as rotas só enfileiram)
+            if (!msg.data.ok && msg.data.error) {
+              setError(msg.data.error.message);
+            }
           }
         } catch (e) {
           console.warn('Erro ao processar mensagem:', e);
@@ -101,7 +209,7 @@ const SpaceMiningGame = () => {
   const apiCall = async (url: string, options: RequestInit = {}) => {
     setIsLoading(true);
     try {
-      const res = await fetch(`${API_BASE}${url}`, {
+      const res = await fetch(`${API}${url}`, {
         ...options,
         headers: { 'Content-Type': 'application/json', ...options.headers }
       });
@@ -122,7 +230,7 @@ const SpaceMiningGame = () => {
 
   const toggleRun = async () => {
     try {
-      await apiCall(isRunning ? '/api/pause' : '/api/start', { method: 'POST' });
+      await apiCall(isRunning ? '/pause' : '/start', { method: 'POST' });
     } catch (e) {
       console.error('Erro toggle:', e);
     }
@@ -131,7 +239,7 @@ const SpaceMiningGame = () => {
   const reset = async () => {
     if (!window.confirm('Resetar tudo?')) return;
     try {
-      await apiCall('/api/reset', { method: 'POST' });
+      await apiCall('/reset', { method: 'POST' });
     } catch (e) {
       console.error('Erro reset:', e);
     }
@@ -139,7 +247,7 @@ const SpaceMiningGame = () => {
 
   const addMiner = async () => {
     try {
-      await apiCall('/api/miners', { method: 'POST' });
+      await apiCall('/miners', { method: 'POST' });
     } catch (e) {
       console.error('Erro criar:', e);
     }
@@ -148,7 +256,7 @@ const SpaceMiningGame = () => {
   const removeMiner = async (id: number, name: string) => {
     if (!window.confirm(`Encerrar ${name}?`)) return;
     try {
-      await apiCall(`/api/miners/${id}`, { method: 'DELETE' });
+      await apiCall(`/miners/${id}`, { method: 'DELETE' });
     } catch (e) {
       console.error('Erro remover:', e);
     }
@@ -188,7 +296,7 @@ const SpaceMiningGame = () => {
           <div className="flex items-center justify-between">
             <div>
               <h1 className="text-4xl font-bold bg-gradient-to-r from-purple-400 to-pink-600 bg-clip-text text-transparent">
-                🚀 Batalha de Mineração Espacial
+                🚀 Batalha de Mineração Espacial{WORLD ? ` · Mundo ${WORLD}` : ''}
               </h1>
               <p className="text-slate-400 mt-2 flex items-center gap-3">
                 Memória Compartilhada + Multi-Processo (Python)
@@ -252,34 +360,26 @@ const SpaceMiningGame = () => {
                 backgroundSize: '30px 30px'
               }} />
               
-              {/* Asteroides */}
-              {resources.minerals > 30 && (
-                <div 
-                  className="absolute top-10 left-20 bg-gray-500 rounded-full opacity-60 transition-all duration-1000"
-                  style={{ 
-                    width: `${Math.max(32, (resources.minerals / 100) * 64)}px`,
-                    height: `${Math.max(32, (resources.minerals / 100) * 64)}px`
-                  }}
-                />
-              )}
-              {resources.crystals > 15 && (
-                <div 
-                  className="absolute top-32 right-32 bg-blue-500 rounded-full opacity-70 transition-all duration-1000 shadow-lg"
-                  style={{ 
-                    width: `${Math.max(24, (resources.crystals / 50) * 48)}px`,
-                    height: `${Math.max(24, (resources.crystals / 50) * 48)}px`
-                  }}
-                />
-              )}
-              {resources.minerals > 20 && (
-                <div 
-                  className="absolute bottom-20 left-48 bg-gray-600 rounded-full opacity-60 transition-all duration-1000"
-                  style={{ 
-                    width: `${Math.max(40, (resources.minerals / 100) * 80)}px`,
-                    height: `${Math.max(40, (resources.minerals / 100) * 80)}px`
-                  }}
-                />
-              )}
+              {/* Depósitos: tamanho pela quantidade restante */}
+              {Object.values(deposits).map(dep => {
+                const size = 16 + (dep.capacity ? dep.amount / dep.capacity : 0) * 32;
+                return (
+                  <div
+                    key={`dep-${dep.id}`}
+                    className={`absolute rounded-full transition-all duration-1000 ${
+                      dep.kind === 'minerals' ? 'bg-gray-500 opacity-60' : 'bg-blue-500 opacity-70 shadow-lg'
+                    } ${dep.amount === 0 ? 'opacity-20' : ''}`}
+                    title={`Depósito ${dep.id}: ${dep.amount}/${dep.capacity}`}
+                    style={{
+                      left: `${dep.x}px`,
+                      top: `${dep.y}px`,
+                      width: `${size}px`,
+                      height: `${size}px`,
+                      transform: 'translate(-50%, -50%)'
+                    }}
+                  />
+                );
+              })}
 
               {/* Mineradores */}
               {minersArray.map(miner => (
@@ -363,7 +463,7 @@ const SpaceMiningGame = () => {
                   <div className="flex-1 bg-slate-700 rounded-full h-3 overflow-hidden">
                     <div 
                       className="bg-gradient-to-r from-gray-600 to-gray-400 h-full transition-all duration-500"
-                      style={{ width: `${resources.minerals}%` }}
+                      style={{ width: `${(resources.minerals / capacity.minerals) * 100}%` }}
                     />
                   </div>
                   <span className="text-white font-bold text-lg w-12 text-right">
@@ -378,7 +478,7 @@ const SpaceMiningGame = () => {
                   <div className="flex-1 bg-slate-700 rounded-full h-3 overflow-hidden">
                     <div 
                       className="bg-gradient-to-r from-blue-600 to-blue-400 h-full transition-all duration-500"
-                      style={{ width: `${(resources.crystals / 50) * 100}%` }}
+                      style={{ width: `${(resources.crystals / capacity.crystals) * 100}%` }}
                     />
                   </div>
                   <span className="text-white font-bold text-lg w-12 text-right">
@@ -428,14 +528,14 @@ const SpaceMiningGame = () => {
               </h3>
               <button
                 onClick={addMiner}
-                disabled={activeMiners >= 6 || !connected}
+                disabled={activeMiners >= maxMiners || !connected}
                 className={`w-full py-3 rounded-lg font-semibold mb-4 transition shadow-lg ${
-                  activeMiners >= 6 || !connected
+                  activeMiners >= maxMiners || !connected
                     ? 'bg-slate-600 text-slate-400 cursor-not-allowed'
                     : 'bg-gradient-to-r from-purple-500 to-pink-600 hover:from-purple-600 hover:to-pink-700 text-white'
                 }`}
               >
-                + Criar Minerador ({activeMiners}/6)
+                + Criar Minerador ({activeMiners}/{maxMiners})
               </button>
               <div className="space-y-2 max-h-72 overflow-y-auto custom-scrollbar">
                 {minersArray.map(miner => (
@@ -520,7 +620,7 @@ const SpaceMiningGame = () => {
           <div className="bg-slate-900 rounded-lg p-4 max-h-40 overflow-y-auto custom-scrollbar">
             <div className="space-y-2">
               {logs.map((log, i) => (
-                <div key={i} className="flex items-start gap-3 text-sm">
+                <div key={log.seq ?? i} className="flex items-start gap-3 text-sm">
                   <span className="text-slate-500 font-mono text-xs">{log.time}</span>
                   <span className={
                     log.level === 'success' ? 'text-green-400' :